@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""__init__
+====================================
+Created on: 18/10/2026
+"""
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_concurrency
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Load test of the inventory daemon. Hundreds of local clients connect at the same moment and
+             ask for the --list inventory, spread over a few filters, like the Ansible containers started
+             in parallel by play.sh. It reports the latency percentiles, the throughput and how many of
+             the requests were computed and how many were coalesced with an identical running request.
+"""
+
+from benchmarks import fleet
+from benchmarks.bench_daemon import start_daemon
+from dynamic_hosts import client
+from dynamic_hosts import configuration
+from dynamic_hosts.storage import get_storage
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+
+_client = 'bench_concurrency'
+_roles = ['web', 'db', 'app', 'zoo']
+
+
+def get_config(role=''):
+    """Returns the configuration of the benchmark DB"""
+    config = configuration.TestConfig()
+    config.client = _client
+    config.environment = ''
+    config.role = role
+    config.location = ''
+
+    return config
+
+
+async def request(socket_file, line):
+    """Sends a request and returns its latency in milliseconds"""
+    start = time.perf_counter()
+
+    reader, writer = await asyncio.open_unix_connection(socket_file)
+
+    try:
+        writer.write(line)
+        await writer.drain()
+
+        header = json.loads(await reader.readline())
+        await reader.readexactly(header['length'])
+
+        if header['status'] != 'ok':
+            raise Exception(header.get('message'))
+    finally:
+        writer.close()
+
+    return (time.perf_counter() - start) * 1000
+
+
+async def burst(socket_file, clients, filters):
+    """Sends the requests of all the clients at the same moment"""
+    lines = [json.dumps(client.build_request(get_config(_roles[idx % filters]), 'list')).encode() + b'\n'
+             for idx in range(clients)]
+
+    return await asyncio.gather(*[request(socket_file, line) for line in lines])
+
+
+def percentile(values, fraction):
+    """Returns a percentile of a sorted list"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def get_stats(socket_file):
+    """Returns the counters of the daemon"""
+    return json.loads(client.query(socket_file, {'query': 'stats'})[1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load test of the inventory daemon')
+    parser.add_argument('--count', type=int, default=20000, help='Number of hosts in the test DB')
+    parser.add_argument('--clients', type=int, default=300, help='Number of simultaneous clients')
+    parser.add_argument('--filters', type=int, default=4, choices=range(1, len(_roles) + 1),
+                        help='Number of distinct role filters of the clients')
+    parser.add_argument('--rounds', type=int, default=5, help='Number of bursts of requests')
+    args = parser.parse_args()
+
+    config = get_config()
+    socket_file = config.get_socket_file()
+
+    shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+    os.makedirs(os.path.dirname(config.get_db_file()))
+    get_storage(config).save(list(fleet.generate(args.count)), None)
+
+    daemon = start_daemon(config)
+
+    try:
+        before = get_stats(socket_file)
+        latencies = []
+        elapsed = 0
+
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            latencies.extend(asyncio.run(burst(socket_file, args.clients, args.filters)))
+            elapsed += time.perf_counter() - start
+
+        after = get_stats(socket_file)
+        latencies.sort()
+
+        message = ' - {:.<30}: {}'
+        print("{} bursts of {} clients, {} filters, {} hosts".format(args.rounds, args.clients, args.filters,
+                                                                    args.count))
+        print(message.format("p50", '{:.1f} ms'.format(percentile(latencies, 0.50))))
+        print(message.format("p95", '{:.1f} ms'.format(percentile(latencies, 0.95))))
+        print(message.format("p99", '{:.1f} ms'.format(percentile(latencies, 0.99))))
+        print(message.format("max", '{:.1f} ms'.format(latencies[-1])))
+        print(message.format("throughput", '{:.0f} requests/s'.format(len(latencies) / elapsed)))
+        print(message.format("computed", after['computed'] - before['computed']))
+        print(message.format("coalesced", after['coalesced'] - before['coalesced']))
+    finally:
+        daemon.terminate()
+        daemon.wait()
+        shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_daemon
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Compares the latency of the --list and --host queries answered by a cold hosts.py, which
+             loads and validates the DB, with the queries answered by the inventory daemon, both through
+             hosts.py as a thin client and through its socket directly. The socket queries are answered
+             from the cache of responses of the daemon, the last one is a revalidation with the ETag of
+             the cached response, answered as not modified.
+"""
+
+from benchmarks import fleet
+from dynamic_hosts import client
+from dynamic_hosts import configuration
+from dynamic_hosts.storage import get_storage
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+
+_root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+_client = 'bench_daemon'
+
+
+def get_config(role=''):
+    """Returns the configuration of the benchmark DB"""
+    config = configuration.TestConfig()
+    config.client = _client
+    config.environment = ''
+    config.role = role
+    config.location = ''
+
+    return config
+
+
+def median(function, runs):
+    """Calls a function runs times and returns the median time in milliseconds"""
+    times = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(times)
+
+
+def run_cli(arguments, daemon):
+    """Runs hosts.py with the benchmark client"""
+    env = dict(os.environ, THE_CLIENT=_client, THE_ENVIRONMENT='', THE_ROLE='web', THE_LOCATION='')
+    command = [sys.executable, os.path.join(_root, 'hosts.py'), '--env', 'test', '--no-cache'] + arguments
+
+    subprocess.run(command + ([] if daemon else ['--no-daemon']), env=env, stdout=subprocess.DEVNULL, check=True)
+
+
+def start_daemon(config):
+    """Starts the daemon in its own process and waits until it answers"""
+    process = subprocess.Popen([sys.executable, os.path.join(_root, 'hosts.py'), '--env', 'test', '--daemon'],
+                               env=dict(os.environ, THE_CLIENT=_client), stderr=subprocess.DEVNULL)
+    request = client.build_request(config, 'host', 'unknown')
+
+    while client.query(config.get_socket_file(), request) is None:
+        if process.poll() is not None:
+            raise Exception("The daemon could not be started")
+
+        time.sleep(0.1)
+
+    return process
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Latency of the inventory daemon')
+    parser.add_argument('--count', type=int, default=100000, help='Number of hosts in the test DB')
+    parser.add_argument('--runs', type=int, default=10, help='Number of runs of each query')
+    args = parser.parse_args()
+
+    config = get_config('web')
+    records = list(fleet.generate(args.count))
+    host = records[args.count // 2]['host']
+
+    shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+    os.makedirs(os.path.dirname(config.get_db_file()))
+    get_storage(config).save(records, None)
+    del records
+
+    message = ' - {:.<40}: {:10.1f} ms'
+    print("Latency with {} hosts, role web (median of {} runs)".format(args.count, args.runs))
+
+    print(message.format("cold hosts.py --list", median(lambda: run_cli(['--list'], False), args.runs)))
+    print(message.format("cold hosts.py --host", median(lambda: run_cli(['--host', host], False), args.runs)))
+
+    daemon = start_daemon(config)
+
+    try:
+        list_request = client.build_request(config, 'list')
+        host_request = client.build_request(config, 'host', host)
+
+        print(message.format("daemon hosts.py --list", median(lambda: run_cli(['--list'], True), args.runs)))
+        print(message.format("daemon hosts.py --host", median(lambda: run_cli(['--host', host], True), args.runs)))
+        print(message.format("daemon socket list", median(lambda: client.query(config.get_socket_file(),
+                                                                               list_request), args.runs)))
+        print(message.format("daemon socket host", median(lambda: client.query(config.get_socket_file(),
+                                                                               host_request), args.runs)))
+
+        list_request['etag'] = client.query(config.get_socket_file(), list_request)[0]['etag']
+
+        print(message.format("daemon socket list not modified",
+                             median(lambda: client.query(config.get_socket_file(), list_request), args.runs)))
+    finally:
+        daemon.terminate()
+        daemon.wait()
+        shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
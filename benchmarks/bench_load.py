@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_load
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Compares a filtered --list with the DB loaded as a whole and read record by record.
+             Each mode runs in its own process, which writes the inventory to /dev/null. The peak RSS
+             is reset after the modules are imported, so the difference between the peak and the RSS
+             at that moment is the memory needed to read the DB and render the inventory.
+"""
+
+from benchmarks import bench_output
+
+import gc
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+
+
+def render(mode, environment, role, location):
+    """Writes a filtered inventory to /dev/null and prints the RSS before, the peak RSS and the time"""
+    from dynamic_hosts.dynamic_hosts import DynamicHosts
+
+    config = bench_output.get_config()
+    config.environment = environment
+    config.role = role
+    config.location = location
+    config.stream_on_load = mode == 'stream'
+
+    gc.collect()
+    bench_output.reset_peak_rss()
+
+    before = bench_output.read_status('VmRSS') or bench_output.peak_rss()
+    start = time.perf_counter()
+
+    with open(os.devnull, 'wb') as f:
+        for chunk in DynamicHosts(config).iter_list():
+            f.write(chunk.encode())
+
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(before, bench_output.peak_rss(), elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Peak memory of a filtered --list')
+    parser.add_argument('--count', type=int, default=200000, help='Number of hosts of the DB')
+    parser.add_argument('--variables', type=int, default=10, help='Number of extra variables of each host')
+    parser.add_argument('--filter', type=str, default='pro,web,MEX',
+                        help='Comma separated environment, role and location of the inventory')
+    parser.add_argument('--render', choices=['load', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    filters = (args.filter.split(',') + ['', '', ''])[:3]
+
+    if args.render:
+        render(args.render, *filters)
+        exit(0)
+
+    line = ' {:>8} {:>14} {:>12}'
+
+    try:
+        bench_output.create_db(args.count, args.variables)
+
+        print(line.format('Mode', 'Memory', 'Time'))
+
+        for mode in ('load', 'stream'):
+            output = subprocess.check_output([sys.executable, '-m', 'benchmarks.bench_load',
+                                              '--filter', args.filter, '--render', mode])
+            before, after, elapsed = [float(value) for value in output.split()]
+
+            print(line.format(mode, '{:.1f} MB'.format(after - before), '{:.0f} ms'.format(elapsed)))
+    finally:
+        shutil.rmtree(os.path.dirname(bench_output.get_config().get_db_file()), ignore_errors=True)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_output
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Compares the peak memory of the --list output built with json.dumps and streamed in chunks.
+             Each mode runs in its own process, which loads the DB and then writes the inventory
+             to /dev/null. On Linux the peak RSS of the process is reset once the DB is loaded,
+             so the peak reached while the inventory is written is compared with the RSS after
+             the load, and the difference is the memory needed to render the inventory.
+"""
+
+from benchmarks import fleet
+from dynamic_hosts import configuration
+from dynamic_hosts.storage import get_storage
+
+import gc
+import os
+import sys
+import json
+import shutil
+import resource
+import argparse
+import subprocess
+
+_client = 'bench_output'
+
+
+def get_config():
+    """Returns the configuration of the benchmark DB"""
+    config = configuration.TestConfig()
+    config.client = _client
+    config.validate_on_load = False
+    config.inventory_cache = False
+    config.environment = ''
+    config.role = ''
+    config.location = ''
+
+    return config
+
+
+def read_status(field):
+    """Returns a field of /proc/self/status in MB, or None if it is not available"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return None
+
+
+def reset_peak_rss():
+    """Resets the peak RSS of the process to its current RSS, only Linux supports it"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss():
+    """Returns the peak resident set size of the process in MB"""
+    peak = read_status('VmHWM')
+
+    if peak is not None:
+        return peak
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def render(mode):
+    """Loads the DB, writes the inventory to /dev/null and prints the peak RSS before and after it"""
+    from dynamic_hosts.dynamic_hosts import DynamicHosts
+
+    dh = DynamicHosts(get_config())
+    dh.get_host('')
+
+    gc.collect()
+    reset_peak_rss()
+
+    before = read_status('VmRSS') or peak_rss()
+
+    with open(os.devnull, 'wb') as f:
+        if mode == 'dumps':
+            f.write((json.dumps(dh.get_list()) + '\n').encode())
+        else:
+            for chunk in dh.iter_list():
+                f.write(chunk.encode())
+
+            f.write(b'\n')
+
+    print(before, peak_rss())
+
+
+def create_db(count, variables):
+    """Writes a DB of count hosts, every host has the given number of extra variables"""
+    config = get_config()
+    records = []
+
+    for record in fleet.generate(count):
+        host_vars = record.setdefault('variables', {})
+
+        for i in range(variables):
+            host_vars['var{:02d}'.format(i)] = '{}-{}'.format(record['host'], i)
+
+        records.append(record)
+
+    shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+    os.makedirs(os.path.dirname(config.get_db_file()))
+
+    get_storage(config).save(records, None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Peak memory of the --list output')
+    parser.add_argument('--count', type=int, default=200000, help='Number of hosts of the DB')
+    parser.add_argument('--variables', type=int, default=10, help='Number of extra variables of each host')
+    parser.add_argument('--render', choices=['dumps', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.render:
+        render(args.render)
+        exit(0)
+
+    line = ' {:>8} {:>14} {:>14} {:>14}'
+
+    try:
+        create_db(args.count, args.variables)
+
+        print(line.format('Mode', 'After load', 'Peak', 'Output'))
+
+        for mode in ('dumps', 'stream'):
+            output = subprocess.check_output([sys.executable, '-m', 'benchmarks.bench_output', '--render', mode])
+            before, after = [float(value) for value in output.split()]
+
+            print(line.format(mode, '{:.1f} MB'.format(before), '{:.1f} MB'.format(after),
+                              '{:.1f} MB'.format(after - before)))
+    finally:
+        shutil.rmtree(os.path.dirname(get_config().get_db_file()), ignore_errors=True)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_records
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Compares the memory of the records of the DB kept as dictionaries and as Record instances.
+             The records are decoded from JSON one by one, like the DB loader does, so each record has
+             its own strings. The memory of the resident records is measured with tracemalloc, and the
+             time of a filtered select over them is measured too.
+"""
+
+from benchmarks import fleet
+from dynamic_hosts.filters import HostFilter
+from dynamic_hosts.record import Record
+
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+
+
+def measure(lines, compact):
+    """Decodes the records and returns their memory in MB and the time of a filtered select in ms"""
+    gc.collect()
+    tracemalloc.start()
+
+    if compact:
+        servers = [Record.from_dict(json.loads(line)) for line in lines]
+    else:
+        servers = [json.loads(line) for line in lines]
+
+    memory = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    HostFilter('pro', 'web', 'MEX,GDL').filter(servers)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    return memory, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Memory of the resident records')
+    parser.add_argument('--sizes', type=str, default='100000,1000000',
+                        help='Comma separated list with the number of hosts of each DB')
+    args = parser.parse_args()
+
+    line = ' {:>9} {:>8} {:>12} {:>12} {:>12}'
+
+    print(line.format('Hosts', 'Records', 'Memory', 'Per host', 'Select'))
+
+    for size in [int(value) for value in args.sizes.split(',')]:
+        lines = [json.dumps(record) for record in fleet.generate(size)]
+
+        for name, compact in (('dict', False), ('Record', True)):
+            memory, elapsed = measure(lines, compact)
+
+            print(line.format(size, name, '{:.1f} MB'.format(memory), '{:.0f} B'.format(memory * 1024 * 1024 / size),
+                              '{:.1f} ms'.format(elapsed)))
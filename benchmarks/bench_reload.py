@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_reload
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Compares the time needed to bring a resident ServersDB up to date after another process
+             changed a few records of its DB file, loading and validating the whole DB again and
+             reloading only the differences.
+"""
+
+from benchmarks import fleet
+from dynamic_hosts import configuration
+from dynamic_hosts.database import ServersDB
+from dynamic_hosts.storage import get_storage
+
+import os
+import time
+import shutil
+import argparse
+
+_client = 'bench_reload'
+
+
+def change(records, count, round_number):
+    """Changes the location of count records, spread over the whole DB"""
+    step = max(1, len(records) // count)
+
+    for idx in range(0, len(records), step)[:count]:
+        records[idx]['location'] = 'R{}'.format(round_number)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Reload of a changed DB')
+    parser.add_argument('--count', type=int, default=100000, help='Number of hosts in the test DB')
+    parser.add_argument('--changes', type=str, default='1,100,1000',
+                        help='Comma separated list with the number of changed records')
+    args = parser.parse_args()
+
+    config = configuration.TestConfig()
+    config.client = _client
+    config.inventory_cache = False
+    records = list(fleet.generate(args.count))
+
+    shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+    os.makedirs(os.path.dirname(config.get_db_file()))
+
+    line = ' {:>9} {:>9} {:>14} {:>14}'
+
+    print(line.format('Hosts', 'Changes', 'Full load', 'Reload'))
+
+    try:
+        for round_number, count in enumerate(int(value) for value in args.changes.split(',')):
+            get_storage(config).save(records, None)
+            ServersDB.clear_instances()
+            db = ServersDB(config)
+
+            change(records, count, round_number)
+            get_storage(config).save(records, None)
+
+            start = time.perf_counter()
+            ServersDB.clear_instances()
+            ServersDB(config)
+            full = (time.perf_counter() - start) * 1000
+
+            change(records, count, round_number + 100)
+            get_storage(config).save(records, None)
+
+            start = time.perf_counter()
+            db.reload()
+            reload = (time.perf_counter() - start) * 1000
+
+            print(line.format(args.count, count, '{:.1f} ms'.format(full), '{:.1f} ms'.format(reload)))
+    finally:
+        ServersDB.clear_instances()
+        shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_server
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Measures the time needed to construct Server objects.
+             The "before" run clears the schema cache before each object, so every Server
+             reads the schema file and compiles its validator like it used to do.
+"""
+
+from dynamic_hosts import database
+from dynamic_hosts.database import Server
+
+import time
+import argparse
+
+
+def build_servers(count, cached):
+    """Builds the given number of Server objects and returns the elapsed time in seconds"""
+    data = {'host': 'bench.domain.net', 'environment': 'pro', 'role': 'web', 'location': 'MEX'}
+
+    start = time.perf_counter()
+
+    for _ in range(count):
+        if not cached:
+            database._schemas.clear()
+
+        Server(data)
+
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Server construction benchmark')
+    parser.add_argument('--count', type=int, default=100000, help='Number of Server objects to build')
+    args = parser.parse_args()
+
+    message = ' - {:.<20}: {:8.3f} s ({:.1f} us per object)'
+
+    before = build_servers(args.count, cached=False)
+    after = build_servers(args.count, cached=True)
+
+    print("Constructing {} Server objects".format(args.count))
+    print(message.format("Before", before, before * 1e6 / args.count))
+    print(message.format("After", after, after * 1e6 / args.count))
+    print(' - {:.<20}: {:8.1f}x'.format("Speedup", before / after))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_startup
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Measures the start up time of hosts.py for the read only invocations.
+             For each invocation it reports the wall clock time and the import time reported by
+             'python -X importtime', and fails if the cached --list goes over the budget.
+"""
+
+from dynamic_hosts import configuration
+from dynamic_hosts.database import ServersDB
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+
+_root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+_client = 'bench_startup'
+
+
+def seed(count):
+    """Creates a test DB with the given number of hosts"""
+    config = configuration.TestConfig()
+    config.client = _client
+
+    shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+
+    records = []
+    for i in range(count):
+        records.append((i, {'host': 'host{}.domain.net'.format(i),
+                            'environment': ['dev', 'itg', 'pro'][i % 3],
+                            'role': ['app', 'db', 'web', 'zoo'][i % 4],
+                            'location': 'LOC{}'.format(i % 10)}))
+
+    ServersDB(config).import_servers(records)
+
+    return config
+
+
+def run(arguments, runs):
+    """Runs hosts.py and returns the median wall clock time and the median import time, in milliseconds"""
+    command = [sys.executable, 'hosts.py', '--env', 'test', '--client', _client] + arguments
+    wall = []
+    imports = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=_root, stdout=subprocess.DEVNULL, check=True)
+        wall.append((time.perf_counter() - start) * 1000)
+
+        output = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:], cwd=_root,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True).stderr.decode()
+        total = 0
+        for line in output.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                value = line.split(':', 1)[1].split('|')[0].strip()
+                if value.isdigit():
+                    total += int(value)
+        imports.append(total / 1000)
+
+    return statistics.median(wall), statistics.median(imports)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='hosts.py start up benchmark')
+    parser.add_argument('--hosts', type=int, default=1000, help='Number of hosts in the test DB')
+    parser.add_argument('--runs', type=int, default=10, help='Number of runs of each invocation')
+    parser.add_argument('--budget-ms', type=float, default=100.0,
+                        help='Maximum wall clock time of a cached --list, in milliseconds')
+    args = parser.parse_args()
+
+    config = seed(args.hosts)
+
+    try:
+        message = ' - {:.<40}: {:8.1f} ms wall {:8.1f} ms imports'
+        print("hosts.py start up with {} hosts (median of {} runs)".format(args.hosts, args.runs))
+
+        cached = run(['--list'], args.runs)
+        print(message.format("--list (cached)", *cached))
+        print(message.format("--list --no-cache", *run(['--list', '--no-cache'], args.runs)))
+        print(message.format("--list --no-cache --no-validation", *run(['--list', '--no-cache', '--no-validation'],
+                                                                        args.runs)))
+        print(message.format("--config", *run(['--config'], args.runs)))
+    finally:
+        shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+
+    if cached[0] > args.budget_ms:
+        print("The cached --list took {:.1f} ms, the budget is {:.1f} ms".format(cached[0], args.budget_ms))
+        exit(1)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: bench_storage
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Compares the JSON and the SQLite storage backends.
+             For each size it measures a filtered inventory (load plus select), the lookup of
+             a single host and the addition of a new host. The DBs are written directly by the
+             storage backends and loaded without validation, so only the storage is measured.
+"""
+
+from benchmarks import fleet
+from dynamic_hosts import configuration
+from dynamic_hosts.database import Server
+from dynamic_hosts.database import ServersDB
+from dynamic_hosts.filters import HostFilter
+from dynamic_hosts.storage import get_storage
+
+import os
+import time
+import shutil
+import argparse
+
+_client = 'bench_storage'
+
+
+def measure(function):
+    """Calls a function and returns the elapsed time in milliseconds"""
+    start = time.perf_counter()
+    function()
+
+    return (time.perf_counter() - start) * 1000
+
+
+def bench(config, storage, records):
+    """Returns the times of the filtered inventory, the host lookup and the addition of a host
+
+    The registered instances are cleared first, so the inventory of each size and backend includes
+    the load of its DB instead of reusing the instance of the previous size.
+    """
+    config.storage = storage
+    host = records[len(records) // 2]['host']
+    new_server = Server({'host': 'new.domain.net', 'environment': 'pro', 'role': 'web', 'location': 'MEX'})
+
+    ServersDB.clear_instances()
+    get_storage(config).save(records, None)
+
+    inventory = measure(lambda: ServersDB(config).select(HostFilter('pro', 'web')))
+    lookup = measure(lambda: ServersDB(config).get_host(host))
+    add = measure(lambda: ServersDB(config).add_new_server(new_server))
+
+    return inventory, lookup, add
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Storage backends benchmark')
+    parser.add_argument('--sizes', type=str, default='1000,10000,100000,1000000',
+                        help='Comma separated list with the number of hosts of each DB')
+    args = parser.parse_args()
+
+    config = configuration.TestConfig()
+    config.client = _client
+    config.validate_on_load = False
+    config.inventory_cache = False
+
+    line = ' {:>9} {:>8} {:>12} {:>12} {:>12}'
+
+    print(line.format('Hosts', 'Storage', 'Inventory', 'Host', 'Add'))
+
+    try:
+        for size in [int(value) for value in args.sizes.split(',')]:
+            records = list(fleet.generate(size))
+
+            for storage in ('json', 'sqlite'):
+                shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+                os.makedirs(os.path.dirname(config.get_db_file()))
+
+                times = bench(config, storage, records)
+
+                print(line.format(size, storage, *['{:.1f} ms'.format(value) for value in times]))
+    finally:
+        shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: fleet
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Deterministic generator of server records for the benchmarks.
+             The same count and seed always generate the same fleet, so the results of
+             different runs and different machines can be compared.
+"""
+
+import random
+
+ENVIRONMENTS = ['dev', 'itg', 'pro']
+ROLES = ['app', 'db', 'web', 'zoo']
+LOCATIONS = ['MEX', 'GDL', 'MTY', 'QRO', 'CUN', 'TIJ', 'PUE', 'MID']
+
+
+def generate(count, seed=0, variables=0.25):
+    """Generates server records
+
+    :param count: The number of records
+    :param seed: The seed of the random generator
+    :param variables: The fraction of the records that have host variables, by default one of every four
+    :return: A generator of record dictionaries, the hosts are unique
+    """
+    rnd = random.Random(seed)
+
+    for i in range(count):
+        record = {
+            'host': 'host{:07d}.{}.domain.net'.format(i, rnd.choice(['east', 'west', 'north', 'south'])),
+            'environment': rnd.choice(ENVIRONMENTS),
+            'role': rnd.choice(ROLES),
+            'location': rnd.choice(LOCATIONS),
+        }
+
+        if rnd.random() < variables:
+            record['variables'] = {'ansible_port': rnd.randint(1024, 65535), 'rack': 'R{}'.format(rnd.randint(1, 40))}
+
+        yield record
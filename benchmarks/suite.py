@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: suite
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: Benchmark suite of ServersDB, DynamicHosts and hosts.py.
+             For each size, with and without host variables, a deterministic fleet is written to a test DB
+             and the suite times the load, the full validation, the addition, update and deletion of a
+             host, get_servers, get_list with each combination of filters and hosts.py --list end to end.
+             Each benchmark is repeated and its median time is used. The results are written to a JSON
+             file and compared with the stored baseline, benchmarks/baseline.json, the suite exits with
+             an error if any result is slower than the baseline by more than the threshold.
+"""
+
+from benchmarks import fleet
+from dynamic_hosts import configuration
+from dynamic_hosts.database import Server
+from dynamic_hosts.database import ServersDB
+from dynamic_hosts.dynamic_hosts import DynamicHosts
+from dynamic_hosts.storage import get_storage
+
+import gc
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import itertools
+import subprocess
+
+_client = 'bench_suite'
+_root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+_filters = {'environment': 'pro', 'role': 'web', 'location': 'MEX'}
+_baseline = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'baseline.json')
+
+
+def get_config(validate=False, **filters):
+    """Returns the configuration of the benchmark DB
+
+    :param validate: True if the whole DB must be validated when it is loaded
+    :param filters: The environment, role and location filters, by default there is none
+    :return: A TestConfig instance
+    """
+    config = configuration.TestConfig()
+    config.client = _client
+    config.validate_on_load = validate
+    config.inventory_cache = False
+    config.environment = filters.get('environment', '')
+    config.role = filters.get('role', '')
+    config.location = filters.get('location', '')
+
+    return config
+
+
+def reference():
+    """A fixed workload, its time follows the speed of the machine at each moment"""
+    json.loads(json.dumps([{'host': 'host{}.domain.net'.format(idx), 'id': idx} for idx in range(20000)]))
+
+
+def timed(function):
+    """Returns the time of a call in milliseconds, with the garbage collector disabled like timeit"""
+    gc.collect()
+    gc.disable()
+
+    try:
+        start = time.perf_counter()
+        function()
+
+        return (time.perf_counter() - start) * 1000
+    finally:
+        gc.enable()
+
+
+def measure(function, repeat, setup=None):
+    """Calls a function repeat times and returns its median time, absolute and relative to the reference
+
+    The reference workload is timed right before each call, so the relative time of a call does not
+    depend on the speed of the machine at that moment and can be compared with other runs. The first
+    call warms up the caches and is not timed.
+
+    :param function: The function to time
+    :param repeat: The number of timed calls
+    :param setup: A function called before each call, it is not timed
+    :return: A tuple with the median time of the calls in milliseconds and the median of their times
+             divided by the time of the reference
+    """
+    times = []
+    relatives = []
+
+    for idx in range(repeat + 1):
+        if setup is not None:
+            setup()
+
+        elapsed_reference = timed(reference)
+        elapsed = timed(function)
+
+        if idx > 0:
+            times.append(elapsed)
+            relatives.append(elapsed / elapsed_reference)
+
+    return statistics.median(times), statistics.median(relatives)
+
+
+def load(validate):
+    """Loads the DB from its file, not from the registered instance"""
+    ServersDB.clear_instances()
+
+    return ServersDB(get_config(validate))
+
+
+def run_cli():
+    """Runs hosts.py --list for the benchmark DB"""
+    env = dict(os.environ, THE_CLIENT=_client, THE_ENVIRONMENT='', THE_ROLE='', THE_LOCATION='')
+
+    subprocess.check_call([sys.executable, os.path.join(_root, 'hosts.py'), '--env', 'test', '--list', '--no-cache',
+                           '--no-daemon'],
+                          env=env, stdout=subprocess.DEVNULL)
+
+
+def bench(size, variables, repeat):
+    """Runs the benchmarks of a fleet
+
+    :param size: The number of hosts
+    :param variables: True if a quarter of the hosts have variables, otherwise no host has variables
+    :param repeat: The number of times each benchmark is repeated, the median time is used
+    :return: A dictionary with the median time in milliseconds of each benchmark and its relative time
+    """
+    config = get_config()
+    records = list(fleet.generate(size, variables=0.25 if variables else 0))
+    host = records[size // 2]['host']
+    new_server = {'host': 'new.domain.net', 'environment': 'pro', 'role': 'web', 'location': 'MEX'}
+    result = dict()
+
+    shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+    os.makedirs(os.path.dirname(config.get_db_file()))
+
+    get_storage(config).save(records, None)
+    del records
+
+    result['load'] = measure(lambda: load(False), repeat)
+    result['load_validated'] = measure(lambda: load(True), repeat)
+
+    db = load(False)
+
+    def absent():
+        db.delete_server(Server(dict(new_server)))
+
+    def present():
+        if db.get_host(new_server['host']) is None:
+            db.add_new_server(Server(dict(new_server)))
+
+    result['add'] = measure(lambda: db.add_new_server(Server(dict(new_server))), repeat, absent)
+    result['update'] = measure(lambda: db.update_server(Server(dict(new_server, location='GDL'))), repeat)
+    result['delete'] = measure(lambda: db.delete_server(Server(dict(new_server))), repeat, present)
+    result['get_servers_host'] = measure(lambda: db.get_servers('host', host), repeat)
+    result['get_servers_location'] = measure(lambda: db.get_servers('location', 'MEX', _all=True), repeat)
+
+    for count in range(len(_filters) + 1):
+        for fields in itertools.combinations(sorted(_filters), count):
+            dh = DynamicHosts(get_config(**{field: _filters[field] for field in fields}))
+
+            result['get_list_' + ('_'.join(fields) or 'all')] = measure(dh.get_list, repeat)
+
+    result['cli_list'] = measure(run_cli, repeat)
+
+    return result
+
+
+def compare(results, baseline, threshold, min_ms):
+    """Compares the results with a baseline
+
+    The relative times, which do not depend on the speed of the machine, are compared. The time of the
+    baseline is scaled to the speed of the machine in this run to apply min_ms and to be reported.
+
+    :param results: The results file of this run, with the 'results' and 'relative' dictionaries
+    :param baseline: The results file of the baseline run
+    :param threshold: The allowed slow down, e.g. 0.25 allows results up to 25% slower than the baseline
+    :param min_ms: Differences smaller than this number of milliseconds are ignored, they are noise
+    :return: A list of (name, scaled baseline time, time) tuples with the regressions
+    """
+    regressions = []
+    relative = results.get('relative', {})
+    baseline_relative = baseline.get('relative', {})
+
+    for name, elapsed in sorted(results['results'].items()):
+        previous = baseline['results'].get(name)
+
+        if previous is None:
+            continue
+
+        if relative.get(name) and baseline_relative.get(name):
+            previous = elapsed * baseline_relative[name] / relative[name]
+
+        if elapsed > previous * (1 + threshold) and elapsed - previous > min_ms:
+            regressions.append((name, previous, elapsed))
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark suite')
+    parser.add_argument('--sizes', type=str, default='1000,10000,100000,1000000',
+                        help='Comma separated list with the number of hosts of each DB')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of times each benchmark is repeated, the median time is used')
+    parser.add_argument('--output', type=str, default='benchmark_results.json',
+                        help='JSON file where the results are written')
+    parser.add_argument('--baseline', type=str, default=_baseline,
+                        help='JSON file written by a previous run to compare with, by default the stored baseline')
+    parser.add_argument('--no-baseline', action='store_true', help='Do not compare the results with a baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slow down over the baseline, 0.25 is 25%% slower')
+    parser.add_argument('--min-ms', type=float, default=5.0,
+                        help='Differences below this number of milliseconds are never a regression')
+    args = parser.parse_args()
+
+    results = dict()
+    relative = dict()
+
+    try:
+        for size in [int(value) for value in args.sizes.split(',')]:
+            for variables in (False, True):
+                prefix = '{}/{}/'.format(size, 'variables' if variables else 'plain')
+
+                for name, (elapsed, elapsed_relative) in bench(size, variables, args.repeat).items():
+                    results[prefix + name] = elapsed
+                    relative[prefix + name] = elapsed_relative
+                    print(' {:<52} {:>12.2f} ms'.format(prefix + name, elapsed))
+    finally:
+        ServersDB.clear_instances()
+        shutil.rmtree(os.path.dirname(get_config().get_db_file()), ignore_errors=True)
+
+    output = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+        'relative': relative,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2, sort_keys=True)
+
+    print("The results were written to {}".format(args.output))
+
+    if not args.no_baseline and os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(output, baseline, args.threshold, args.min_ms)
+
+        for name, previous, elapsed in regressions:
+            print(" REGRESSION {:<52} {:>12.2f} ms -> {:.2f} ms (+{:.0f}%)".format(
+                name, previous, elapsed, (elapsed / previous - 1) * 100))
+
+        if regressions:
+            exit(1)
+
+        print("No result is {:.0f}% slower than the baseline".format(args.threshold * 100))
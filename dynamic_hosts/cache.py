@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""cache.py
+====================================
+Created on: 18/10/2026
+"""
+
+import os
+import zlib
+
+from dynamic_hosts import profiler
+
+
+class InventoryCache:
+    """Persistent cache of rendered inventories
+
+    Each entry stores the exact bytes that were written for a query, together with the fingerprint
+    (size, modification time and inode) of the DB files that were used to render them. An entry is only
+    returned if the DB files still have the same fingerprint, so any change to the DB makes it stale.
+
+    This module must not import the database module, a cache hit is answered without loading
+    the DB, its schemas or jsonschema. For the same reason it only imports lightweight modules.
+
+    Attributes:
+        _db_file (str): The absolute path to the database file
+        _sqlite_file (str): The absolute path to the database file of the SQLite backend
+        _folder (str): The folder where the cache entries are stored
+    """
+
+    _folder_name = '.inventory_cache'
+
+    _db_file = ''
+    _sqlite_file = ''
+    _folder = ''
+
+    def __read_header(self, f, key):
+        """Reads the header line of an entry and returns True if it matches the key"""
+        name, fingerprint, query = key
+
+        return f.readline().decode().rstrip('\n') == '{} {}'.format(fingerprint, query)
+
+    def __fingerprint(self):
+        """Returns the fingerprint of the DB file, of its journal and of the SQLite file as a string"""
+        result = []
+
+        for file_name in (self._db_file, self._db_file + '.journal', self._sqlite_file):
+            try:
+                st = os.stat(file_name)
+                result.append('{}-{}-{}'.format(st.st_size, st.st_mtime_ns, st.st_ino))
+            except OSError:
+                result.append('missing')
+
+        return '/'.join(result)
+
+    def key(self, *query):
+        """Returns the key of a query
+
+        The key must be computed before the DB is read, so data rendered from a DB that changed
+        in the meantime is never stored under the new fingerprint.
+
+        :param query: The values that identify the query, e.g. the command and its filters
+        :return: A tuple with the name of the entry, the current fingerprint of the DB and the query
+        """
+        query = repr(query)
+        name = '{:08x}'.format(zlib.crc32(query.encode()))
+
+        return name, self.__fingerprint(), query
+
+    @profiler.timed
+    def send(self, key, stream):
+        """Writes a cached entry to a stream
+
+        :param key: A key returned by the key function
+        :param stream: A binary stream, e.g. sys.stdout.buffer
+        :return: True if the entry was found and written, otherwise False
+        """
+        try:
+            with open(os.path.join(self._folder, key[0]), 'rb') as f:
+                if not self.__read_header(f, key):
+                    return False
+
+                chunk = f.read(65536)
+
+                while chunk:
+                    stream.write(chunk)
+                    chunk = f.read(65536)
+        except OSError:
+            return False
+
+        return True
+
+    def get(self, key):
+        """Returns the bytes of a cached entry, or None if there is no valid entry for the key"""
+        try:
+            with open(os.path.join(self._folder, key[0]), 'rb') as f:
+                if not self.__read_header(f, key):
+                    return None
+
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        """Stores the bytes of a rendered query
+
+        :param key: A key returned by the key function before the DB was read
+        :param data: The bytes to store
+        :return: None
+        """
+        name, fingerprint, query = key
+        entry_file = os.path.join(self._folder, name)
+        temp_file = '{}.{}.tmp'.format(entry_file, os.getpid())
+
+        try:
+            os.makedirs(self._folder, exist_ok=True)
+
+            with open(temp_file, 'wb') as f:
+                f.write('{} {}\n'.format(fingerprint, query).encode())
+                f.write(data)
+
+            os.replace(temp_file, entry_file)
+        except OSError:
+            """The cache is only an optimization, a failure to store an entry is not an error"""
+            pass
+
+    def tee(self, key, chunks, stream):
+        """Writes chunks of bytes to a stream and stores them as a rendered query
+
+        The chunks are written to the stream as they are generated, so the whole output is never in memory.
+        The entry is only stored if every chunk was written.
+
+        :param key: A key returned by the key function before the DB was read
+        :param chunks: An iterable of bytes
+        :param stream: A binary stream, e.g. sys.stdout.buffer
+        :return: None
+        """
+        name, fingerprint, query = key
+        entry_file = os.path.join(self._folder, name)
+        temp_file = '{}.{}.tmp'.format(entry_file, os.getpid())
+        f = None
+
+        try:
+            os.makedirs(self._folder, exist_ok=True)
+
+            f = open(temp_file, 'wb')
+            f.write('{} {}\n'.format(fingerprint, query).encode())
+        except OSError:
+            """The cache is only an optimization, the chunks are still written to the stream"""
+            if f is not None:
+                f.close()
+
+            f = None
+
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+
+                if f is not None:
+                    try:
+                        f.write(chunk)
+                    except OSError:
+                        f.close()
+                        f = None
+
+            if f is not None:
+                try:
+                    f.close()
+                    os.replace(temp_file, entry_file)
+                except OSError:
+                    pass
+        finally:
+            """If the stream failed, the incomplete entry is removed"""
+            if f is not None and not f.closed:
+                f.close()
+
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+
+    def put_table(self, key, items):
+        """Stores a table of values that are looked up one by one
+
+        The table is a constant hash table: a header with the offset of each bucket followed by the
+        buckets, so a lookup reads a single bucket of a few lines whatever the size of the table.
+
+        :param key: A key returned by the key function before the DB was read
+        :param items: An iterable of (name, value) tuples, the names are strings and the values bytes.
+                      Neither of them can contain tabs or new lines, like host names and JSON documents.
+        :return: None
+        """
+        items = list(items)
+        count = len(items) // 8 + 1
+        buckets = [[] for _ in range(count)]
+
+        for name, value in items:
+            name = name.encode()
+            buckets[zlib.crc32(name) % count].append(name + b'\t' + value + b'\n')
+
+        offsets = [0]
+        for bucket in buckets:
+            offsets.append(offsets[-1] + sum(len(line) for line in bucket))
+
+        data = '{}\n'.format(count).encode()
+        data += b''.join(b'%016x' % offset for offset in offsets)
+        data += b''.join(b''.join(bucket) for bucket in buckets)
+
+        self.put(key, data)
+
+    @profiler.timed
+    def lookup(self, key, name, default=b''):
+        """Returns a value from a table stored with put_table
+
+        :param key: A key returned by the key function
+        :param name: The name of the value
+        :param default: The value returned if the table does not contain the name
+        :return: The value, the default value if the name is not in the table, or None if there
+                 is no valid table for the key
+        """
+        name = name.encode()
+
+        try:
+            with open(os.path.join(self._folder, key[0]), 'rb') as f:
+                if not self.__read_header(f, key):
+                    return None
+
+                count = int(f.readline())
+                table = f.tell()
+
+                f.seek(table + (zlib.crc32(name) % count) * 16)
+                start = int(f.read(16), 16)
+                end = int(f.read(16), 16)
+
+                f.seek(table + (count + 1) * 16 + start)
+                bucket = f.read(end - start)
+        except (OSError, ValueError):
+            return None
+
+        for line in bucket.splitlines():
+            entry, _, value = line.partition(b'\t')
+
+            if entry == name:
+                return value
+
+        return default
+
+    def invalidate(self):
+        """Removes all the entries of the cache"""
+        import shutil
+
+        shutil.rmtree(self._folder, ignore_errors=True)
+
+    def __init__(self, configuration):
+        """InventoryCache constructor
+
+        :param configuration: A configuration instance
+        """
+        self._db_file = configuration.get_db_file()
+        self._sqlite_file = configuration.get_sqlite_file()
+        self._folder = os.path.join(os.path.dirname(self._db_file), self._folder_name)
+
+
+class ResponseCache:
+    """In memory LRU cache of encoded responses
+
+    Each entry stores the header and the encoded body of a response, together with the revision of the
+    DBs it was computed from. An entry is only returned for the same revision, a newer revision replaces
+    it. The least recently used entries are evicted when there are more than max_entries or their bodies
+    take more than max_bytes.
+
+    The ETag of a response identifies its key and revision, and the instance that computed it, so a client
+    that holds the ETag of a response can ask whether it is still current without receiving it again.
+
+    Attributes:
+        _entries (OrderedDict): The revision, header and body of each entry, by key, the oldest first
+        _max_entries (int): The maximum number of entries
+        _max_bytes (int): The maximum size of the bodies of all the entries
+        _size (int): The size of the bodies of all the entries
+        _token (str): A random token of the instance, part of its ETags
+        _stats (dict): The number of hits, misses, evictions and not modified answers
+        _lock (Lock): Serializes the access to the entries
+    """
+
+    _entries = None
+    _max_entries = 128
+    _max_bytes = 256 * 1024 * 1024
+    _size = 0
+    _token = ''
+    _stats = None
+    _lock = None
+
+    def etag(self, key, revision):
+        """Returns the ETag of the response of a key at a revision
+
+        :param key: A tuple with the query and its filters
+        :param revision: The revision of the DBs
+        :return: A string
+        """
+        import hashlib
+
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+
+        return '"{}-{}-{}"'.format(self._token, revision, digest)
+
+    def not_modified(self, key, revision, etag):
+        """Returns True if an ETag is the current one of a key, and counts it
+
+        :param key: A tuple with the query and its filters
+        :param revision: The current revision of the DBs
+        :param etag: The ETag held by the client, or None
+        :return: True if the response of the client is still current
+        """
+        if not etag or etag != self.etag(key, revision):
+            return False
+
+        with self._lock:
+            self._stats['not_modified'] += 1
+
+        return True
+
+    def get(self, key, revision):
+        """Returns the header and the body of an entry
+
+        :param key: A tuple with the query and its filters
+        :param revision: The current revision of the DBs
+        :return: A tuple with the header dictionary and the body bytes, or None if there is no entry for
+                 the revision
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] != revision:
+                if entry is not None:
+                    self.__remove(key)
+
+                self._stats['misses'] += 1
+
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+
+            return dict(entry[1]), entry[2]
+
+    def put(self, key, revision, header, body):
+        """Stores a response, a body bigger than max_bytes is not stored
+
+        :param key: A tuple with the query and its filters
+        :param revision: The revision of the DBs the response was computed from
+        :param header: The header dictionary
+        :param body: The body bytes
+        :return: None
+        """
+        with self._lock:
+            if key in self._entries:
+                self.__remove(key)
+
+            if len(body) > self._max_bytes:
+                return
+
+            self._entries[key] = (revision, dict(header), body)
+            self._size += len(body)
+
+            while len(self._entries) > self._max_entries or self._size > self._max_bytes:
+                self.__remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def __remove(self, key):
+        self._size -= len(self._entries.pop(key)[2])
+
+    def clear(self):
+        """Removes all the entries"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self):
+        """Returns the counters of the cache, with its number of entries and their size in bytes"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._size)
+
+    def __init__(self, max_entries=128, max_bytes=256 * 1024 * 1024):
+        """ResponseCache constructor
+
+        :param max_entries: The maximum number of entries
+        :param max_bytes: The maximum size of the bodies of all the entries
+        """
+        import threading
+        from collections import OrderedDict
+
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._token = os.urandom(4).hex()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'not_modified': 0}
+        self._lock = threading.Lock()
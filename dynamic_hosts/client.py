@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""client.py
+====================================
+Created on: 18/10/2026
+
+Client of the inventory daemon.
+
+A request is a JSON document in a single line, with the query, 'list' or 'host', and the client, filters
+and storage backend of the configuration. The daemon answers with a JSON header in a single line, with
+the status and the length of the body, followed by the body, which is exactly what hosts.py writes to
+the standard output for the query.
+
+The header of a response has its ETag. A request with the ETag of a response that did not change is
+answered with the 'not_modified' status and an empty body.
+
+This module must stay lightweight, it is imported by the fast path of hosts.py.
+"""
+
+import json
+import socket
+
+"""Seconds to wait for the daemon before falling back to the DB"""
+_timeout = 10.0
+
+
+def build_request(configuration, query, host=None):
+    """Returns the request of a query for a configuration
+
+    :param configuration: A configuration instance
+    :param query: 'list' or 'host'
+    :param host: The host name of a 'host' query
+    :return: A dictionary
+    """
+    return {
+        'query': query,
+        'host': host,
+        'client': configuration.client,
+        'environment': configuration.environment,
+        'role': configuration.role,
+        'location': configuration.location,
+        'group': configuration.group,
+        'host_groups': configuration.host_groups,
+        'storage': configuration.storage,
+    }
+
+
+def query(socket_file, request, timeout=_timeout):
+    """Sends a request to the daemon
+
+    :param socket_file: The path of the socket of the daemon
+    :param request: A dictionary returned by build_request
+    :param timeout: Seconds to wait for the daemon
+    :return: A tuple with the header dictionary and the body bytes, or None if the daemon is not running,
+             did not answer in time or could not answer the query. If the request has the 'etag' of a
+             response that did not change, the header has the 'not_modified' status and the body is empty
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_file)
+            sock.sendall(json.dumps(request).encode() + b'\n')
+
+            with sock.makefile('rb') as f:
+                header = json.loads(f.readline())
+                body = f.read(header.get('length', 0))
+    except (OSError, ValueError):
+        return None
+
+    if header.get('status') not in ('ok', 'not_modified') or len(body) != header.get('length', 0):
+        return None
+
+    return header, body
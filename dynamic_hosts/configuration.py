@@ -14,15 +14,27 @@ class Config:
     All possible configurations will use this object as a base, inheriting the following private attributes:
 
     Attributes:
-        _client (str): The client's name
+        _client (str): The client's name, a comma separated list of names, or '*' for every client
         _environment (str): This attribute is used to perform searches in the database.
                             Sets the value of the ambient field.
         _group (str): This attribute is used to perform searches in the database.
                       Sets the value of the group field.
+        _host_groups (bool): Whether the inventory groups the hosts by environment, role and location.
+        _inventory_cache (bool): Whether the rendered inventories are cached on disk.
         _location (str): This attribute is used to perform searches in the database.
                          Sets the value of the location field.
+        _log_format (str): The format of the events written to the standard error, 'text' or 'json'.
+        _log_level (str): The minimum level of the events written, 'error', 'warning', 'info' or 'verbose'.
+        _profile (str): Where the timing report of the invocation is written, '-' for the standard error,
+                        the path of a file, or None if the invocation is not profiled.
+        _cprofile (str): The file where the cProfile statistics of the invocation are written, or None.
+        _daemon (bool): Whether the queries are sent to the inventory daemon when it is running.
         _servers_folder (str): The absolute path where the database will be stored.
         _servers_file (str): The name of the database file.
+        _storage (str): The storage backend of the database, 'json', 'journal' or 'sqlite'.
+        _stream_on_load (bool): Whether the database is read record by record when it is queried,
+                                instead of being loaded as a whole.
+        _validate_on_load (bool): Whether the whole database is validated when it is loaded.
         _verbose (int): The verbosity level
 
     For each of these attributes, a property has been created to obtain its value or establish a new value.
@@ -33,12 +45,23 @@ class Config:
     _client = ''
     _environment = ''
     _group = ''
+    _host_groups = False
     _role = ''
     _location = ''
 
     _servers_folder = ''
     _servers_file = ''
 
+    _validate_on_load = True
+    _inventory_cache = True
+    _storage = 'json'
+    _stream_on_load = False
+    _profile = None
+    _cprofile = None
+    _log_format = 'text'
+    _daemon = True
+    _log_level = 'verbose'
+
     @property
     def servers_folder(self):
         """Returns the absolute path of the DB's folder"""
@@ -60,6 +83,111 @@ class Config:
         if value:
             self._verbose = value
 
+    @property
+    def validate_on_load(self):
+        """Returns True if the whole DB must be validated when it is loaded"""
+        return self._validate_on_load
+
+    @validate_on_load.setter
+    def validate_on_load(self, value):
+        """Sets whether the whole DB must be validated when it is loaded"""
+        self._validate_on_load = bool(value)
+
+    @property
+    def stream_on_load(self):
+        """Returns True if the DB must be read record by record when it is queried"""
+        return self._stream_on_load
+
+    @stream_on_load.setter
+    def stream_on_load(self, value):
+        """Sets whether the DB must be read record by record when it is queried"""
+        self._stream_on_load = bool(value)
+
+    @property
+    def host_groups(self):
+        """Returns True if the inventory must group the hosts by environment, role and location"""
+        return self._host_groups
+
+    @host_groups.setter
+    def host_groups(self, value):
+        """Sets whether the inventory must group the hosts, the strings '1', 'true' and 'yes' are True"""
+        self._host_groups = value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+
+    @property
+    def daemon(self):
+        """Returns True if the queries must be sent to the inventory daemon when it is running"""
+        return self._daemon
+
+    @daemon.setter
+    def daemon(self, value):
+        """Sets whether the queries must be sent to the inventory daemon when it is running"""
+        self._daemon = bool(value)
+
+    @property
+    def log_format(self):
+        """Returns the format of the events, 'text' or 'json'"""
+        return self._log_format
+
+    @log_format.setter
+    def log_format(self, value):
+        """Sets the format of the events"""
+        if value:
+            self._log_format = value
+
+    @property
+    def log_level(self):
+        """Returns the minimum level of the events that are written"""
+        return self._log_level
+
+    @log_level.setter
+    def log_level(self, value):
+        """Sets the minimum level of the events that are written"""
+        if value:
+            self._log_level = value
+
+    @property
+    def profile(self):
+        """Returns where the timing report must be written, '-' for the standard error, or None"""
+        return self._profile
+
+    @profile.setter
+    def profile(self, value):
+        """Sets where the timing report must be written, '1' and 'stderr' are the standard error"""
+        if value:
+            self._profile = '-' if value in ('1', 'stderr') else value
+
+    @property
+    def cprofile(self):
+        """Returns the file where the cProfile statistics must be written, or None"""
+        return self._cprofile
+
+    @cprofile.setter
+    def cprofile(self, value):
+        """Sets the file where the cProfile statistics must be written"""
+        if value:
+            self._cprofile = value
+
+    @property
+    def inventory_cache(self):
+        """Returns True if the rendered inventories must be cached on disk"""
+        return self._inventory_cache
+
+    @inventory_cache.setter
+    def inventory_cache(self, value):
+        """Sets whether the rendered inventories must be cached on disk"""
+        self._inventory_cache = bool(value)
+
+    @property
+    def storage(self):
+        """Returns the name of the storage backend"""
+        return self._storage
+
+    @storage.setter
+    def storage(self, value):
+        """Sets the name of the storage backend"""
+        if value:
+            self._storage = value
+
     @property
     def client(self):
         """Returns the client name"""
@@ -71,6 +199,34 @@ class Config:
         if value:
             self._client = value
 
+    @property
+    def multi_client(self):
+        """Returns True if the configuration refers to several clients"""
+        return self._client == '*' or ',' in self._client
+
+    def get_clients(self):
+        """Returns the names of the clients of the configuration
+
+        If the client is '*', every folder of the servers folder that has a DB file is a client.
+
+        :return: A list with the names of the clients
+        """
+        if self._client != '*':
+            return [name.strip() for name in self._client.split(',') if name.strip()]
+
+        result = []
+        db_name = os.path.splitext(self._servers_file)[0]
+
+        if os.path.isdir(self.servers_folder):
+            for name in sorted(os.listdir(self.servers_folder)):
+                folder = os.path.join(self.servers_folder, name)
+
+                if os.path.isfile(os.path.join(folder, self._servers_file)) or \
+                        os.path.isfile(os.path.join(folder, db_name + '.sqlite')):
+                    result.append(name)
+
+        return result
+
     @property
     def environment(self):
         """Returns the value of the environment variable"""
@@ -115,6 +271,14 @@ class Config:
         """Returns the absolute path to the database file"""
         return os.path.abspath(os.path.join(self._servers_folder, self._client, self._servers_file))
 
+    def get_sqlite_file(self):
+        """Returns the absolute path to the database file of the SQLite storage backend"""
+        return os.path.splitext(self.get_db_file())[0] + '.sqlite'
+
+    def get_socket_file(self):
+        """Returns the absolute path to the socket of the inventory daemon, one for all the clients"""
+        return os.path.join(self.servers_folder, '.inventory.sock')
+
 
 class DevConfig(Config):
     """Development Configuration class
@@ -130,8 +294,14 @@ class DevConfig(Config):
         self.client = os.environ.get('THE_CLIENT')
         self.environment = os.environ.get('THE_ENVIRONMENT')
         self.group = os.environ.get('THE_GROUP')
+        self.host_groups = os.environ.get('THE_HOST_GROUPS')
         self.role = os.environ.get('THE_ROLE')
         self.location = os.environ.get('THE_LOCATION')
+        self.storage = os.environ.get('THE_STORAGE')
+        self.profile = os.environ.get('THE_PROFILE')
+        self.cprofile = os.environ.get('THE_CPROFILE')
+        self.log_format = os.environ.get('THE_LOG_FORMAT')
+        self.log_level = os.environ.get('THE_LOG_LEVEL')
 
         if not self.client:
             self.client = 'test_dev'
@@ -151,8 +321,14 @@ class TestConfig(Config):
         self.client = os.environ.get('THE_CLIENT')
         self.environment = os.environ.get('THE_ENVIRONMENT')
         self.group = os.environ.get('THE_GROUP')
+        self.host_groups = os.environ.get('THE_HOST_GROUPS')
         self.role = os.environ.get('THE_ROLE')
         self.location = os.environ.get('THE_LOCATION')
+        self.storage = os.environ.get('THE_STORAGE')
+        self.profile = os.environ.get('THE_PROFILE')
+        self.cprofile = os.environ.get('THE_CPROFILE')
+        self.log_format = os.environ.get('THE_LOG_FORMAT')
+        self.log_level = os.environ.get('THE_LOG_LEVEL')
 
         if not self.client:
             self.client = 'test_test'
@@ -172,8 +348,14 @@ class ProdConfig(Config):
         self.client = os.environ.get('THE_CLIENT')
         self.environment = os.environ.get('THE_ENVIRONMENT')
         self.group = os.environ.get('THE_GROUP')
+        self.host_groups = os.environ.get('THE_HOST_GROUPS')
         self.role = os.environ.get('THE_ROLE')
         self.location = os.environ.get('THE_LOCATION')
+        self.storage = os.environ.get('THE_STORAGE')
+        self.profile = os.environ.get('THE_PROFILE')
+        self.cprofile = os.environ.get('THE_CPROFILE')
+        self.log_format = os.environ.get('THE_LOG_FORMAT')
+        self.log_level = os.environ.get('THE_LOG_LEVEL')
 
         if not self.client:
             self.client = 'test_prod'
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""daemon.py
+====================================
+Created on: 18/10/2026
+"""
+
+from dynamic_hosts.cache import ResponseCache
+from dynamic_hosts.database import ServersDB
+from dynamic_hosts.dynamic_hosts import DynamicHosts
+from dynamic_hosts.watcher import FileWatcher
+
+import os
+import copy
+import json
+import socket
+import asyncio
+import threading
+import dynamic_hosts.logger.logger as log
+
+from concurrent.futures import ThreadPoolExecutor
+
+_max_workers = 8
+
+"""Bounds of the cache of encoded responses"""
+_cache_entries = 128
+_cache_bytes = 256 * 1024 * 1024
+
+
+class InventoryDaemon:
+    """Inventory daemon
+
+    Answers the --list and --host queries of hosts.py over a unix socket, from the DBs of the clients kept
+    in memory. Each client has a single ServersDB instance, which is reloaded only when its files change,
+    so a query does not import jsonschema, load or validate the DB, it only filters the records and encodes
+    the result. The requests and responses are described in the client module.
+
+    The files of the preloaded clients are watched, when they change the DB is reloaded in the background
+    and only the records that changed are validated, see ServersDB.reload.
+
+    The connections are handled by an asyncio event loop, which never blocks on a query: the queries run
+    in a pool of threads. Identical requests that arrive while the first one is running wait for its
+    result, so many Ansible runs that ask for the same inventory at the same time compute it once.
+
+    The encoded responses are kept in a bounded LRU cache, by query and filters, until the revision of
+    their DBs changes, so a repeated query does not build or encode the inventory again. Each response
+    has an ETag, a client that sends the ETag it holds gets a 'not_modified' answer without a body if
+    the response did not change.
+
+    Attributes:
+        _config (Config): The configuration of the daemon, the requests bring their own client and filters
+        _lock (Lock): Held while the DBs are loaded, refreshed or reloaded, the queries read them outside of it
+        _socket (socket): The listening unix socket
+        _executor (ThreadPoolExecutor): The threads that run the queries
+        _inflight (dict): The future of each request that is running, by its request line
+        _stats (dict): The number of requests received, computed and coalesced with a running request
+        _cache (ResponseCache): The encoded responses, by query and filters
+        _loop (AbstractEventLoop): The event loop, once serve_forever is running
+        _stopped (Event): Set in the event loop to stop serve_forever
+        _ready (Event): Set once the event loop accepts connections
+        _watcher (FileWatcher): The watcher of the files of the DBs, None if they are not watched
+        _log (Logger): An instance to the event logger object
+    """
+
+    _config = None
+    _lock = None
+    _socket = None
+    _executor = None
+    _inflight = None
+    _stats = None
+    _cache = None
+    _loop = None
+    _stopped = None
+    _ready = None
+    _watcher = None
+    _log = log.Logger()
+
+    def __configuration(self, request):
+        """Returns the configuration of a request"""
+        config = copy.copy(self._config)
+        config.client = request.get('client')
+        config.environment = request.get('environment')
+        config.role = request.get('role')
+        config.location = request.get('location')
+        config.group = request.get('group')
+        config.host_groups = request.get('host_groups', False)
+        config.storage = request.get('storage')
+
+        return config
+
+    def __client_configuration(self, client):
+        """Returns the configuration of the DB of a client"""
+        config = copy.copy(self._config)
+        config.client = client
+
+        return config
+
+    def __check_clients(self, config):
+        """Raises an exception if a client of a request has no DB, before any folder is created for it"""
+        for client in config.get_clients():
+            client_config = self.__client_configuration(client)
+            db_file = client_config.get_db_file()
+
+            if client in ('.', '..') or os.path.basename(client) != client or \
+                    not any(os.path.isfile(name) for name in (db_file, db_file + '.journal',
+                                                              client_config.get_sqlite_file())):
+                raise Exception("Unknown client {}".format(client))
+
+    def __reload(self, client):
+        """Reloads the DB of a client after its files changed, it is called by the watcher"""
+        try:
+            with self._lock:
+                ServersDB(self.__client_configuration(client))
+        except Exception as ex:
+            self._log.log_error("The database of {} could not be reloaded: {}", client, ex)
+
+    def preload(self):
+        """Loads the DB of every client of the servers folder and watches their files
+
+        :return: The number of loaded clients
+        """
+        clients = self._config.get_clients()
+
+        for client in clients:
+            config = self.__client_configuration(client)
+
+            with self._lock:
+                ServersDB(config)
+
+            if self._watcher is not None:
+                self._watcher.add(client, [config.get_db_file(), config.get_db_file() + '.journal',
+                                           config.get_sqlite_file()])
+
+        return len(clients)
+
+    def answer(self, line):
+        """Answers a request
+
+        :param line: The request, a JSON document
+        :return: A tuple with the header dictionary and the body bytes
+        """
+        try:
+            request = json.loads(line)
+            config = self.__configuration(request)
+            query = request.get('query')
+
+            if query not in ('list', 'host'):
+                raise Exception("Unknown query {}".format(query))
+
+            key = (query, request.get('host') if query == 'host' else None, config.client, config.environment,
+                   config.role, config.location, config.group, config.host_groups, config.storage)
+
+            self.__check_clients(config)
+
+            """A reload replaces the records of a DB at once, so the queries run in parallel outside of the lock"""
+            with self._lock:
+                dyn_hosts = DynamicHosts(config)
+                revision = dyn_hosts.get_revision()
+
+            etag = self._cache.etag(key, revision)
+
+            if self._cache.not_modified(key, revision, request.get('etag')):
+                return {'status': 'not_modified', 'etag': etag}, b''
+
+            cached = self._cache.get(key, revision)
+
+            if cached is not None:
+                return cached
+
+            if query == 'list':
+                result = dyn_hosts.get_list()
+                header = {'status': 'ok', 'etag': etag, 'collisions': dyn_hosts.get_collisions()}
+            else:
+                result = dyn_hosts.get_host(request.get('host'))
+                header = {'status': 'ok', 'etag': etag}
+
+            body = json.dumps(result).encode()
+            self._cache.put(key, revision, header, body)
+
+            return header, body
+        except Exception as ex:
+            if self._config.verbose > 0:
+                self._log.log_error(ex)
+
+            return {'status': 'error', 'message': str(ex)}, b''
+
+    def get_stats(self):
+        """Returns the number of requests received, computed and coalesced with a running request,
+        and the counters of the cache of responses under 'cache'"""
+        return dict(self._stats, cache=self._cache.get_stats())
+
+    @staticmethod
+    def __query(line):
+        """Returns the query of a request line, None if it is not valid"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return None
+
+        return request.get('query') if isinstance(request, dict) else None
+
+    async def __answer(self, line):
+        """Answers a request in the thread pool, or waits for an identical request that is running"""
+        key = line.strip()
+        self._stats['requests'] += 1
+
+        if self.__query(key) == 'stats':
+            return {'status': 'ok'}, json.dumps(self.get_stats()).encode()
+
+        future = self._inflight.get(key)
+
+        if future is None:
+            self._stats['computed'] += 1
+
+            future = self._loop.run_in_executor(self._executor, self.answer, key)
+            future.add_done_callback(lambda done: self._inflight.pop(key, None))
+
+            self._inflight[key] = future
+        else:
+            self._stats['coalesced'] += 1
+
+        """A client that disconnects does not cancel the query of the others"""
+        header, body = await asyncio.shield(future)
+
+        return dict(header), body
+
+    async def __handle(self, reader, writer):
+        """Answers the requests of a connection, one per line"""
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                header, body = await self.__answer(line)
+                header['length'] = len(body)
+
+                writer.write(json.dumps(header).encode() + b'\n' + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def __serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+
+        server = await asyncio.start_unix_server(self.__handle, sock=self._socket, backlog=socket.SOMAXCONN)
+
+        self._ready.set()
+
+        async with server:
+            await self._stopped.wait()
+
+    def serve_forever(self):
+        """Answers the requests until shutdown is called, then removes the socket
+
+        The log lines are written at once while the daemon runs, it does not exit to flush them.
+        """
+        log.Logger.configure(line_buffered=True)
+
+        if self._watcher is not None:
+            self._watcher.start()
+
+        try:
+            asyncio.run(self.__serve())
+        finally:
+            self._ready.set()
+            self.close()
+
+    def shutdown(self):
+        """Stops serve_forever, it must be called from another thread"""
+        self._ready.wait()
+
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def close(self):
+        """Stops the watcher and the threads, closes the socket and removes its file"""
+        if self._watcher is not None:
+            self._watcher.stop()
+
+        self._executor.shutdown(wait=False)
+        self._socket.close()
+
+        try:
+            os.remove(self._config.get_socket_file())
+        except FileNotFoundError:
+            pass
+
+    def __init__(self, configuration, watch=True):
+        """InventoryDaemon constructor
+
+        The socket is created at the path returned by get_socket_file of the configuration, with access only
+        for the user of the daemon. A socket left by a daemon that is not running is replaced.
+
+        :param configuration: A configuration instance
+        :param watch: False if the files of the DBs must not be watched, they are then checked on each query
+        """
+        self._config = copy.copy(configuration)
+        self._config.stream_on_load = False
+        self._config.inventory_cache = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix='InventoryDaemon')
+        self._inflight = dict()
+        self._stats = {'requests': 0, 'computed': 0, 'coalesced': 0}
+        self._cache = ResponseCache(_cache_entries, _cache_bytes)
+        self._ready = threading.Event()
+        self._watcher = FileWatcher(self.__reload) if watch else None
+
+        socket_file = self._config.get_socket_file()
+
+        if os.path.exists(socket_file):
+            if self.__answers(socket_file):
+                raise Exception("The daemon is already running on {}".format(socket_file))
+
+            os.remove(socket_file)
+
+        os.makedirs(os.path.dirname(socket_file), exist_ok=True)
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+
+        try:
+            self._socket.bind(socket_file)
+        finally:
+            os.umask(umask)
+
+        self._socket.listen(socket.SOMAXCONN)
+
+    @staticmethod
+    def __answers(socket_file):
+        """Returns True if something accepts connections on the socket"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(socket_file)
+            except OSError:
+                return False
+
+        return True
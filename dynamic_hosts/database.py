@@ -6,19 +6,172 @@ Created on: 08/02/2019
 """
 
 import os
+import csv
 import json
-import jsonschema
+import itertools
+import threading
 import dynamic_hosts.logger.logger as log
 
+from collections.abc import Mapping
+from dynamic_hosts import profiler
+from dynamic_hosts.cache import InventoryCache
+from dynamic_hosts.filters import HostFilter
+from dynamic_hosts.record import Record
+from dynamic_hosts.record import json_default
+from dynamic_hosts.storage import get_storage
+
+_schemas_folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), "db")
+_schemas = {}
+_validator_class = None
+"""Revisions of the loaded DBs, unique within the process"""
+_revisions = itertools.count(1)
+"""Fields that a bulk update can change"""
+_settable_fields = ('environment', 'role', 'location')
+_array_keywords = {'$schema', '$id', 'definitions', 'title', 'description', 'type', 'items', 'uniqueItems'}
+
+
+class Registry(type):
+    """Metaclass that keeps a single instance per DB
+
+    The instances are registered by the absolute path of their DB file and their storage backend. Creating
+    an instance for a DB that is already registered returns the registered instance, after its refresh
+    function checks it against the new configuration. Instances of different DBs are created in parallel.
+
+    Attributes:
+        _instances (dict): The registered instances by their class, DB file and storage backend
+        _locks (dict): The lock of each key, held while its instance is created or refreshed
+        _lock (Lock): Protects the dictionary of locks
+    """
+    _instances = {}
+    _locks = {}
+    _lock = threading.Lock()
+
+    def __call__(cls, configuration):
+        key = (cls, os.path.abspath(configuration.get_db_file()), configuration.storage)
+
+        with Registry._lock:
+            lock = Registry._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            instance = Registry._instances.get(key)
+
+            if instance is None:
+                instance = super(Registry, cls).__call__(configuration)
+                Registry._instances[key] = instance
+            else:
+                instance.refresh(configuration)
+
+        return instance
+
+    def clear_instances(cls):
+        """Forgets the registered instances of the class, the next instances are created again"""
+        with Registry._lock:
+            for key in [key for key in Registry._instances if key[0] is cls]:
+                del Registry._instances[key]
+
+
+def _get_schema(name):
+    """Returns a DB schema and its compiled validator
+
+    Schemas are loaded and compiled once per process and shared by every Server and ServersDB
+    instance, they are only reloaded when the modification time of the schema file changes.
+
+    jsonschema is imported here and not at the top of the module, so the invocations that do not
+    validate anything never pay for its import.
+
+    :param name: The name of the schema file, e.g. 'record.schema.json'
+    :return: A tuple with the schema dictionary and its validator, a Draft4Validator for which any
+             mapping is an object
+    """
+    import jsonschema
+
+    global _validator_class
+
+    if _validator_class is None:
+        """The records of the DB are Record mappings, not only dictionaries"""
+        type_checker = jsonschema.Draft4Validator.TYPE_CHECKER.redefine(
+            'object', lambda checker, instance: isinstance(instance, Mapping))
+        _validator_class = jsonschema.validators.extend(jsonschema.Draft4Validator, type_checker=type_checker)
+
+    schema_file = os.path.join(_schemas_folder, name)
+
+    try:
+        mtime = os.stat(schema_file).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    cached = _schemas.get(name)
+
+    if cached is None or cached[0] != mtime:
+        schema = {}
+
+        if mtime is not None:
+            with open(schema_file) as f:
+                schema = json.load(f)
+
+        cached = (mtime, schema, _validator_class(schema))
+        _schemas[name] = cached
+
+    return cached[1], cached[2]
+
+
+def _validation_errors(validator, data):
+    """Validates data with a validator returned by _get_schema
+
+    :param validator: A compiled validator
+    :param data: The data to validate
+    :return: A list with the validation errors sorted by their description
+    """
+    import jsonschema
+
+    try:
+        return sorted(validator.iter_errors(data), key=str)
+    except jsonschema.ValidationError as e:
+        return [e]
+
+
+def _db_validation_errors(servers):
+    """Validates a whole DB against the DB schema
+
+    The DB schema is an array of unique records. jsonschema checks uniqueItems comparing every pair of
+    records, which takes hours with a million records, so each record is validated with the schema of
+    the items instead, and only the records with the same host, the only ones that can be equal, are
+    compared. Any other kind of schema is validated by jsonschema.
+
+    :param servers: The list of records of the DB
+    :return: A list with the validation errors, in the order of the records
+    """
+    import jsonschema
+
+    schema, validator = _get_schema("db.schema.json")
+
+    if not isinstance(servers, list) or not isinstance(schema.get('items'), dict) \
+            or schema.get('type') != 'array' or not set(schema) <= _array_keywords:
+        return _validation_errors(validator, servers)
+
+    items_validator = validator.evolve(schema=schema['items'])
+    unique = schema.get('uniqueItems', False)
+    hosts = dict()
+    result = []
+
+    for idx, entry in enumerate(servers):
+        for error in _validation_errors(items_validator, entry):
+            error.path.appendleft(idx)
+            result.append(error)
 
-class Singleton(type):
-    """Singleton base class"""
-    instance = None
+        if unique:
+            host = entry.get('host') if isinstance(entry, Mapping) else None
+            others = hosts.setdefault(host if isinstance(host, str) else None, [])
 
-    def __call__(cls, *args, **kw):
-        if not cls.instance:
-            cls.instance = super(Singleton, cls).__call__(*args, **kw)
-        return cls.instance
+            for other in others:
+                if servers[other] == entry:
+                    result.append(jsonschema.ValidationError(
+                        "The records {} and {} are equal, the records must be unique".format(other, idx)))
+                    break
+
+            others.append(idx)
+
+    return result
 
 
 def _request_data(field):
@@ -64,6 +217,50 @@ def _request_change_data(field, value):
     return result
 
 
+def _read_records(file_name):
+    """This is a trivial help function
+
+    It reads a file with server records and yields them one by one, without loading the whole file.
+
+    Files with the '.csv' extension are read as CSV files with a header line, any column that is not
+    a required field is considered a host variable. Any other file is read as JSON Lines, one JSON
+    object per line.
+
+    :param file_name: The path of the file to read
+    :return: A generator of tuples with the line number and the record. Lines that can not be parsed
+             are returned as strings instead of dictionaries.
+    """
+    required = ['host', 'environment', 'role', 'location']
+
+    with open(file_name, newline='') as f:
+        if os.path.splitext(file_name)[1].lower() == '.csv':
+            reader = csv.DictReader(f)
+
+            for row in reader:
+                record = dict()
+                host_vars = dict()
+
+                for k, v in row.items():
+                    if k in required:
+                        record[k] = v
+                    elif k and v:
+                        host_vars[k] = v
+
+                if len(host_vars) > 0:
+                    record['variables'] = host_vars
+
+                yield reader.line_num, record
+        else:
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError:
+                    yield line_num, line
+
+
 class Server:
     """Object that represents a Server
 
@@ -72,21 +269,16 @@ class Server:
 
     _verbose = 0
     _schema = {}
-    _server = {}
+    _validator = None
+    _server = None
     _logger = log.Logger()
 
     def __schema_validation(self, data):
         result = True
 
-        try:
-            v = jsonschema.Draft4Validator(self._schema)
-            for error in sorted(v.iter_errors(data), key=str):
-                if self._verbose > 0:
-                    self._logger.log_error(error)
-                result = False
-        except jsonschema.ValidationError as e:
+        for error in _validation_errors(self._validator, data):
             if self._verbose > 0:
-                self._logger.log_error(e.message)
+                self._logger.log_error(error)
             result = False
 
         return result
@@ -126,12 +318,10 @@ class Server:
         """
 
         self._verbose = verbose
+        self._server = {}
 
-        '''Loads the db data'''
-        _server_schema_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), "db", "record.schema.json")
-        if os.path.isfile(_server_schema_file):
-            with open(_server_schema_file) as f:
-                self._schema = json.load(f)
+        '''Loads the record schema'''
+        self._schema, self._validator = _get_schema("record.schema.json")
 
         if not data:
             for f in self._schema['required']:
@@ -144,49 +334,219 @@ class Server:
         else:
             if not self.__validate(data):
                 raise Exception("Invalid data")
+            elif isinstance(data, Record):
+                """The data of a Server can be changed, so it is not the compact record of the DB"""
+                self._server = data.to_dict()
             else:
                 self._server = data
 
 
-class ServersDB:
-    """Object that manages the functions of the database"""
+class ServersDB(metaclass=Registry):
+    """Object that manages the functions of the database
+
+    With a lazy storage backend, like SQLite, the DB is not loaded when the object is created. Queries
+    by host or by environment, role and location are answered by the backend, and the whole DB is only
+    loaded when a function needs every record.
+
+    The records of the DB are kept as Record instances, compact read only mappings with the same keys
+    and values as their data dictionaries.
+
+    If the configuration streams the DB on load, the other backends are not loaded either. Queries read
+    the DB record by record and keep only the matching records, and the whole DB is loaded, and validated,
+    before it is changed.
+
+    There is a single instance per DB file and storage backend, see Registry. Creating a ServersDB for a
+    DB that is already loaded returns the loaded instance, it is only loaded again if its files changed.
+
+    Each instance has a revision, which changes whenever its records are loaded, reloaded with changes
+    or saved, so the results computed from a revision can be reused while it does not change.
+    """
 
-    __metaclass__ = Singleton
     _db_file = ''
+    _storage = None
     _config = None
     _log = log.Logger()
-    _schema = {}
-    _servers = []
+    _servers = None
+    _index = None
+    _validated = False
+    _revision = 0
+
+    def __new_revision(self):
+        """Gives the instance a new revision, after its records changed"""
+        self._revision = next(_revisions)
+
+    def __build_index(self):
+        """Builds the host index of the database
+
+        The index maps each host name to its position in the list of servers,
+        so lookups, duplicate checks, updates and deletions do not need to scan the whole list.
+        """
+        index = {}
+
+        for idx, entry in enumerate(self._servers):
+            if isinstance(entry, Mapping) and 'host' in entry:
+                index.setdefault(entry['host'], idx)
+
+        self._index = index
+
+    @profiler.timed
+    def __load(self, again=False):
+        """Loads the whole DB, if the storage backend did not load it yet
+
+        The DB is validated if the configuration requires it, a DB that is not valid is not loaded.
+        The loaded records replace the previous ones at once, so a query that is reading them is
+        not affected.
+
+        :param again: True to load the DB even if it is already loaded
+        """
+        if self._servers is None or again:
+            servers = self._storage.load()
+
+            if not self._storage.lazy and servers and self._config.validate_on_load \
+                    and not self.__validate_db(servers):
+                self._servers = None
+                self._index = None
 
-    def __validate_db(self):
+                raise Exception("There is a corruption in the database")
+
+            self._validated = self._config.validate_on_load
+            self._servers = [Record.from_dict(entry) for entry in servers]
+
+            self.__build_index()
+            self.__new_revision()
+
+    def __writable(self):
+        """Loads the whole DB before it is changed, unless the storage backend applies the changes by itself"""
+        if not self._storage.lazy:
+            self.__load()
+
+    def __stream(self):
+        """Reads the records of the DB one by one
+
+        Each record is validated against the record schema as it is read, and its host must not be
+        in any of the records read before it, like the validation of the whole DB requires.
+
+        :return: A generator of records
+        """
+        validator = _get_schema("record.schema.json")[1] if self._config.validate_on_load else None
+        hosts = set()
+
+        for record in self._storage.iter_records():
+            if validator is not None:
+                errors = _validation_errors(validator, record)
+
+                if not errors and record['host'] in hosts:
+                    errors = ["Duplicated host {}".format(record['host'])]
+
+                if errors:
+                    if self._config.verbose > 0:
+                        for error in errors:
+                            self._log.log_error(error)
+
+                    raise Exception("There is a corruption in the database")
+
+                hosts.add(record['host'])
+
+            yield Record.from_dict(record)
+
+    def __has_host(self, host):
+        """Returns True if a host is in the DB"""
+        if self._servers is None:
+            return self.get_host(host) is not None
+
+        return host in self._index
+
+    @profiler.timed
+    def __validate_db(self, servers):
         """Validate the database information against the schema"""
         result = True
 
-        try:
-            v = jsonschema.Draft4Validator(self._schema)
-            for error in sorted(v.iter_errors(self._servers), key=str):
+        for error in _db_validation_errors(servers):
+            if self._config.verbose > 0:
+                self._log.log_error(error)
+            result = False
+
+        return result
+
+    def __validate_records(self, records):
+        """Validate only the given records against the record schema
+
+        The uniqueness of the hosts is not checked here, it is guaranteed by the host index
+        before any record is inserted.
+        """
+        result = True
+
+        _, validator = _get_schema("record.schema.json")
+
+        for record in records:
+            for error in _validation_errors(validator, record):
                 if self._config.verbose > 0:
                     self._log.log_error(error)
                 result = False
-        except jsonschema.ValidationError as e:
-            if self._config.verbose > 0:
-                self._log.log_error(e.message)
-            result = False
 
         return result
 
-    def __save(self):
+    def __merge(self, operations):
+        """Applies the operations over the DB stored by another process
+
+        It is called with the DB locked, when the DB files changed after they were loaded. If a host that
+        is being added was already added by the other process nothing is changed.
+
+        :param operations: The list of (operation, data) tuples that are going to be saved
+        :return: None
+        """
+        if self._servers is None:
+            """The backend applies the operations by itself, only the new hosts must be checked"""
+            for operation, data in operations:
+                if operation == 'add' and self._storage.get(data['host']) is not None:
+                    raise Exception("Duplicated data")
+
+            return
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("The database was changed by another process, reloading it")
+
+        servers = self._storage.load()
+        hosts = set(entry['host'] for entry in servers if isinstance(entry, Mapping) and 'host' in entry)
+
+        for operation, data in operations:
+            if operation == 'add' and data['host'] in hosts:
+                raise Exception("Duplicated data")
+
+        self._servers = [Record.from_dict(entry) for entry in self._storage.replay(servers, operations)]
+
+        self.__build_index()
+        self.__new_revision()
+
+    @profiler.timed
+    def __save(self, operations=None):
         """Save changes on the DB
 
+        :param operations: The list of (operation, data) tuples applied to the DB, where operation is 'add',
+                           'update' or 'delete', and data is the record or, for a deletion, the host name.
+                           Only the added or updated records are validated, if omitted then the whole DB
+                           is validated.
         :return: True if the information to be stored meets the requirements of the schema,
                  otherwise an exception will be thrown.
+
+        The DB is locked while it is written. If another process saved the DB after it was loaded,
+        the operations are applied over its changes, a whole DB save overwrites them.
         """
 
-        result = self.__validate_db()
+        if operations is None:
+            result = self.__validate_db(self._servers)
+        else:
+            result = self.__validate_records([data for operation, data in operations if operation != 'delete'])
 
         if result:
-            with open(self._db_file, 'w') as outfile:
-                json.dump(self._servers, outfile)
+            with self._storage.lock():
+                if operations is not None and (self._servers is None or self._storage.changed()):
+                    self.__merge(operations)
+
+                self._storage.save(self._servers, operations)
+
+            self.__new_revision()
+            InventoryCache(self._config).invalidate()
         else:
             if self._config.verbose > 0:
                 self._log.log_verbose("Failure to save the data, check the structure of the database")
@@ -280,15 +640,18 @@ class ServersDB:
         if self._config.verbose > 0:
             self._log.log_verbose("Adding new server")
 
+        self.__writable()
+
         if server_data is None:
             server_data = Server(server_data)
 
-        for entry in self._servers:
-            if server_data.is_equal(entry):
-                if self._config.verbose > 0:
-                    self._log.log_verbose("Duplicate value: {}".format(json.dumps(entry)))
+        host = server_data.get_data()['host']
 
-                raise Exception("Duplicated data")
+        if self.__has_host(host):
+            if self._config.verbose > 0:
+                self._log.log_verbose("Duplicate value: {}", json.dumps(self.get_host(host), default=json_default))
+
+            raise Exception("Duplicated data")
 
         if allow_host_vars:
             host_vars = self.__request_vars_data()
@@ -296,9 +659,82 @@ class ServersDB:
             if len(host_vars) > 0:
                 server_data.add_field('variables', host_vars)
 
-        self._servers.append(server_data.get_data())
+        if self._servers is not None:
+            self._servers.append(Record.from_dict(server_data.get_data()))
+            self._index[host] = len(self._servers) - 1
+
+        self.__save([('add', server_data.get_data())])
+
+    def import_servers(self, records):
+        """This function adds a batch of new records to the DB
+
+        Each record is checked against the record schema and against the hosts already in the DB or
+        in the batch. Invalid or duplicated records are reported and skipped, the rest of the batch
+        is stored with a single validation and a single write of the DB.
+
+        :param records: An iterable of tuples with the position and the data dictionary of each record
+        :return: A tuple with the number of imported records and a list of (position, error) tuples
+        """
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("Importing servers")
+
+        self.__writable()
+
+        imported = []
+        errors = []
+        hosts = set()
+
+        for position, data in records:
+            if not isinstance(data, dict) or not data:
+                """An empty dictionary would make Server ask for the fields of the record"""
+                errors.append((position, "Malformed record"))
+                continue
+
+            try:
+                server_data = Server(data)
+            except Exception as ex:
+                errors.append((position, str(ex)))
+                continue
+
+            host = data['host']
+
+            if host in hosts or self.__has_host(host):
+                errors.append((position, "Duplicated data: {}".format(host)))
+                continue
+
+            hosts.add(host)
+            imported.append(server_data.get_data())
+
+        if imported:
+            if self._servers is not None:
+                for entry in imported:
+                    self._servers.append(Record.from_dict(entry))
+                    self._index[entry['host']] = len(self._servers) - 1
+
+            try:
+                self.__save([('add', entry) for entry in imported])
+            except Exception:
+                """Nothing was stored, so the batch is discarded"""
+                if self._servers is not None:
+                    self._servers = [entry for entry in self._servers if entry.get('host') not in hosts]
+
+                    self.__build_index()
+
+                raise
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("{} servers imported, {} records rejected", len(imported), len(errors))
+
+        return len(imported), errors
 
-        self.__save()
+    def import_file(self, file_name):
+        """This function adds the records of a JSON Lines or CSV file to the DB
+
+        :param file_name: The path of the file with the new records
+        :return: A tuple with the number of imported records and a list of (line, error) tuples
+        """
+        return self.import_servers(_read_records(file_name))
 
     def update_server(self, new_server_data):
         """This function updates information of a server
@@ -310,6 +746,8 @@ class ServersDB:
         if self._config.verbose > 0:
             self._log.log_verbose("Updating server information")
 
+        self.__writable()
+
         result = False
 
         if not new_server_data:
@@ -321,19 +759,16 @@ class ServersDB:
             else:
                 raise Exception("No record in the database matches the host")
 
-        idx = 0
-        for entry in self._servers:
-            if new_server_data.is_equal(entry):
-                self._servers[idx] = new_server_data.get_data()
-
-                if self._config.verbose > 0:
-                    self._log.log_verbose("New Server data: " + entry.get_data())
+        data = new_server_data.get_data()
 
-                result = self.__save()
+        if self.__has_host(data['host']):
+            if self._servers is not None:
+                self._servers[self._index[data['host']]] = Record.from_dict(data)
 
-                break
+            if self._config.verbose > 0:
+                self._log.log_verbose("New Server data: {}", json.dumps(data, default=json_default))
 
-            idx += 1
+            result = self.__save([('update', data)])
 
         return result
 
@@ -347,21 +782,133 @@ class ServersDB:
         if self._config.verbose > 0:
             self._log.log_verbose("Deleting server data from DB")
 
+        self.__writable()
+
         result = False
-        idx = 0
+        host = server_data.get_data()['host']
 
-        for entry in self._servers:
-            if server_data.is_equal(entry):
+        if self.__has_host(host):
+            if self._servers is not None:
+                idx = self._index.pop(host)
                 del self._servers[idx]
 
-                result = self.__save()
-
-                break
+                """Entries after the deleted one have moved one position back"""
+                for position in range(idx, len(self._servers)):
+                    self._index[self._servers[position]['host']] = position
 
-            idx += 1
+            result = self.__save([('delete', host)])
 
         return result
 
+    @staticmethod
+    def __check_changes(changes):
+        """Validates the new values of the fields of a bulk update, against the record schema"""
+        if not changes:
+            raise Exception("There are no fields to change")
+
+        schema, validator = _get_schema("record.schema.json")
+
+        for field, value in changes.items():
+            if field not in _settable_fields:
+                raise Exception("The field {} can not be changed, only {} can".format(field,
+                                                                                     ', '.join(_settable_fields)))
+
+            for error in _validation_errors(validator.evolve(schema=schema['properties'][field]), value):
+                raise Exception("Invalid value '{}' of the field {}: {}".format(value, field, error.message))
+
+    def update_where(self, host_filter, changes):
+        """This function changes the fields of every record that matches a filter
+
+        The new values are validated first, then the DB is scanned once and the changed records are
+        stored with a single save. If the save fails nothing is stored.
+
+        :param host_filter: A HostFilter instance with at least one filter, the records it matches are changed
+        :param changes: A dictionary with the new environment, role or location, e.g. {'location': 'GDL'}
+        :return: A tuple with the number of matching records and the number of changed records
+        """
+        if host_filter.empty:
+            raise Exception("At least one filter is needed to select the records")
+
+        self.__check_changes(changes)
+
+        matches = host_filter.matches
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("Updating the servers that match {}", host_filter)
+
+        self.__load()
+
+        matched = 0
+        updated = dict()
+
+        for idx, entry in enumerate(self._servers):
+            if matches(entry):
+                matched += 1
+                data = dict(entry, **changes)
+
+                if data != entry:
+                    updated[idx] = data
+
+        if updated:
+            previous = {idx: self._servers[idx] for idx in updated}
+
+            for idx, data in updated.items():
+                self._servers[idx] = Record.from_dict(data)
+
+            try:
+                self.__save([('update', data) for data in updated.values()])
+            except Exception:
+                """Nothing was stored, so the loaded records are restored"""
+                for idx, entry in previous.items():
+                    self._servers[idx] = entry
+
+                raise
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("{} servers matched, {} were updated", matched, len(updated))
+
+        return matched, len(updated)
+
+    def delete_where(self, host_filter):
+        """This function deletes every record that matches a filter
+
+        The DB is scanned once and the deletions are stored with a single save.
+
+        :param host_filter: A HostFilter instance with at least one filter, the records it matches are deleted
+        :return: The number of deleted records
+        """
+        if host_filter.empty:
+            raise Exception("At least one filter is needed to select the records")
+
+        matches = host_filter.matches
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("Deleting the servers that match {}", host_filter)
+
+        self.__load()
+
+        hosts = [entry['host'] for entry in self._servers if matches(entry)]
+
+        if hosts:
+            previous = self._servers
+            self._servers = [entry for entry in previous if not matches(entry)]
+
+            self.__build_index()
+
+            try:
+                self.__save([('delete', host) for host in hosts])
+            except Exception:
+                self._servers = previous
+
+                self.__build_index()
+
+                raise
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("{} servers deleted", len(hosts))
+
+        return len(hosts)
+
     def get_servers(self, field_name, field_value, _all=False):
         """Returns a server based on the criteria of the parameters
 
@@ -381,28 +928,264 @@ class ServersDB:
 
         result = []
 
-        for entry in self._servers:
-            if entry[field_name] == field_value:
-                result.append(Server(entry))
-                if not _all:
-                    break
+        if field_name == 'host':
+            data = self.get_host(field_value)
+
+            if data is not None:
+                result.append(Server(data))
+        else:
+            self.__load()
+
+            for entry in self._servers:
+                if entry[field_name] == field_value:
+                    result.append(Server(entry))
+                    if not _all:
+                        break
 
         if self._config.verbose > 0 and not result:
-            self._log.log_verbose("No record found - Filter: ({} == {})".format(field_name, field_value))
+            self._log.log_verbose("No record found - Filter: ({} == {})", field_name, field_value)
+
+        return result
+
+    def get_host(self, host):
+        """Returns the data of a host
+
+        :param host: The host name
+        :return: The data dictionary of the host, or None if the host is not in the DB
+        """
+        servers, index = self._servers, self._index
+
+        if servers is None or index is None:
+            if self._storage.lazy:
+                return self._storage.get(host)
+
+            return next((record for record in self.__stream() if record['host'] == host), None)
+
+        idx = index.get(host)
+        record = servers[idx] if idx is not None and idx < len(servers) else None
+
+        if idx is not None and (record is None or record['host'] != host):
+            """A reload replaced the records and the index while they were read, the new ones are read"""
+            return self.get_host(host)
+
+        return record
+
+    @profiler.timed
+    def select(self, host_filter=None):
+        """Returns the records that match a filter
+
+        If the DB is not loaded, the lazy storage backend applies the filter, so only the matching
+        records are read. Otherwise, if the DB is streamed, only the matching records are kept.
+
+        :param host_filter: A HostFilter instance, if it is omitted every record matches
+        :return: A list with the data dictionaries of the matching records
+        """
+        if host_filter is None:
+            host_filter = HostFilter()
+
+        servers = self._servers
+
+        if servers is None:
+            if self._storage.lazy:
+                return self._storage.select(host_filter)
+
+            return host_filter.filter(self.__stream())
+
+        return host_filter.filter(servers)
+
+    def migrate(self, storage):
+        """Copies the whole DB to another storage backend
+
+        :param storage: The name of the storage backend, e.g. 'sqlite'
+        :return: The number of records copied
+        """
+        if self._config.verbose > 0:
+            self._log.log_verbose("Copying the database to the {} storage backend", storage)
+
+        self.__load()
+
+        get_storage(self._config, storage).save(self._servers, None)
+
+        InventoryCache(self._config).invalidate()
+
+        return len(self._servers)
+
+    def fsck(self):
+        """Checks the whole database
+
+        Every record is validated against the DB schema and every host must be unique.
+
+        :return: A list with the description of every problem that was found,
+                 an empty list if the database is healthy.
+        """
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("Checking the whole database")
+
+        result = []
+
+        self.__load()
+
+        for error in _db_validation_errors(self._servers):
+            result.append("/{}: {}".format('/'.join(str(p) for p in error.path), error.message))
+
+        if len(self._index) != len(self._servers):
+            for idx, entry in enumerate(self._servers):
+                if isinstance(entry, Mapping) and 'host' in entry and self._index[entry['host']] != idx:
+                    result.append("/{}: Duplicated host {}".format(idx, entry['host']))
 
         return result
 
+    @profiler.timed
+    def refresh(self, configuration):
+        """Prepares the instance to be used with a new configuration of the same DB
+
+        It is called by Registry when the instance is reused. The DB is loaded again only if its files
+        changed since they were loaded or saved, which only needs a stat of each file. A DB that was
+        loaded without validation is validated if the new configuration requires it.
+
+        :param configuration: A configuration instance for the DB file and storage backend of the instance
+        :return: None
+        """
+        self._config = configuration
+
+        self.__check_folder()
+
+        if self._storage.lazy:
+            """The backend answers the queries from its files, it is only opened again if they changed"""
+            if self._storage.changed():
+                self._storage.close()
+                self._storage = get_storage(self._config)
+                self._servers = None
+                self._index = None
+                self.__new_revision()
+
+            return
+
+        if self._servers is not None and self._storage.changed():
+            if self._config.verbose > 0:
+                self._log.log_verbose("The database changed since it was loaded, reloading it")
+
+            self.reload()
+
+        if self._servers is None:
+            if not self._config.stream_on_load:
+                self.__load()
+        elif self._config.validate_on_load and not self._validated:
+            if self._servers and not self.__validate_db(self._servers):
+                raise Exception("There is a corruption in the database")
+
+            self._validated = True
+
+    @profiler.timed
+    def reload(self):
+        """Loads the DB again, applying only its differences with the loaded records
+
+        The new records are compared by host with the loaded ones. The unchanged records keep their
+        Record instances and only the added and modified records are validated, against the record
+        schema, and converted. A copy of the host index is updated only for the removed hosts and for the
+        hosts that changed their position. The uniqueness of the hosts is checked while the records are
+        compared. The new records and index replace the previous ones at the end, so a query that is
+        reading them, like the queries of the daemon, is not affected.
+
+        If the DB was not loaded, was loaded without the validation that the configuration requires, or
+        has entries that are not records, it is loaded again as a whole.
+
+        :return: A tuple with the number of added, removed and modified records, or None if the whole DB
+                 was loaded again
+        """
+        if self._servers is None or self._storage.lazy or (self._config.validate_on_load and not self._validated):
+            self.__load(again=True)
+
+            return None
+
+        servers = self._storage.load()
+        loaded = self._servers
+        index = dict(self._index)
+        result = []
+        changed = []
+        hosts = set()
+        modified = 0
+
+        for entry in servers:
+            host = entry.get('host') if isinstance(entry, dict) else None
+
+            if not isinstance(host, str) or host in hosts:
+                """Not a record or a duplicated host, the whole DB is validated to report it"""
+                self.__load(again=True)
+
+                return None
+
+            hosts.add(host)
+            idx = index.get(host)
+
+            if idx is not None and loaded[idx] == entry:
+                result.append(loaded[idx])
+            else:
+                modified += idx is not None
+                changed.append(len(result))
+                result.append(entry)
+
+        if self._config.validate_on_load and not self.__validate_records([result[idx] for idx in changed]):
+            self._servers = None
+            self._index = None
+
+            raise Exception("There is a corruption in the database")
+
+        for idx in changed:
+            result[idx] = Record.from_dict(result[idx])
+
+        removed = [host for host in index if host not in hosts]
+
+        for host in removed:
+            del index[host]
+
+        for idx, record in enumerate(result):
+            if index.get(record['host']) != idx:
+                index[record['host']] = idx
+
+        if len(result) != len(loaded) or any(new is not old for new, old in zip(result, loaded)):
+            self.__new_revision()
+
+        """The queries that are reading the previous records and index are not affected"""
+        self._servers = result
+        self._index = index
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("{} records were added, {} removed and {} modified",
+                                  len(changed) - modified, len(removed), modified)
+
+        return len(changed) - modified, len(removed), modified
+
+    def __check_folder(self):
+        """Check if there is a folder for this client, if not then create a new one"""
+        if not os.path.isdir(os.path.join(self._config.servers_folder, self._config.client)):
+            if self._config.verbose > 0:
+                self._log.log_verbose("There is no folder for this client, creating new one")
+
+            os.makedirs(os.path.join(self._config.servers_folder, self._config.client), 755)
+
     def get_all(self):
         """Returns all servers as JSON
 
         :return: A JSON like data
         """
 
+        self.__load()
+
         if self._config.verbose > 0:
-            self._log.log_verbose("Getting {} servers".format(str(len(self._servers))))
+            self._log.log_verbose("Getting {} servers", len(self._servers))
 
         return self._servers
 
+    def get_revision(self):
+        """Returns the revision of the DB, it is unique within the process and changes with the records
+
+        :return: An integer
+        """
+        return self._revision
+
+    @profiler.timed
     def __init__(self, configuration):
         """ServerDB constructor
 
@@ -412,25 +1195,16 @@ class ServersDB:
 
         self._config = configuration
 
-        """Load the DB schema file"""
-        _db_schema_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), "db", "db.schema.json")
-        if os.path.isfile(_db_schema_file):
-            with open(_db_schema_file) as f:
-                self._schema = json.load(f)
-
-        """Check if there is a folder for this client, if not then create a new one"""
-        if not os.path.isdir(os.path.join(self._config.servers_folder, self._config.client)):
-            if self._config.verbose > 0:
-                self._log.log_verbose("There is no folder for this client, creating new one")
-
-            os.makedirs(os.path.join(self._config.servers_folder, self._config.client), 755)
+        self.__check_folder()
 
         """Check if there is a DB file for this client, if so then load and validate the data"""
         self._db_file = self._config.get_db_file()
+        self._storage = get_storage(self._config)
+        self.__new_revision()
 
-        if os.path.isfile(self._db_file):
-            with open(self._db_file) as f:
-                self._servers = json.load(f)
+        if self._storage.lazy or self._config.stream_on_load:
+            """The records of a lazy backend were validated when they were written, a streamed DB is
+            validated record by record as it is read"""
+            return
 
-        if self._servers and not self.__validate_db():
-            raise Exception("There is a corruption in the database")
+        self.__load()
@@ -5,10 +5,43 @@ Created on: 09/02/2019
 @author Carlos Colón
 """
 
+from dynamic_hosts import profiler
 from dynamic_hosts.database import ServersDB
+from dynamic_hosts.filters import HostFilter
+from dynamic_hosts.filters import parse_fields
 
+import re
+import copy
+import json
 import dynamic_hosts.logger.logger as log
 
+from concurrent.futures import ThreadPoolExecutor
+
+_invalid_group_chars = re.compile(r'[^A-Za-z0-9_]')
+_max_workers = 16
+_chunk_size = 65536
+
+
+def _group_name(*parts):
+    """Returns a valid Ansible group name, any character that is not a letter, a digit or '_' becomes '_'"""
+    return _invalid_group_chars.sub('_', '_'.join(parts))
+
+
+def _load_client(configuration, client, host_filter=None):
+    """Loads the DB of a client, it runs in the thread pool of DynamicHosts
+
+    :param configuration: The configuration of the dynamic hosts instance
+    :param client: The name of the client
+    :param host_filter: A HostFilter instance, if the records that match it must be returned
+    :return: A tuple with the ServersDB instance and the matching records, or None if no filter was given
+    """
+    config = copy.copy(configuration)
+    config.client = client
+
+    db = ServersDB(config)
+
+    return db, db.select(host_filter) if host_filter else None
+
 
 class DynamicHosts:
     """Dynamic Hosts class
@@ -17,11 +50,18 @@ class DynamicHosts:
 
     It maintains a single instance to the database to request different actions.
 
+    If the configuration refers to several clients, the DBs of the clients are loaded in parallel and
+    merged into a single inventory. Only the inventory and the variables of the hosts are available
+    then, the rest of the actions need a single client.
+
     This class has the following attributes:
 
     Attributes:
         _config (Config): An instance of an object based on Config
-        _db (ServersDB): An instance to the database
+        _db (ServersDB): An instance to the database, None if there are several clients
+        _clients (list): The (client, ServersDB) tuples of the clients, once they are loaded
+        _collisions (list): The (host, client, other client) tuples of the hosts found in several clients
+        _filter (HostFilter): The filter compiled from the environment, role and location of the configuration
         _log (Logger): An instance to the event logger object
 
     All these attributes are private and can not be modified once an instance of this class is created.
@@ -29,6 +69,9 @@ class DynamicHosts:
 
     _config = None
     _db = None
+    _clients = None
+    _collisions = None
+    _filter = None
     _log = log.Logger()
 
     @property
@@ -51,49 +94,154 @@ class DynamicHosts:
         """Returns the location value of the active configuration"""
         return self._config.location
 
-    def __allow_host(self, host_data):
+    def __add_groups(self, result, records):
         """A private help function
 
-        This function receives a dictionary with information about a specific host,
-        and with that information it makes an analysis to determine if this host
-        should be included or not in the final list.
+        Adds to an inventory a group for each environment, role and location, and for their combinations,
+        building all of them in a single pass over the records:
 
-        :param host_data: A host's data dictionary
-        :return: True if the host is validated by the filters, otherwise False
+        - env_<environment>: children are the env_<environment>_role_<role> groups
+        - env_<environment>_role_<role>: children are the env_<environment>_role_<role>_loc_<location> groups
+        - env_<environment>_role_<role>_loc_<location>: the hosts with that environment, role and location
+        - role_<role>: children are the env_<environment>_role_<role> groups
+        - loc_<location>: children are the env_<environment>_role_<role>_loc_<location> groups
+
+        Each host is only listed in one group, Ansible resolves the rest through the children, so a play
+        can use patterns like 'env_pro', 'role_web:&loc_MEX' or 'env_pro_role_web'.
+
+        Different locations can have the same group name, e.g. 'MEX-1' and 'MEX_1', then their hosts are
+        in the same groups and a warning is logged for each location that joins a group.
+
+        :param result: The inventory
+        :param records: The records of the hosts of the inventory
+        :return: None
         """
-        result = True
+        leaves = dict()
+        locations = dict()
 
-        if self._config.verbose > 1:
-            self._log.log_verbose("***** Filtering host {} *****".format(host_data['host']))
+        def add_child(group, child):
+            children = result.setdefault(group, {'children': []})['children']
+
+            if child not in children:
+                children.append(child)
+
+        for record in records:
+            key = (record['environment'], record['role'], record['location'])
+            hosts = leaves.get(key)
 
-        if self._config.environment:
-            if self._config.verbose > 1:
-                self._log.log_verbose("      Evaluating {} == {}".format(self._config.environment, host_data['environment']))
+            if hosts is None:
+                env_group = _group_name('env', key[0])
+                env_role_group = _group_name(env_group, 'role', key[1])
+                leaf_group = _group_name(env_role_group, 'loc', key[2])
 
-            result &= self._config.environment == host_data['environment']
+                hosts = result.setdefault(leaf_group, {'hosts': []})['hosts']
+                leaves[key] = hosts
 
-        if self._config.role:
-            if self._config.verbose > 1:
-                self._log.log_verbose("      Evaluating {} == {}".format(self._config.role, host_data['role']))
+                add_child(env_group, env_role_group)
+                add_child(env_role_group, leaf_group)
+                add_child(_group_name('role', key[1]), env_role_group)
 
-            result &= self._config.role == host_data['role']
+                loc_group = _group_name('loc', key[2])
+                loc_values = locations.setdefault(loc_group, set())
 
-        if self._config.location:
-            if self._config.verbose > 1:
-                self._log.log_verbose("      Evaluating {} == {}".format(self._config.location, host_data['location']))
+                if loc_values and key[2] not in loc_values:
+                    self._log.log_warning("The locations {} and {} have the same group {}, their hosts are merged",
+                                          sorted(loc_values)[0], key[2], loc_group)
 
-            result &= self._config.location == host_data['location']
+                loc_values.add(key[2])
+                add_child(loc_group, leaf_group)
+
+            hosts.append(record['host'])
+
+    def __load_clients(self, host_filter=None):
+        """A private help function
+
+        Loads the DBs of the clients of the configuration in a thread pool.
+
+        :param host_filter: A HostFilter instance, if the matching records of each client must be returned
+        :return: A list with the matching records of each client, in the order of the clients
+        """
+        names = self._config.get_clients()
+
+        if self._config.verbose > 0:
+            self._log.log_verbose("Loading the databases of {} clients", len(names))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(_max_workers, len(names)))) as pool:
+            loaded = list(pool.map(lambda name: _load_client(self._config, name, host_filter), names))
+
+        self._clients = [(name, db) for name, (db, _) in zip(names, loaded)]
+
+        return [records for _, records in loaded]
+
+    def __merge_clients(self, result):
+        """A private help function
+
+        Adds to a dictionary a client_<client> group for each client, with its hosts that match the filter.
+        A host that is in several clients is added to the group of each client, but only the record of
+        the first client is used and the collision is recorded.
+
+        The DBs are loaded the first time, if get_revision already loaded them they are only queried.
+
+        :param result: The dictionary of groups
+        :return: The records of the hosts of the inventory
+        """
+        records = []
+        owners = dict()
+
+        if self._clients is None:
+            selected = self.__load_clients(self._filter)
+        else:
+            selected = [db.select(self._filter) for _, db in self._clients]
+
+        self._collisions = []
+
+        for (name, _), client_records in zip(self._clients, selected):
+            hosts = result.setdefault(_group_name('client', name), {'hosts': []})['hosts']
+
+            for record in client_records:
+                owner = owners.setdefault(record['host'], name)
+
+                if owner == name:
+                    records.append(record)
+                else:
+                    self._collisions.append((record['host'], owner, name))
+
+                hosts.append(record['host'])
+
+        return records
+
+    @profiler.timed
+    def __select(self):
+        """A private help function
+
+        Returns the records that match the filter, together with the client groups if there are several clients.
+
+        :return: A tuple with the list of records and a dictionary with the client groups
+        """
+        groups = dict()
 
         if self._config.verbose > 1:
-            self._log.log_verbose("      Result {}".format(result))
+            self._log.log_verbose("***** Filtering hosts: {} *****", self._filter)
 
-        return result
+        if self._db is None:
+            records = self.__merge_clients(groups)
+        else:
+            records = self._db.select(self._filter)
 
+        if self._config.verbose > 0:
+            self._log.log_verbose("After filtering, {} servers were returned", len(records))
+
+        return records, groups
+
+    @profiler.timed
     def get_list(self):
         """Get List function
 
         This function returns a list of hosts in a format that can be used by Ansible.
 
+        If the configuration has host groups, the inventory also has a group for each environment,
+        role and location of the hosts and for their combinations.
+
         :return: An Ansible host's inventory in JSON format
         """
         hosts = []
@@ -102,23 +250,161 @@ class DynamicHosts:
             'hostvars': {},
         }
 
-        for record in self._db.get_all():
-            if self.__allow_host(record):
-                hosts.append(record['host'])
+        records, groups = self.__select()
 
-                if 'variables' in record:
-                    result['_meta']['hostvars'][record['host']] = record['variables']
+        for record in records:
+            hosts.append(record['host'])
+
+            if 'variables' in record:
+                result['_meta']['hostvars'][record['host']] = record['variables']
+
+        result.update(groups)
 
         result['all'] = {
             'hosts': hosts,
             'vars': {}
         }
 
-        if self._config.verbose > 0:
-            self._log.log_verbose("After filtering, {} servers were returned".format(str(len(hosts))))
+        if self._config.host_groups:
+            self.__add_groups(result, records)
 
         return result
 
+    def iter_list(self, chunk_size=_chunk_size):
+        """Iter List function
+
+        This function returns the same inventory as get_list, already encoded as JSON, in chunks of about
+        chunk_size characters. The joined chunks are identical to json.dumps(get_list()), but neither the
+        inventory nor its JSON document are built in memory, the variables of each host are encoded
+        while the records are iterated.
+
+        :param chunk_size: The minimum number of characters of each chunk, except the last one
+        :return: A generator of strings
+        """
+        records = groups = None
+        encode = json.JSONEncoder().encode
+        buffer = []
+        size = 0
+
+        def pieces():
+            yield '{"_meta": {"hostvars": {'
+
+            separator = ''
+
+            for record in records:
+                if 'variables' in record:
+                    yield separator + encode(record['host']) + ': ' + encode(record['variables'])
+                    separator = ', '
+
+            yield '}}'
+
+            for name, group in groups.items():
+                yield ', ' + encode(name) + ': ' + encode(group)
+
+            yield ', "all": {"hosts": ['
+
+            separator = ''
+
+            for record in records:
+                yield separator + encode(record['host'])
+                separator = ', '
+
+            yield '], "vars": {}}'
+
+            if self._config.host_groups:
+                host_groups = dict()
+                self.__add_groups(host_groups, records)
+
+                for name, group in host_groups.items():
+                    yield ', ' + encode(name) + ': ' + encode(group)
+
+            yield '}'
+
+        """The span of the output includes the time that the consumer spends with each chunk"""
+        with profiler.span('DynamicHosts.iter_list'):
+            records, groups = self.__select()
+
+            for piece in pieces():
+                buffer.append(piece)
+                size += len(piece)
+
+                if size >= chunk_size:
+                    yield ''.join(buffer)
+                    buffer = []
+                    size = 0
+
+            if buffer:
+                yield ''.join(buffer)
+
+    @profiler.timed
+    def get_host(self, host):
+        """Get Host function
+
+        This function returns the variables of a host, as Ansible expects them from the --host parameter.
+
+        :param host: The host name
+        :return: A dictionary with the variables of the host, empty if the host is unknown or has no variables
+        """
+        if self._db is None:
+            record = next((record for record in (db.get_host(host) for _, db in self.__get_clients())
+                           if record is not None), None)
+        else:
+            record = self._db.get_host(host)
+
+        if self._config.verbose > 0 and record is None:
+            self._log.log_verbose("The host {} is not in the database", host)
+
+        return (record.get('variables') or {}) if record else {}
+
+    def get_all_host_vars(self):
+        """Returns a generator of (host, variables) tuples for every host of the database
+
+        If there are several clients, a host that is in several of them is only returned once,
+        with the variables of the first client.
+        """
+        if self._db is not None:
+            for record in self._db.select():
+                yield record['host'], record.get('variables') or {}
+
+            return
+
+        seen = set()
+
+        for _, db in self.__get_clients():
+            for record in db.select():
+                if record['host'] not in seen:
+                    seen.add(record['host'])
+
+                    yield record['host'], record.get('variables') or {}
+
+    def get_collisions(self):
+        """Returns the (host, client, other client) tuples of the hosts found in several clients by get_list"""
+        return list(self._collisions or [])
+
+    def get_revision(self):
+        """Returns the revision of the inventory, it changes whenever the DB of any of its clients changes
+
+        :return: A string
+        """
+        if self._db is not None:
+            return str(self._db.get_revision())
+
+        return '.'.join('{}:{}'.format(name, db.get_revision()) for name, db in self.__get_clients())
+
+    def __get_clients(self):
+        """A private help function, returns the (client, ServersDB) tuples and loads the DBs the first time"""
+        if self._clients is None:
+            self.__load_clients()
+
+        return self._clients
+
+    def __single_db(self):
+        """A private help function, returns the DB or raises an exception if there are several clients"""
+        if self._db is None:
+            raise Exception("This action needs a single client, the configuration has {}".format(self._config.client))
+
+        return self._db
+
     def add_server(self):
         """Trivial function that notifies the database that the user wants to add a new record
 
@@ -127,7 +413,75 @@ class DynamicHosts:
         result = 0
 
         try:
-            self._db.add_new_server(server_data=None, allow_host_vars=True)
+            self.__single_db().add_new_server(server_data=None, allow_host_vars=True)
+        except Exception as ex:
+            self._log.log_error(ex)
+
+            result = 1
+
+        return result
+
+    def check_db(self):
+        """Trivial function that asks the database to check all its records
+
+        :return: 0 if no problem was found in the database, otherwise 1
+        """
+        result = 0
+
+        try:
+            errors = self.__single_db().fsck()
+
+            for error in errors:
+                self._log.log_error(error)
+
+            self._log.log_info("{} problems were found in the database", len(errors))
+
+            if errors:
+                result = 1
+        except Exception as ex:
+            self._log.log_error(ex)
+
+            result = 1
+
+        return result
+
+    def import_servers(self, file_name):
+        """Trivial function that notifies the database that the user wants to import a file of records
+
+        :param file_name: The path of a JSON Lines or CSV file
+        :return: 0 if all the records were imported, otherwise 1
+        """
+        result = 0
+
+        try:
+            imported, errors = self.__single_db().import_file(file_name)
+
+            for line, error in errors:
+                self._log.log_error("Line {}: {}", line, error)
+
+            self._log.log_info("{} servers were imported, {} records were rejected", imported, len(errors))
+
+            if errors:
+                result = 1
+        except Exception as ex:
+            self._log.log_error(ex)
+
+            result = 1
+
+        return result
+
+    def migrate(self, storage):
+        """Trivial function that asks the database to copy all its records to another storage backend
+
+        :param storage: The name of the storage backend, e.g. 'sqlite'
+        :return: 0 if the records were copied, otherwise 1
+        """
+        result = 0
+
+        try:
+            copied = self.__single_db().migrate(storage)
+
+            self._log.log_info("{} servers were copied to the {} storage backend", copied, storage)
         except Exception as ex:
             self._log.log_error(ex)
 
@@ -143,7 +497,47 @@ class DynamicHosts:
         result = 0
 
         try:
-            self._db.update_server(new_server_data=None)
+            self.__single_db().update_server(new_server_data=None)
+        except Exception as ex:
+            self._log.log_error(ex)
+
+            result = 1
+
+        return result
+
+    def update_where(self, where, changes):
+        """Trivial function that asks the database to change the records that match some field values
+
+        :param where: A comma separated list of field=value pairs with the filters of the records, like the
+                      filters of the inventory, e.g. 'role=web,app,location=M*'
+        :param changes: A comma separated list of field=value pairs with the new values
+        :return: 0 if the records were changed, otherwise 1
+        """
+        result = 0
+
+        try:
+            matched, updated = self.__single_db().update_where(HostFilter.from_fields(where), parse_fields(changes))
+
+            self._log.log_info("{} servers matched, {} were updated", matched, updated)
+        except Exception as ex:
+            self._log.log_error(ex)
+
+            result = 1
+
+        return result
+
+    def delete_where(self, where):
+        """Trivial function that asks the database to delete the records that match some field values
+
+        :param where: A comma separated list of field=value pairs with the filters of the records
+        :return: 0 if the records were deleted, otherwise 1
+        """
+        result = 0
+
+        try:
+            deleted = self.__single_db().delete_where(HostFilter.from_fields(where))
+
+            self._log.log_info("{} servers matched and were deleted", deleted)
         except Exception as ex:
             self._log.log_error(ex)
 
@@ -154,11 +548,14 @@ class DynamicHosts:
     def __init__(self, config):
         self._config = config
 
-        self._db = ServersDB(self._config)
+        if not self._config.multi_client:
+            self._db = ServersDB(self._config)
+
+        self._filter = HostFilter(self._config.environment, self._config.role, self._config.location)
 
         if self._config.verbose > 0:
             self._log.log_verbose("----- Dynamic hosts configuration -----")
-            self._log.log_verbose(" Client.......: {}".format(self._config.client))
-            self._log.log_verbose(" Environment..: {}".format(self._config.environment))
-            self._log.log_verbose(" Role.........: {}".format(self._config.role))
-            self._log.log_verbose(" Location.....: {}".format(self._config.location))
+            self._log.log_verbose(" Client.......: {}", self._config.client)
+            self._log.log_verbose(" Environment..: {}", self._config.environment)
+            self._log.log_verbose(" Role.........: {}", self._config.role)
+            self._log.log_verbose(" Location.....: {}", self._config.location)
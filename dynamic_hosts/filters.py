@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""filters.py
+====================================
+Created on: 18/10/2026
+"""
+
+import re
+import fnmatch
+import itertools
+
+from operator import itemgetter
+
+"""The fields of the records that can be filtered"""
+_fields = ('environment', 'role', 'location')
+
+
+def _split(value):
+    """Returns the comma separated values of a filter as a frozenset, or None if the filter is empty"""
+    if not value:
+        return None
+
+    result = frozenset(item.strip() for item in value.split(',') if item.strip())
+
+    return result or None
+
+
+def parse_fields(text):
+    """Returns the values of a comma separated list of field=value pairs, e.g. 'role=web,location=MEX'
+
+    Like in the filters, a value can have several comma separated values: an item without '=' belongs
+    to the value of the previous field, e.g. 'role=web,app,location=M*' has the roles web and app.
+
+    :param text: The list of pairs
+    :return: A dictionary with the value of each field, in the order of the list
+    """
+    result = dict()
+    field = None
+
+    for item in (text or '').split(','):
+        name, separator, value = item.partition('=')
+
+        if separator and name.strip():
+            field = name.strip()
+            result[field] = value.strip()
+        elif field is not None and not separator:
+            result[field] += ',' + item.strip()
+        elif item.strip():
+            raise Exception("Malformed field value '{}', the format is field=value".format(item))
+
+    return result
+
+
+class HostFilter:
+    """Filter of the records of the database
+
+    The environment, role and location filters are compiled once into a single predicate. Each filter
+    can have several values separated by commas, e.g. 'web,app', and a record matches a filter if its
+    field has any of them.
+
+    The location filter also accepts glob patterns, e.g. 'M*' or 'LOC[0-4]', and a regular expression
+    if it starts with 're:', e.g. 're:^(MEX|GDL)$'. A regular expression is searched anywhere in the
+    location unless it is anchored, and its commas do not separate values.
+
+    Attributes:
+        environments (frozenset): The environments that match, None if there is no environment filter
+        roles (frozenset): The roles that match, None if there is no role filter
+        locations (frozenset): The locations that match exactly, None if there is no exact location filter
+        location_pattern (Pattern): The compiled location pattern, None if there is no location pattern
+        empty (bool): True if no filter is set, then every record matches
+        matches (callable): The predicate, it receives a record and returns True if the record matches
+    """
+
+    environments = None
+    roles = None
+    locations = None
+    location_pattern = None
+    empty = True
+    matches = None
+
+    def __compile_location(self, location):
+        """Sets the location filters"""
+        if not location:
+            return
+
+        if location.startswith('re:'):
+            try:
+                self.location_pattern = re.compile(location[3:])
+            except re.error as ex:
+                raise Exception("Invalid location pattern '{}': {}".format(location, ex))
+
+            return
+
+        values = _split(location)
+
+        if values is None:
+            return
+
+        patterns = [value for value in values if any(c in value for c in '*?[')]
+
+        if not patterns:
+            self.locations = values
+            return
+
+        """Exact values and globs become a single regular expression"""
+        alternatives = [fnmatch.translate(value) if value in patterns else re.escape(value) + r'\Z'
+                        for value in sorted(values)]
+
+        self.location_pattern = re.compile(r'\A(?:{})'.format('|'.join(alternatives)))
+
+    def __compile(self):
+        """Builds the predicate
+
+        The fields with a set of values are read with a single itemgetter and looked up in the set of
+        every allowed combination, so each record needs one membership test plus, if there is one,
+        the match of the location pattern.
+        """
+        tests = [(field, values) for field, values in (('environment', self.environments),
+                                                       ('role', self.roles),
+                                                       ('location', self.locations)) if values is not None]
+        pattern = self.location_pattern.search if self.location_pattern else None
+
+        self.empty = not tests and pattern is None
+
+        if self.empty:
+            return lambda record: True
+
+        if tests:
+            getter = itemgetter(*[field for field, _ in tests])
+
+            if len(tests) == 1:
+                allowed = tests[0][1]
+            else:
+                allowed = frozenset(itertools.product(*[values for _, values in tests]))
+
+            if pattern is None:
+                return lambda record: getter(record) in allowed
+
+            return lambda record: getter(record) in allowed and pattern(record['location']) is not None
+
+        return lambda record: pattern(record['location']) is not None
+
+    def filter(self, records):
+        """Returns the records that match the filters
+
+        :param records: An iterable of records
+        :return: A list with the matching records
+        """
+        if self.empty:
+            return list(records)
+
+        return list(filter(self.matches, records))
+
+    def __repr__(self):
+        return 'HostFilter(environments={}, roles={}, locations={}, location_pattern={})'.format(
+            sorted(self.environments) if self.environments else None,
+            sorted(self.roles) if self.roles else None,
+            sorted(self.locations) if self.locations else None,
+            self.location_pattern.pattern if self.location_pattern else None)
+
+    @classmethod
+    def from_fields(cls, text):
+        """Returns the filter of a list of field=value pairs, e.g. 'role=web,location=M*'
+
+        :param text: The list of pairs, see parse_fields, the fields can be environment, role and location
+        :return: A HostFilter instance
+        """
+        fields = parse_fields(text)
+
+        for field in fields:
+            if field not in _fields:
+                raise Exception("The records can not be selected by {}, only by {}".format(field, ', '.join(_fields)))
+
+        return cls(**fields)
+
+    def __init__(self, environment='', role='', location=''):
+        """HostFilter constructor
+
+        :param environment: The environment filter, e.g. 'pro' or 'itg,pro'
+        :param role: The role filter, e.g. 'web' or 'web,app'
+        :param location: The location filter, e.g. 'MEX', 'MEX,GDL', 'M*' or 're:^M'
+        """
+        self.environments = _split(environment)
+        self.roles = _split(role)
+
+        self.__compile_location(location)
+
+        self.matches = self.__compile()
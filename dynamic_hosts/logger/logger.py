@@ -4,15 +4,52 @@
 @author Carlos Colón
 """
 
+import sys
+import time
+import atexit
+import threading
+
+ERROR = 40
+WARNING = 30
+INFO = 20
+VERBOSE = 10
+
+_levels = {'error': ERROR, 'warning': WARNING, 'info': INFO, 'verbose': VERBOSE}
+
+"""Bytes kept in the buffer before it is written, unless the stream is a terminal"""
+_buffer_limit = 65536
+
 
 class Logger:
     """Terminal event logger
 
     This object allows you to display event information in the console.
+
+    The events are written to the standard error, never to the standard output, which is reserved for
+    the inventory that Ansible parses. A message is formatted only if its level is enabled, its arguments
+    are applied with str.format, e.g. log_verbose("{} servers were returned", count).
+
+    The lines are buffered and written when the buffer is full, when flush is called and when the process
+    exits. Errors and warnings are written at once, and so is every line if the stream is a terminal or
+    the logger is line buffered, like in the daemon. In a terminal the lines are coloured, otherwise the
+    colours are left out. In the JSON lines mode each event is a JSON document with its time, level and
+    message, for log shippers.
+
+    The level, the format and the stream are shared by every logger, they are set with configure.
     """
 
     _line = '''%s[%s%s%s]%s %s'''
 
+    _level = VERBOSE
+    _json_lines = False
+    _colors = None
+    _stream = None
+    _line_buffered = False
+
+    _buffer = []
+    _buffer_size = 0
+    _lock = threading.Lock()
+
     class __Colors:
         """Private object for colors definition"""
         Reset = '\033[0m'
@@ -49,62 +86,128 @@ class Logger:
         """Returns the colors object"""
         return self.__Colors
 
-    def log_error(self, message):
-        """Displays a formatted error line with a message in the terminal.
+    @classmethod
+    def configure(cls, level=None, json_lines=None, colors=None, stream=None, line_buffered=None):
+        """Sets the options shared by every logger, the pending lines are written first
+
+        The options that are omitted keep their current value, reset goes back to the defaults.
 
-        :param message: The message that will be shown
+        :param level: The minimum level of the events that are written, 'error', 'warning', 'info', 'verbose'
+                      or one of the level constants
+        :param json_lines: True to write each event as a JSON document
+        :param colors: True or False to force the colours, by default they are used only in a terminal
+        :param stream: The stream where the events are written, by default the standard error
+        :param line_buffered: True to write each line at once, for long running processes
         :return: None
         """
-        line = self._line % (self.__Colors.Reset,
-                             self.__Colors.FG.Red,
-                             " ERROR ",
-                             self.__Colors.Reset,
-                             self.__Colors.FG.LightRed,
-                             message)
+        cls.flush()
 
-        print(line)
+        if level is not None:
+            if level not in _levels and level not in _levels.values():
+                raise Exception("Unknown log level {}".format(level))
 
-    def log_warning(self, message):
-        """Displays a formatted warning line with a message in the terminal.
+            cls._level = _levels.get(level, level)
+
+        if json_lines is not None:
+            cls._json_lines = bool(json_lines)
+
+        if colors is not None:
+            cls._colors = colors
+
+        if stream is not None:
+            cls._stream = stream
+
+        if line_buffered is not None:
+            cls._line_buffered = bool(line_buffered)
+
+    @classmethod
+    def reset(cls):
+        """Writes the pending lines and goes back to the default options"""
+        cls.flush()
+
+        cls._level = VERBOSE
+        cls._json_lines = False
+        cls._colors = None
+        cls._stream = None
+        cls._line_buffered = False
 
-        :param message: The message that will be shown
+    @classmethod
+    def flush(cls):
+        """Writes the buffered lines"""
+        with cls._lock:
+            if cls._buffer:
+                stream = cls._stream or sys.stderr
+                stream.write(''.join(cls._buffer))
+                stream.flush()
+
+                cls._buffer = []
+                cls._buffer_size = 0
+
+    def is_enabled_for(self, level):
+        """Returns True if the events of a level are written"""
+        return level >= self._level
+
+    def __write(self, level, label, label_color, message_color, message, args):
+        """Formats an event and adds it to the buffer, if its level is enabled"""
+        if level < self._level:
+            return
+
+        message = message.format(*args) if args else str(message)
+        stream = self._stream or sys.stderr
+        terminal = getattr(stream, 'isatty', lambda: False)()
+
+        if self._json_lines:
+            import json
+
+            line = json.dumps({'time': round(time.time(), 3), 'level': label.strip().lower(), 'message': message})
+        elif self._colors or (self._colors is None and terminal):
+            line = self._line % (self.__Colors.Reset, label_color, label, self.__Colors.Reset, message_color, message)
+        else:
+            line = '[%s] %s' % (label, message)
+
+        with self._lock:
+            Logger._buffer.append(line + '\n')
+            Logger._buffer_size += len(line) + 1
+            full = Logger._buffer_size >= _buffer_limit
+
+        if terminal or full or level >= WARNING or self._line_buffered:
+            self.flush()
+
+    def log_error(self, message, *args):
+        """Displays a formatted error line with a message in the terminal.
+
+        :param message: The message that will be shown, or its format string
+        :param args: The arguments of the format string
         :return: None
         """
-        line = self._line % (self.__Colors.Reset,
-                             self.__Colors.FG.Yellow,
-                             "WARNING",
-                             self.__Colors.Reset,
-                             self.__Colors.FG.Yellow,
-                             message)
+        self.__write(ERROR, " ERROR ", self.__Colors.FG.Red, self.__Colors.FG.LightRed, message, args)
 
-        print(line)
+    def log_warning(self, message, *args):
+        """Displays a formatted warning line with a message in the terminal.
 
-    def log_info(self, message):
+        :param message: The message that will be shown, or its format string
+        :param args: The arguments of the format string
+        :return: None
+        """
+        self.__write(WARNING, "WARNING", self.__Colors.FG.Yellow, self.__Colors.FG.Yellow, message, args)
+
+    def log_info(self, message, *args):
         """Displays a formatted information line with a message in the terminal.
 
-        :param message: The message that will be shown
+        :param message: The message that will be shown, or its format string
+        :param args: The arguments of the format string
         :return: None
         """
-        line = self._line % (self.__Colors.Reset,
-                             self.__Colors.FG.Blue,
-                             " INFO  ",
-                             self.__Colors.Reset,
-                             self.__Colors.Reset,
-                             message)
-
-        print(line)
+        self.__write(INFO, " INFO  ", self.__Colors.FG.Blue, self.__Colors.Reset, message, args)
 
-    def log_verbose(self, message):
+    def log_verbose(self, message, *args):
         """Displays a formatted verbose line with a message in the terminal.
 
-        :param message: The message that will be shown
+        :param message: The message that will be shown, or its format string
+        :param args: The arguments of the format string
         :return: None
         """
-        line = self._line % (self.__Colors.Reset,
-                             self.__Colors.FG.Green,
-                             "VERBOSE",
-                             self.__Colors.Reset,
-                             self.__Colors.FG.LightGreen,
-                             message)
-
-        print(line)
+        self.__write(VERBOSE, "VERBOSE", self.__Colors.FG.Green, self.__Colors.FG.LightGreen, message, args)
+
+
+atexit.register(Logger.flush)
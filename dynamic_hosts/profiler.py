@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""profiler.py
+====================================
+Created on: 18/10/2026
+
+Timing of the phases of an invocation.
+
+The phases are marked with the timed decorator or with a span context manager. While the profiler is
+disabled, which is the default, a span is a shared context manager that does nothing and a timed function
+only checks a flag before it calls the function, so the phases cost almost nothing.
+
+Once enabled, each span records its start, its duration, its depth and its thread, and the report is
+written as a JSON document to the standard error or to a file when the process exits.
+
+This module must stay lightweight, it is imported by the fast path of hosts.py.
+"""
+
+import sys
+import time
+import atexit
+import functools
+import threading
+
+_enabled = False
+_start = 0.0
+_spans = []
+_local = threading.local()
+_cprofile = None
+
+
+class _NullSpan:
+    """The span used while the profiler is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Span:
+    """A phase of the invocation that is being timed"""
+
+    __slots__ = ('name', 'start', 'depth')
+
+    def __enter__(self):
+        self.depth = getattr(_local, 'depth', 0)
+        _local.depth = self.depth + 1
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *args):
+        end = time.perf_counter()
+        _local.depth = self.depth
+
+        _spans.append((self.name, self.start, end - self.start, self.depth, threading.current_thread().name))
+
+        return False
+
+    def __init__(self, name):
+        self.name = name
+
+
+_null_span = _NullSpan()
+
+
+def enabled():
+    """Returns True if the profiler is enabled"""
+    return _enabled
+
+
+def span(name):
+    """Returns a context manager that times a phase
+
+    :param name: The name of the phase, e.g. 'cli.cache'
+    :return: A context manager
+    """
+    return _Span(name) if _enabled else _null_span
+
+
+def timed(function):
+    """Decorator that times each call of a function as a phase named after the function"""
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return function(*args, **kwargs)
+
+        with _Span(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def enable(target=None):
+    """Enables the profiler
+
+    :param target: Where the report is written when the process exits, '-' for the standard error,
+                   the path of a file, or None if it is not written
+    :return: None
+    """
+    global _enabled, _start
+
+    if _enabled:
+        return
+
+    del _spans[:]
+    _enabled = True
+    _start = time.perf_counter()
+
+    if target is not None:
+        atexit.register(write_report, target)
+
+
+def disable():
+    """Disables the profiler and discards the recorded spans"""
+    global _enabled
+
+    _enabled = False
+    del _spans[:]
+
+
+def start_cprofile(file_name):
+    """Profiles every function call with cProfile until the process exits
+
+    The statistics are written to a file that can be read with pstats or any of its viewers.
+
+    :param file_name: The path of the statistics file
+    :return: None
+    """
+    global _cprofile
+
+    import cProfile
+
+    if _cprofile is not None:
+        return
+
+    _cprofile = cProfile.Profile()
+    _cprofile.enable()
+
+    def stop():
+        _cprofile.disable()
+        _cprofile.dump_stats(file_name)
+
+    atexit.register(stop)
+
+
+def report():
+    """Returns the timings recorded so far
+
+    :return: A dictionary with the total time, every span in the order they started and, for each phase,
+             the number of calls and their total time. The times are in milliseconds.
+    """
+    phases = dict()
+    spans = []
+
+    for name, start, elapsed, depth, thread in sorted(_spans, key=lambda entry: entry[1]):
+        spans.append({
+            'name': name,
+            'start_ms': round((start - _start) * 1000, 3),
+            'ms': round(elapsed * 1000, 3),
+            'depth': depth,
+            'thread': thread,
+        })
+
+        phase = phases.setdefault(name, {'count': 0, 'ms': 0.0})
+        phase['count'] += 1
+        phase['ms'] = round(phase['ms'] + elapsed * 1000, 3)
+
+    return {
+        'total_ms': round((time.perf_counter() - _start) * 1000, 3),
+        'phases': phases,
+        'spans': spans,
+    }
+
+
+def write_report(target='-'):
+    """Writes the report as a JSON document
+
+    :param target: '-' for the standard error, otherwise the path of a file
+    :return: None
+    """
+    import json
+
+    data = json.dumps(report(), indent=2)
+
+    if target == '-':
+        sys.stderr.write(data + '\n')
+        sys.stderr.flush()
+    else:
+        with open(target, 'w') as f:
+            f.write(data + '\n')
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""record.py
+====================================
+Created on: 18/10/2026
+"""
+
+import sys
+
+from collections.abc import Mapping
+
+_fields = ('host', 'environment', 'role', 'location')
+
+
+class Record(Mapping):
+    """Compact, read only representation of a server record
+
+    A record is a mapping with the same keys and values as the data dictionary it was built from, so it
+    can be used wherever a record dictionary is read. Its fields are stored in slots instead of a hash
+    table, and the environment, role and location strings are interned, so the records of a DB share a
+    single string for each distinct value.
+
+    json can not encode a record by itself, dict(record) or json_default() return its dictionary.
+
+    Attributes:
+        host (str): The host name
+        environment (str): The interned environment
+        role (str): The interned role
+        location (str): The interned location
+        variables (dict): The host variables, None if the record has no variables
+        extra (dict): Any other field of the record, None if there is none. A variables key with a None
+                      value is kept here, so the record has the same keys as its dictionary
+    """
+
+    __slots__ = ('host', 'environment', 'role', 'location', 'variables', 'extra')
+
+    @classmethod
+    def from_dict(cls, data):
+        """Returns the compact record of a data dictionary
+
+        :param data: A data dictionary
+        :return: A Record instance, or the data itself if it is not a dictionary with the required fields
+        """
+        if not isinstance(data, dict) or not all(field in data for field in _fields):
+            return data
+
+        record = cls.__new__(cls)
+        record.host = data['host']
+        record.environment = _intern(data['environment'])
+        record.role = _intern(data['role'])
+        record.location = _intern(data['location'])
+        record.variables = data.get('variables')
+        record.extra = None
+
+        if len(data) > 4 + (record.variables is not None):
+            record.extra = {k: v for k, v in data.items()
+                            if k not in _fields and (k != 'variables' or record.variables is None)}
+
+        return record
+
+    def to_dict(self):
+        """Returns the data dictionary of the record"""
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key in _fields:
+            return getattr(self, key)
+
+        if key == 'variables' and self.variables is not None:
+            return self.variables
+
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _fields:
+            return True
+
+        if key == 'variables' and self.variables is not None:
+            return True
+
+        return self.extra is not None and key in self.extra
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        yield from _fields
+
+        if self.variables is not None:
+            yield 'variables'
+
+        if self.extra is not None:
+            yield from self.extra
+
+    def __eq__(self, other):
+        """Compares the fields directly, without building the dictionary of the record"""
+        if isinstance(other, Record):
+            return self.host == other.host and self.environment == other.environment and \
+                self.role == other.role and self.location == other.location and \
+                self.variables == other.variables and self.extra == other.extra
+
+        if isinstance(other, dict):
+            return len(self) == len(other) and all(key in other and other[key] == self[key] for key in self)
+
+        return NotImplemented
+
+    __hash__ = None
+
+    def __len__(self):
+        return 4 + (self.variables is not None) + (len(self.extra) if self.extra is not None else 0)
+
+    def __repr__(self):
+        return 'Record({!r})'.format(self.to_dict())
+
+
+def _intern(value):
+    """Interns a string, any other value is returned as it is"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def json_default(value):
+    """The default function of json.dumps, it encodes the records as dictionaries"""
+    if isinstance(value, Record):
+        return value.to_dict()
+
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
@@ -0,0 +1,777 @@
+# -*- coding: utf-8 -*-
+"""storage.py
+====================================
+Created on: 18/10/2026
+"""
+
+import os
+import json
+import threading
+
+from contextlib import contextmanager
+from dynamic_hosts import profiler
+from dynamic_hosts.record import json_default
+
+try:
+    import fcntl
+except ImportError:
+    """Platforms without fcntl only serialize the writers of the same process"""
+    fcntl = None
+
+
+def _fsync_folder(folder):
+    """Flushes a folder to disk, so a file renamed into it survives a crash
+
+    This is a best effort, some platforms and file systems do not allow to open or sync a folder.
+    """
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _stat(file_name):
+    """Returns the inode, size and modification time of a file, or None if it does not exist"""
+    try:
+        info = os.stat(file_name)
+    except OSError:
+        return None
+
+    return info.st_ino, info.st_size, info.st_mtime_ns
+
+
+def _iter_array(f, chunk_size=65536):
+    """Reads the items of a JSON array one by one
+
+    The file is read in chunks of chunk_size characters and each item is decoded as soon as it is
+    complete, so only the current item and a chunk are in memory, whatever the size of the array.
+
+    :param f: A text file that contains a JSON array
+    :param chunk_size: The number of characters read at once
+    :return: A generator of the decoded items
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    state = 'start'
+
+    while True:
+        """Skips the white space, reading more chunks if needed"""
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\n\r':
+                position += 1
+
+            if position < len(buffer) or eof:
+                break
+
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        if position == len(buffer):
+            raise ValueError("Unexpected end of the JSON array")
+
+        char = buffer[position]
+
+        if state == 'start':
+            if char != '[':
+                raise ValueError("Expecting '[' at the start of the JSON array")
+
+            position += 1
+            state = 'first'
+            continue
+
+        if char == ']' and state in ('first', 'next'):
+            return
+
+        if state == 'next':
+            if char != ',':
+                raise ValueError("Expecting ',' or ']' after an item of the JSON array")
+
+            position += 1
+            state = 'item'
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+
+            """A number at the end of the chunk may continue in the next one"""
+            if end == len(buffer) and not eof:
+                raise ValueError("Incomplete item")
+        except ValueError:
+            if eof:
+                raise
+
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        yield item
+
+        position = end
+        state = 'next'
+
+
+def _replay_host(operations, present):
+    """Applies the journal operations of a single host, like JsonStorage.replay does
+
+    :param operations: The (position in the journal, operation, data) tuples of the host
+    :param present: True if the host is in the DB file
+    :return: A tuple with True if the host is in the DB after the operations, the position in the journal
+             of the operation that appended it, or None if it keeps its place in the DB file, and its record
+    """
+    position = None
+    record = None
+
+    for index, operation, data in operations:
+        if operation == 'delete':
+            present = False
+        elif present:
+            record = data
+        else:
+            present = True
+            position = index
+            record = data
+
+    return present, position, record
+
+
+def get_storage(configuration, storage=None):
+    """Returns the storage backend selected by a configuration
+
+    :param configuration: A configuration instance
+    :param storage: The name of the storage backend, by default the one of the configuration
+    :return: A storage instance for the DB file of the configuration
+    """
+    storage = storage or configuration.storage
+
+    if storage == 'journal':
+        return JournalStorage(configuration.get_db_file())
+
+    if storage == 'sqlite':
+        return SqliteStorage(configuration.get_db_file(), configuration.get_sqlite_file())
+
+    return JsonStorage(configuration.get_db_file())
+
+
+class JsonStorage:
+    """Stores the whole database as a JSON array in a single file
+
+    Every save rewrites the whole file. The file is written and flushed to disk in a temporary file first
+    and then renamed over the DB file, so a reader, or a crash, never sees the DB file half written.
+
+    Writers of the same DB, in this or in other processes, are serialized with an advisory lock on a
+    '.lock' file next to the DB file, see lock(). Readers never take the lock.
+
+    A journal left by the JournalStorage backend is replayed when the DB is loaded and folded into
+    the DB file on the next save, so both backends can be used on the same DB.
+
+    Attributes:
+        lazy (bool): True if the backend can answer queries without loading the whole DB
+        _db_file (str): The absolute path to the database file
+        _journal_file (str): The absolute path to the journal file
+        _lock_file (str): The absolute path to the file used to lock the DB
+        _lock (RLock): Serializes the writers of this process
+        _lock_depth (int): Number of nested lock() calls of the thread that holds the lock
+        _lock_fd (file): The open lock file while the lock is held
+        _signature (tuple): The state of the DB files when they were last loaded or saved
+    """
+
+    lazy = False
+
+    _db_file = ''
+    _journal_file = ''
+    _lock_file = ''
+    _lock = None
+    _lock_depth = 0
+    _lock_fd = None
+    _signature = None
+
+    def _write_file(self, file_name, data):
+        """Writes a whole file atomically
+
+        The data is written to a temporary file that is flushed to disk and then renamed over the file.
+        """
+        temp_file = '{}.{}.{}.tmp'.format(file_name, os.getpid(), threading.get_ident())
+
+        try:
+            with open(temp_file, 'w') as outfile:
+                outfile.write(data)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+
+            os.replace(temp_file, file_name)
+        except OSError:
+            if os.path.isfile(temp_file):
+                os.remove(temp_file)
+
+            raise
+
+        _fsync_folder(os.path.dirname(file_name))
+
+    def _write_snapshot(self, servers):
+        """Writes the whole DB file"""
+        self._write_file(self._db_file, json.dumps(servers, default=json_default))
+
+    def signature(self):
+        """Returns the current state of the DB files
+
+        :return: A tuple with the inode, size and modification time of the DB file and of the journal
+        """
+        return _stat(self._db_file), _stat(self._journal_file)
+
+    def changed(self):
+        """Returns True if the DB files changed since they were last loaded or saved by this instance"""
+        return self._signature != self.signature()
+
+    @contextmanager
+    def lock(self):
+        """Locks the DB for writing
+
+        The lock is exclusive between threads and, where fcntl is available, between processes. It
+        can be nested by the thread that holds it.
+        """
+        with self._lock:
+            if self._lock_depth == 0:
+                self._lock_fd = open(self._lock_file, 'a')
+
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(self._lock_fd.fileno(), fcntl.LOCK_EX)
+                    except OSError:
+                        self._lock_fd.close()
+                        raise
+
+            self._lock_depth += 1
+
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+
+                if self._lock_depth == 0:
+                    """Closing the file releases the flock"""
+                    self._lock_fd.close()
+                    self._lock_fd = None
+
+    def _read_journal(self, f):
+        """Returns the operations of a journal file as (operation, data) tuples
+
+        A line that can not be parsed is the result of an interrupted append, so it is ignored
+        together with anything after it.
+        """
+        operations = []
+
+        for line in f:
+            if not line.endswith('\n'):
+                break
+
+            try:
+                entry = json.loads(line)
+                operations.append((entry['op'], entry['host'] if entry['op'] == 'delete' else entry['record']))
+            except (ValueError, KeyError, TypeError):
+                break
+
+        return operations
+
+    @staticmethod
+    def replay(servers, operations):
+        """Applies operations to a list of servers
+
+        Adding or updating a record replaces any record with the same host, and deleting a record
+        that does not exist does nothing. This way replaying an operation that is already part of
+        the DB file does not change the result.
+
+        :param servers: The list of records of the DB file, it is modified
+        :param operations: A list of (operation, data) tuples, see JournalStorage.save
+        :return: The resulting list of records
+        """
+        index = {entry['host']: idx for idx, entry in enumerate(servers)}
+
+        for operation, data in operations:
+            if operation == 'delete':
+                idx = index.pop(data, None)
+
+                if idx is not None:
+                    servers[idx] = None
+            else:
+                record = data
+                idx = index.get(record['host'])
+
+                if idx is None:
+                    index[record['host']] = len(servers)
+                    servers.append(record)
+                else:
+                    servers[idx] = record
+
+        return [entry for entry in servers if entry is not None]
+
+    def _read(self):
+        """Reads the DB file and replays the journal over it
+
+        :return: The list of records of the DB
+        """
+        servers = []
+        operations = []
+
+        """The journal is opened first, so a compaction that happens meanwhile can not hide operations"""
+        try:
+            journal = open(self._journal_file)
+        except OSError:
+            journal = None
+
+        try:
+            if os.path.isfile(self._db_file):
+                with open(self._db_file) as f:
+                    servers = json.load(f)
+
+            if journal:
+                operations = self._read_journal(journal)
+        finally:
+            if journal:
+                journal.close()
+
+        if operations:
+            servers = self.replay(servers, operations)
+
+        return servers
+
+    def iter_records(self):
+        """Reads the records of the DB one by one
+
+        The journal, which is kept small by the compactions, is read first. Then the DB file is read
+        incrementally and the operations of the journal are applied to each record as it is read, so
+        only one record of the DB file is in memory at a time. The records are returned in the same
+        order as load() returns them.
+
+        :return: A generator of records
+        """
+        operations = []
+        journal = None
+        f = None
+
+        """Both files are opened before they are read, as _read() does"""
+        try:
+            journal = open(self._journal_file)
+        except OSError:
+            pass
+
+        try:
+            try:
+                f = open(self._db_file)
+            except OSError:
+                pass
+
+            if journal:
+                operations = self._read_journal(journal)
+                journal.close()
+                journal = None
+
+            hosts = dict()
+
+            for position, (operation, data) in enumerate(operations):
+                host = data if operation == 'delete' else data['host']
+                hosts.setdefault(host, []).append((position, operation, data))
+
+            appended = []
+            seen = set()
+
+            for entry in _iter_array(f) if f else ():
+                host_operations = hosts.get(entry.get('host')) if isinstance(entry, dict) else None
+
+                if host_operations is None:
+                    yield entry
+                    continue
+
+                seen.add(entry['host'])
+                present, position, record = _replay_host(host_operations, True)
+
+                if present and position is None:
+                    yield record
+                elif present:
+                    appended.append((position, record))
+
+            for host, host_operations in hosts.items():
+                if host not in seen:
+                    present, position, record = _replay_host(host_operations, False)
+
+                    if present:
+                        appended.append((position, record))
+
+            for _, record in sorted(appended, key=lambda item: item[0]):
+                yield record
+        finally:
+            if journal:
+                journal.close()
+
+            if f:
+                f.close()
+
+    @profiler.timed
+    def load(self):
+        """Loads the database
+
+        :return: The list of records of the DB
+        """
+        signature = self.signature()
+        servers = self._read()
+
+        """If the files changed while they were read, changed() will report it"""
+        self._signature = signature
+
+        return servers
+
+    def save(self, servers, operations):
+        """Saves the database
+
+        :param servers: The whole list of records
+        :param operations: The operations applied since the last save, see JournalStorage.save.
+                           This backend ignores them.
+        :return: None
+        """
+        with self.lock():
+            self._write_snapshot(servers)
+
+            if os.path.isfile(self._journal_file):
+                os.remove(self._journal_file)
+
+            self._signature = self.signature()
+
+    def wait(self):
+        """Waits until any pending work of the backend is done"""
+        pass
+
+    def close(self):
+        """Releases the files of the backend, once its pending work is done"""
+        self.wait()
+
+    def __init__(self, db_file):
+        """JsonStorage constructor
+
+        :param db_file: The absolute path to the database file
+        """
+        self._db_file = db_file
+        self._journal_file = db_file + '.journal'
+        self._lock_file = db_file + '.lock'
+        self._lock = threading.RLock()
+
+
+class JournalStorage(JsonStorage):
+    """Stores the database as a snapshot plus an append-only journal
+
+    The snapshot is a DB file with the same format used by JsonStorage. Each add, update or delete is
+    appended to the journal as a JSON line, and the journal is replayed over the snapshot when the DB
+    is loaded.
+
+    Once the journal is bigger than max_journal_size bytes, or bigger than max_journal_ratio times the
+    snapshot, a background thread writes a new snapshot and removes the journal.
+
+    Attributes:
+        max_journal_size (int): Journal size in bytes that triggers a compaction
+        max_journal_ratio (float): Journal to snapshot size ratio that triggers a compaction
+        _compaction (Thread): The running compaction, if any
+    """
+
+    max_journal_size = 4 * 1024 * 1024
+    max_journal_ratio = 0.5
+
+    _compaction = None
+
+    def __needs_compaction(self, journal_size):
+        """Returns True if the journal passed one of the compaction thresholds"""
+        if journal_size >= self.max_journal_size:
+            return True
+
+        try:
+            snapshot_size = os.path.getsize(self._db_file)
+        except OSError:
+            snapshot_size = 0
+
+        return journal_size >= snapshot_size * self.max_journal_ratio
+
+    def __compact(self, servers, signature):
+        """Folds the journal into a new snapshot
+
+        The DB stays locked during the compaction, so no other writer can append to the journal while
+        it is folded. If the DB files changed since the records were copied, the copy is discarded and
+        the DB is read again.
+
+        :param servers: A copy of the records of the DB
+        :param signature: The signature of the DB files when the records were copied
+        """
+        try:
+            with self.lock():
+                own = self._signature == signature == self.signature()
+
+                if not own:
+                    servers = self._read()
+
+                self._write_snapshot(servers)
+
+                if os.path.isfile(self._journal_file):
+                    os.remove(self._journal_file)
+
+                if own:
+                    self._signature = self.signature()
+        except OSError:
+            """The journal is still complete, the next save will try again"""
+            pass
+
+    def save(self, servers, operations):
+        """Appends the operations to the journal
+
+        :param servers: The whole list of records, used only if a compaction starts
+        :param operations: A list of (operation, data) tuples, where operation is 'add', 'update' or
+                           'delete', and data is the record or, for a deletion, the host name.
+                           If it is None the whole DB is written like JsonStorage does.
+        :return: None
+        """
+        if operations is None:
+            self.wait()
+            super(JournalStorage, self).save(servers, operations)
+
+            return
+
+        lines = []
+
+        for operation, data in operations:
+            if operation == 'delete':
+                lines.append(json.dumps({'op': operation, 'host': data}))
+            else:
+                lines.append(json.dumps({'op': operation, 'record': data}, default=json_default))
+
+        with self.lock():
+            with open(self._journal_file, 'a') as f:
+                if lines:
+                    f.write('\n'.join(lines) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                offset = f.tell()
+
+            self._signature = self.signature()
+
+        if self._compaction is None or not self._compaction.is_alive():
+            if self.__needs_compaction(offset):
+                self._compaction = threading.Thread(target=self.__compact,
+                                                    args=(list(servers), self._signature))
+                self._compaction.start()
+
+    def wait(self):
+        """Waits until the running compaction, if any, is done"""
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def __init__(self, db_file):
+        """JournalStorage constructor
+
+        :param db_file: The absolute path to the database file
+        """
+        super(JournalStorage, self).__init__(db_file)
+
+
+_sqlite_schema = """
+CREATE TABLE IF NOT EXISTS servers (
+    position INTEGER PRIMARY KEY,
+    host TEXT NOT NULL UNIQUE,
+    environment TEXT NOT NULL,
+    role TEXT NOT NULL,
+    location TEXT NOT NULL,
+    variables TEXT,
+    fields TEXT
+);
+CREATE INDEX IF NOT EXISTS servers_environment ON servers (environment);
+CREATE INDEX IF NOT EXISTS servers_role ON servers (role);
+CREATE INDEX IF NOT EXISTS servers_location ON servers (location);
+"""
+
+_sqlite_columns = ('host', 'environment', 'role', 'location')
+
+
+def _to_row(record):
+    """Returns the SQLite row of a record
+
+    The variables and any other field that has no column of its own are stored as JSON.
+    """
+    fields = {k: v for k, v in record.items() if k not in _sqlite_columns and k != 'variables'}
+
+    return (record['host'], record['environment'], record['role'], record['location'],
+            json.dumps(record['variables']) if 'variables' in record else None,
+            json.dumps(fields) if fields else None)
+
+
+def _to_record(row):
+    """Returns the record of a SQLite row"""
+    record = dict(zip(_sqlite_columns, row))
+
+    if row[5] is not None:
+        record.update(json.loads(row[5]))
+
+    if row[4] is not None:
+        record['variables'] = json.loads(row[4])
+
+    return record
+
+
+class SqliteStorage(JsonStorage):
+    """Stores the database in a SQLite file
+
+    The host, environment, role and location of each record are stored in indexed columns and the
+    variables as JSON, so a query by host or by those fields only reads the matching rows. Records
+    keep the order in which they were added.
+
+    Each save applies the operations in a single transaction, nothing else is rewritten. The writers
+    still take the lock of JsonStorage, SQLite protects the readers.
+
+    Attributes:
+        _sqlite_file (str): The absolute path to the SQLite file
+        _connection (Connection): The connection to the SQLite file, opened on first use
+    """
+
+    lazy = True
+
+    _sqlite_file = ''
+    _connection = None
+
+    def _connect(self):
+        """Returns the connection to the SQLite file, creating its tables if they do not exist
+
+        sqlite3 is imported here, so the other backends never pay for its import.
+        """
+        if self._connection is None:
+            import sqlite3
+
+            self._connection = sqlite3.connect(self._sqlite_file, timeout=30, check_same_thread=False)
+            self._connection.executescript(_sqlite_schema)
+
+            self._signature = self.signature()
+
+        return self._connection
+
+    def _query(self, where='', parameters=()):
+        """Returns the records of the rows that meet a WHERE clause, in the order they were added"""
+        sql = 'SELECT host, environment, role, location, variables, fields FROM servers {} ORDER BY position'
+
+        return [_to_record(row) for row in self._connect().execute(sql.format(where), parameters)]
+
+    def signature(self):
+        """Returns the current state of the SQLite file"""
+        return _stat(self._sqlite_file)
+
+    @profiler.timed
+    def load(self):
+        """Loads the database
+
+        :return: The list of records of the DB
+        """
+        signature = self.signature()
+        servers = self._query()
+
+        self._signature = signature
+
+        return servers
+
+    def iter_records(self):
+        """Reads the records of the DB one by one, in the order they were added
+
+        :return: A generator of records
+        """
+        sql = 'SELECT host, environment, role, location, variables, fields FROM servers ORDER BY position'
+
+        for row in self._connect().execute(sql):
+            yield _to_record(row)
+
+    def select(self, host_filter):
+        """Returns the records that match a filter
+
+        The sets of values of the filter become a WHERE clause, a location pattern is applied to the
+        rows that the WHERE clause returns.
+
+        :param host_filter: A HostFilter instance
+        :return: A list with the matching records
+        """
+        conditions = []
+        parameters = []
+
+        for column, values in zip(_sqlite_columns[1:],
+                                  (host_filter.environments, host_filter.roles, host_filter.locations)):
+            if values is not None:
+                conditions.append('{} IN ({})'.format(column, ', '.join('?' * len(values))))
+                parameters.extend(sorted(values))
+
+        result = self._query('WHERE ' + ' AND '.join(conditions) if conditions else '', parameters)
+
+        if host_filter.location_pattern is not None:
+            result = [entry for entry in result if host_filter.location_pattern.search(entry['location'])]
+
+        return result
+
+    def get(self, host):
+        """Returns the record of a host
+
+        :param host: The host name
+        :return: The data dictionary of the host, or None if the host is not in the DB
+        """
+        result = self._query('WHERE host = ?', (host,))
+
+        return result[0] if result else None
+
+    def save(self, servers, operations):
+        """Applies the operations to the SQLite file
+
+        :param servers: The whole list of records, used only if operations is None
+        :param operations: A list of (operation, data) tuples, see JournalStorage.save.
+                           If it is None the whole DB is replaced by servers.
+        :return: None
+        """
+        insert = 'INSERT INTO servers (host, environment, role, location, variables, fields) ' \
+                 'VALUES (?, ?, ?, ?, ?, ?)'
+        upsert = insert + ' ON CONFLICT (host) DO UPDATE SET environment = excluded.environment, ' \
+                          'role = excluded.role, location = excluded.location, ' \
+                          'variables = excluded.variables, fields = excluded.fields'
+
+        with self.lock():
+            connection = self._connect()
+
+            with connection:
+                if operations is None:
+                    connection.execute('DELETE FROM servers')
+                    connection.executemany(insert, (_to_row(entry) for entry in servers))
+                else:
+                    for operation, data in operations:
+                        if operation == 'delete':
+                            connection.execute('DELETE FROM servers WHERE host = ?', (data,))
+                        else:
+                            connection.execute(upsert, _to_row(data))
+
+            self._signature = self.signature()
+
+    def close(self):
+        """Closes the connection to the SQLite file, the next query opens it again"""
+        super(SqliteStorage, self).close()
+
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __init__(self, db_file, sqlite_file):
+        """SqliteStorage constructor
+
+        :param db_file: The absolute path to the database file, its lock file is used by the writers
+        :param sqlite_file: The absolute path to the SQLite file
+        """
+        super(SqliteStorage, self).__init__(db_file)
+
+        self._sqlite_file = sqlite_file
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""watcher.py
+====================================
+Created on: 18/10/2026
+"""
+
+from dynamic_hosts.storage import _stat
+
+import os
+import errno
+import select
+import threading
+
+"""inotify flags, see inotify(7)"""
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_mask = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+
+def _inotify():
+    """Returns the libc functions of inotify, or None if they are not available"""
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+
+        return libc.inotify_init1, libc.inotify_add_watch
+    except (ImportError, OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """Calls a function when any of a group of files changes
+
+    On Linux the folders of the files are watched with inotify, through ctypes, otherwise the size,
+    modification time and inode of each file are polled. The files are usually replaced by a rename,
+    so the folders are watched and not the files themselves. A folder that does not exist when the
+    watcher starts is polled.
+
+    The changes are reported from the thread of the watcher, the changes of a file that happen within
+    the delay are reported once.
+
+    Attributes:
+        _files (dict): The group of each watched file, by its absolute path
+        _signatures (dict): The last inode, size and modification time of each watched file, the same
+                            signature that the storage backends use to detect a changed DB
+        _folders (set): The folders watched with inotify
+        _callback (callable): The function called with the group of a changed file
+        _interval (float): Seconds between two polls of the files
+        _delay (float): Seconds to wait for more changes before a change is reported
+        _fd (int): The inotify file descriptor, None if the files are polled
+        _wakeup (tuple): A pipe that wakes the thread up when the watcher is stopped
+    """
+
+    _files = None
+    _signatures = None
+    _folders = None
+    _callback = None
+    _interval = 1.0
+    _delay = 0.05
+    _fd = None
+
+    def add(self, group, files):
+        """Watches a group of files
+
+        :param group: The value passed to the callback when any of the files changes, e.g. a client name
+        :param files: The paths of the files, they do not need to exist
+        :return: None
+        """
+        with self._lock:
+            for file_name in files:
+                file_name = os.path.abspath(file_name)
+
+                self._files[file_name] = group
+                self._signatures[file_name] = _stat(file_name)
+
+                folder = os.path.dirname(file_name)
+
+                if self._fd is not None and folder not in self._folders:
+                    if self._add_watch(self._fd, folder.encode(), _mask) >= 0:
+                        self._folders.add(folder)
+
+    def start(self):
+        """Starts the thread of the watcher"""
+        self._thread = threading.Thread(target=self.__run, name='FileWatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the thread of the watcher and waits for it"""
+        if not self._wakeup:
+            return
+
+        self._stop.set()
+        os.write(self._wakeup[1], b'x')
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+        for fd in self._wakeup:
+            os.close(fd)
+
+        self._wakeup = ()
+
+    @property
+    def uses_inotify(self):
+        """Returns True if the folders are watched with inotify"""
+        return self._fd is not None
+
+    def __changes(self):
+        """Returns the groups of the files whose signature changed since the last call"""
+        groups = []
+
+        with self._lock:
+            for file_name, group in self._files.items():
+                signature = _stat(file_name)
+
+                if signature != self._signatures[file_name]:
+                    self._signatures[file_name] = signature
+
+                    if group not in groups:
+                        groups.append(group)
+
+        return groups
+
+    def __polled(self):
+        """Returns True if some file is in a folder that is not watched with inotify"""
+        with self._lock:
+            return any(os.path.dirname(file_name) not in self._folders for file_name in self._files)
+
+    def __drain(self):
+        """Discards the pending inotify events, returns True if there was any
+
+        The events only tell that something changed in a folder, the signatures tell which files changed.
+        """
+        found = False
+
+        while True:
+            try:
+                found = bool(os.read(self._fd, 65536)) or found
+            except OSError as ex:
+                if ex.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return found
+
+                raise
+
+    def __run(self):
+        while not self._stop.is_set():
+            if self._fd is not None and not self.__polled():
+                ready, _, _ = select.select([self._fd, self._wakeup[0]], [], [], self._interval)
+
+                if self._stop.is_set():
+                    break
+
+                if not ready or not self.__drain():
+                    continue
+
+                self._stop.wait(self._delay)
+                self.__drain()
+            else:
+                self._stop.wait(self._interval)
+
+            for group in self.__changes():
+                self._callback(group)
+
+    def __init__(self, callback, interval=1.0, delay=0.05, inotify=True):
+        """FileWatcher constructor
+
+        :param callback: The function called with the group of a file when it changes
+        :param interval: Seconds between two polls of the files, if they are polled
+        :param delay: Seconds to wait for more changes before a change is reported
+        :param inotify: False to always poll the files
+        """
+        self._files = dict()
+        self._signatures = dict()
+        self._folders = set()
+        self._callback = callback
+        self._interval = interval
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._wakeup = os.pipe()
+
+        functions = _inotify() if inotify else None
+
+        if functions is not None:
+            init, self._add_watch = functions
+            fd = init(_IN_NONBLOCK | _IN_CLOEXEC)
+
+            if fd >= 0:
+                self._fd = fd
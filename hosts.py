@@ -12,20 +12,83 @@ Changes:
 
 try:
     import dynamic_hosts._version as _V_
+    from dynamic_hosts import cache
     from dynamic_hosts import configuration
-    from dynamic_hosts import dynamic_hosts
+    from dynamic_hosts import profiler
 except ImportError:
     print("The script has not found the necessary dependencies and will be closed.")
     print("Please execute the installation command: 'python setup.py install'")
     exit(2)
 
-import json
-import argparse
-import unittest
+import sys
+import itertools
 
-_configuration = configuration.ProdConfig()
+_configuration = None
 _dyn_hosts = None
 
+"""Arguments understood without argparse, with their default values"""
+_default_arguments = {
+    'client': None,
+    'config': False,
+    'cprofile': None,
+    'daemon': False,
+    'delete_where': None,
+    'env': None,
+    'fsck': False,
+    'groups': False,
+    'host': None,
+    'import_file': None,
+    'list': False,
+    'migrate': None,
+    'new_server': False,
+    'no_cache': False,
+    'no_daemon': False,
+    'no_validation': False,
+    'profile': None,
+    'set': None,
+    'storage': None,
+    'test': False,
+    'update_server': False,
+    'update_where': None,
+    'verbose': None,
+}
+
+"""Arguments with a value understood without argparse, with their valid choices"""
+_value_arguments = {
+    '--client': None,
+    '--cprofile': None,
+    '--env': ('dev', 'test', 'prod'),
+    '--host': None,
+    '--storage': ('json', 'journal', 'sqlite'),
+}
+
+
+class Arguments:
+    """The parsed command line arguments"""
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+@profiler.timed
+def load_dynamic_hosts():
+    """Creates the dynamic hosts instance
+
+    The dynamic hosts module is imported here and not at the top of the script,
+    so an inventory can be returned from the cache without loading the DB or jsonschema.
+    """
+    try:
+        from dynamic_hosts import dynamic_hosts
+    except ImportError:
+        print("The script has not found the necessary dependencies and will be closed.")
+        print("Please execute the installation command: 'python setup.py install'")
+        exit(2)
+
+    try:
+        return dynamic_hosts.DynamicHosts(_configuration)
+    except Exception as ex:
+        sys.stderr.write("{}\n".format(ex))
+        exit(1)
+
 
 def show_config():
     success = 0
@@ -38,6 +101,7 @@ def show_config():
     print(message.format("Environment", _configuration.environment))
     print(message.format("Role", _configuration.role))
     print(message.format("Location", _configuration.location))
+    print(message.format("Host groups", _configuration.host_groups))
     if _configuration.verbose > 0:
         print(message.format("Database", _configuration.get_db_file()))
     print("*************************************")
@@ -47,6 +111,8 @@ def show_config():
 
 def test():
     """Runs the tests"""
+    import unittest
+
     tests = unittest.TestLoader().discover('tests', pattern='test*.py')
 
     result = unittest.TextTestRunner(verbosity=2).run(tests)
@@ -54,55 +120,358 @@ def test():
     return 0 if result.wasSuccessful() else 1
 
 
-if __name__ == "__main__":
+def fast_arguments(argv):
+    """Parses the arguments of the read only invocations without argparse
+
+    Ansible and the CI call this script many times with a handful of read only arguments,
+    parsing them by hand avoids importing argparse. Any other argument or an invalid value
+    returns None, so the complete parser handles it and reports the errors.
+
+    :param argv: The command line arguments without the script name
+    :return: An Arguments instance with the same attributes that argparse returns, or None
+    """
+    result = dict(_default_arguments)
+    position = 0
+
+    while position < len(argv):
+        arg = argv[position]
+
+        if arg in ('--config', '--groups', '--list', '--no-cache', '--no-daemon', '--no-validation'):
+            result[arg[2:].replace('-', '_')] = True
+        elif arg == '--profile':
+            """The file of the report is optional"""
+            if position + 1 < len(argv) and not argv[position + 1].startswith('-'):
+                position += 1
+                result['profile'] = argv[position]
+            else:
+                result['profile'] = '-'
+        elif arg in _value_arguments and position + 1 < len(argv) and not argv[position + 1].startswith('-'):
+            position += 1
+            result[arg[2:]] = argv[position]
+        else:
+            return None
+
+        position += 1
+
+    for name, choices in _value_arguments.items():
+        if choices and result[name[2:]] not in (None,) + choices:
+            return None
+
+    if not (result['config'] or result['host'] or result['list']):
+        return None
+
+    return Arguments(result)
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments
+
+    :param argv: The command line arguments without the script name
+    :return: The parsed arguments
+    """
+    args = fast_arguments(argv)
+
+    if args:
+        return args
+
+    import argparse
+
     parser = argparse.ArgumentParser(description='Dynamic host generating tool')
-    parser.add_argument('--client', type=str, help='A valid client')
+    parser.add_argument('--client', type=str,
+                        help="A valid client, a comma separated list of clients or '*' for every client")
     parser.add_argument('--config', action='store_true', help='Display current configuration')
+    parser.add_argument('--cprofile', metavar='FILE', type=str,
+                        help='Write the cProfile statistics of this invocation to a file.')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run the inventory daemon, which answers --list and --host from memory.')
+    parser.add_argument('--delete-where', metavar='FIELDS', type=str,
+                        help='Delete every record that matches the given filters, e.g. role=web,app,location=M*.')
     parser.add_argument('--env', choices=['dev', 'test', 'prod'],
                         help='Execution environment of this script. By default it is executed in production.')
+    parser.add_argument('--fsck', action='store_true',
+                        help='Validate the whole database and report every problem found.')
+    parser.add_argument('--groups', action='store_true',
+                        help='Group the hosts of the inventory by environment, role and location, like THE_HOST_GROUPS=1.')
+    parser.add_argument('--host', type=str, help='Returns the variables of a host.')
+    parser.add_argument('--import', dest='import_file', metavar='FILE', type=str,
+                        help='Add the server records of a JSON Lines or CSV file.')
     parser.add_argument('--list', action='store_true',
                         help='Returns all hosts that meet the criteria.')
+    parser.add_argument('--migrate', choices=['json', 'journal', 'sqlite'],
+                        help='Copy the whole database to another storage backend.')
     parser.add_argument('--new-server', action='store_true', help='Add new server record.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not use the cache of rendered inventories.')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Do not send the query to the inventory daemon, even if it is running.')
+    parser.add_argument('--no-validation', action='store_true',
+                        help='Do not validate the whole database when it is loaded.')
+    parser.add_argument('--profile', metavar='FILE', nargs='?', const='-',
+                        help='Write a JSON report with the time of each phase of this invocation to a file, '
+                             'by default to the standard error.')
+    parser.add_argument('--set', metavar='FIELDS', type=str,
+                        help='The new environment, role or location of the records of --update-where, e.g. location=GDL.')
+    parser.add_argument('--storage', choices=['json', 'journal', 'sqlite'],
+                        help='Storage backend of the database. By default the whole database is rewritten on each change.')
     parser.add_argument('--test', action='store_true', help='Run tests')
     parser.add_argument('--update-server', action='store_true', help='Update information of a server.')
+    parser.add_argument('--update-where', metavar='FIELDS', type=str,
+                        help='Change every record that matches the given filters to the values of --set.')
     parser.add_argument('--verbose', '-v', action='count',
                         help='Displays extra data in the console output. It should not be used in production.')
     parser.add_argument('--version', action='version', version='%(prog)s {} build {}'.format(_V_.__version__, _V_.__build__))
 
-    args = parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def run_daemon():
+    """Runs the inventory daemon until it is stopped with SIGTERM or SIGINT"""
+    import signal
+
+    try:
+        from dynamic_hosts.daemon import InventoryDaemon
+    except ImportError:
+        print("The script has not found the necessary dependencies and will be closed.")
+        print("Please execute the installation command: 'python setup.py install'")
+        exit(2)
+
+    try:
+        daemon = InventoryDaemon(_configuration)
+    except Exception as ex:
+        sys.stderr.write("{}\n".format(ex))
+        return 1
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        daemon.preload()
+        sys.stderr.write("Listening on {}\n".format(_configuration.get_socket_file()))
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+
+    return 0
+
+
+@profiler.timed
+def print_from_daemon(host=None):
+    """Prints the inventory, or the variables of a host, returned by the inventory daemon
+
+    :param host: The host name, if the variables of a host are requested
+    :return: True if the daemon answered, False if it is not running and the DB must be loaded
+    """
+    from dynamic_hosts import client
+
+    request = client.build_request(_configuration, 'host' if host else 'list', host)
+    response = client.query(_configuration.get_socket_file(), request)
+
+    if response is None:
+        return False
+
+    header, body = response
+
+    sys.stdout.buffer.write(body + b'\n')
+    sys.stdout.flush()
+
+    print_collisions(header.get('collisions', []))
+
+    return True
+
+
+def print_collisions(collisions):
+    """Warns about the hosts found in several clients
+
+    :param collisions: The (host, client, other client) tuples of the hosts
+    :return: None
+    """
+    for host, owner, other in collisions:
+        sys.stderr.write("WARNING: The host {} is in the clients {} and {}, "
+                         "the record of {} is used\n".format(host, owner, other, owner))
+
 
-    if args.env:
-        if args.env == 'dev':
-            _configuration = configuration.DevConfig()
-        elif args.env == 'test':
-            _configuration = configuration.TestConfig()
+@profiler.timed
+def print_inventory(inventory_cache=None, cache_key=None):
+    """Prints the inventory and stores it in the cache
+
+    The inventory is written to the standard output in chunks while the records are read,
+    so its JSON document is never built in memory.
+
+    :param inventory_cache: An InventoryCache instance, if the output must be cached
+    :param cache_key: The key returned by the cache before the DB was loaded
+    :return: None
+    """
+    import json
+
+    if _configuration.verbose > 0:
+        print(json.dumps(_dyn_hosts.get_list(), indent=4, sort_keys=True))
+    else:
+        chunks = itertools.chain((chunk.encode() for chunk in _dyn_hosts.iter_list()), [b'\n'])
+
+        if inventory_cache:
+            inventory_cache.tee(cache_key, chunks, sys.stdout.buffer)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+
+
+@profiler.timed
+def print_host(host, inventory_cache=None, cache_key=None):
+    """Prints the variables of a host and stores the variables of every host in the cache
+
+    If the output must be cached, the table of every host is built with a single pass over the DB
+    and the host is answered from it, otherwise only the host is read.
+
+    :param host: The host name
+    :param inventory_cache: An InventoryCache instance, if the output must be cached
+    :param cache_key: The key returned by the cache before the DB was loaded
+    :return: None
+    """
+    import json
+
+    if _configuration.verbose > 0:
+        print(json.dumps(_dyn_hosts.get_host(host), indent=4, sort_keys=True))
+    elif inventory_cache:
+        table = [(name, json.dumps(variables).encode()) for name, variables in _dyn_hosts.get_all_host_vars()]
+        host_vars = next((variables for name, variables in table if name == host), b'{}')
+
+        sys.stdout.buffer.write(host_vars + b'\n')
+        sys.stdout.buffer.flush()
+
+        inventory_cache.put_table(cache_key, table)
+    else:
+        print(json.dumps(_dyn_hosts.get_host(host)))
+
+
+if __name__ == "__main__":
+    args = parse_arguments(sys.argv[1:])
+
+    if args.env == 'dev':
+        _configuration = configuration.DevConfig()
+    elif args.env == 'test':
+        _configuration = configuration.TestConfig()
+    else:
+        _configuration = configuration.ProdConfig()
 
     if args.verbose:
         _configuration.verbose = args.verbose
 
+    if _configuration.log_format != 'text' or _configuration.log_level != 'verbose':
+        from dynamic_hosts.logger import logger
+
+        try:
+            if _configuration.log_format not in ('text', 'json'):
+                raise Exception("Unknown log format {}".format(_configuration.log_format))
+
+            logger.Logger.configure(level=_configuration.log_level, json_lines=_configuration.log_format == 'json')
+        except Exception as ex:
+            sys.stderr.write("{}\n".format(ex))
+            exit(1)
+
+    if args.profile:
+        _configuration.profile = args.profile
+
+    if args.cprofile:
+        _configuration.cprofile = args.cprofile
+
+    if _configuration.profile:
+        profiler.enable(_configuration.profile)
+
+    if _configuration.cprofile:
+        profiler.start_cprofile(_configuration.cprofile)
+
     if args.test:
         exit(test())
 
     if args.client:
         _configuration.client = args.client
 
+    if args.storage:
+        _configuration.storage = args.storage
+
+    if args.groups:
+        _configuration.host_groups = True
+
     if args.config:
         exit(show_config())
 
-    _dyn_hosts = dynamic_hosts.DynamicHosts(_configuration)
+    if args.no_daemon:
+        _configuration.daemon = False
+
+    if args.daemon:
+        exit(run_daemon())
+
+    if args.no_validation or args.fsck:
+        _configuration.validate_on_load = False
+
+    if args.no_cache or _configuration.multi_client:
+        _configuration.inventory_cache = False
+
+    if args.list or args.host:
+        """The read only queries keep only the matching records of the DB"""
+        _configuration.stream_on_load = True
+
+    if (args.list or args.host) and _configuration.daemon and _configuration.verbose == 0:
+        if print_from_daemon(args.host):
+            exit(0)
+
+    _inventory_cache = None
+    _cache_key = None
+
+    if args.list and _configuration.inventory_cache and _configuration.verbose == 0:
+        _inventory_cache = cache.InventoryCache(_configuration)
+        _cache_key = _inventory_cache.key('list',
+                                          _configuration.environment,
+                                          _configuration.role,
+                                          _configuration.location,
+                                          _configuration.group,
+                                          _configuration.host_groups,
+                                          _configuration.storage,
+                                          _configuration.validate_on_load)
+
+        if _inventory_cache.send(_cache_key, sys.stdout.buffer):
+            exit(0)
+
+    if args.host and _configuration.inventory_cache and _configuration.verbose == 0:
+        _inventory_cache = cache.InventoryCache(_configuration)
+        _cache_key = _inventory_cache.key('host', _configuration.storage, _configuration.validate_on_load)
+        _host_vars = _inventory_cache.lookup(_cache_key, args.host, b'{}')
+
+        if _host_vars is not None:
+            sys.stdout.buffer.write(_host_vars + b'\n')
+            exit(0)
+
+    _dyn_hosts = load_dynamic_hosts()
+
+    if args.fsck:
+        exit(_dyn_hosts.check_db())
+
+    if args.migrate:
+        exit(_dyn_hosts.migrate(args.migrate))
 
     if args.new_server:
         print("Please enter the following information:")
         exit(_dyn_hosts.add_server())
 
+    if args.import_file:
+        exit(_dyn_hosts.import_servers(args.import_file))
+
     if args.update_server:
         print("Please enter the following information:")
         exit(_dyn_hosts.update_server())
 
+    if args.update_where:
+        exit(_dyn_hosts.update_where(args.update_where, args.set))
+
+    if args.delete_where:
+        exit(_dyn_hosts.delete_where(args.delete_where))
+
+    if args.host:
+        print_host(args.host, _inventory_cache, _cache_key)
+        exit(0)
+
     if args.list:
-        data = _dyn_hosts.get_list()
+        print_inventory(_inventory_cache, _cache_key)
 
-        if _configuration.verbose > 0:
-            print(json.dumps(data, indent=4, sort_keys=True))
-        else:
-            print(json.dumps(data))
+        print_collisions(_dyn_hosts.get_collisions())
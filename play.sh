@@ -181,7 +181,11 @@ if [[ $# -gt 0 ]]; then
                 ;;
             -g|--group)
                 if [[ ! -z "$(echo "${THE_GROUPS[@]:0}" | grep -ow $2)" ]]; then
-                    GROUP_FILTER="--env THE_GROUP=$2"
+                    if [[ "$2" == "self" ]]; then
+                        GROUP_FILTER="--env THE_HOST_GROUPS=1"
+                    else
+                        GROUP_FILTER="--env THE_GROUP=$2"
+                    fi
                 else
                     echo -e "$ERROR_MSG Unknown group option: $2"
                     usage
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: test_cache
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: 
+"""
+
+from dynamic_hosts import configuration
+from dynamic_hosts.cache import InventoryCache
+from dynamic_hosts.cache import ResponseCache
+from dynamic_hosts.database import ServersDB
+from dynamic_hosts.storage import get_storage
+
+import io
+import os
+import sys
+import json
+import shutil
+import unittest
+import subprocess
+
+
+class TestInventoryCache(unittest.TestCase):
+    _config = None
+    _cache = None
+
+    def setUp(self):
+        self._config = configuration.TestConfig()
+        self._config.client = 'test_cache'
+        self._cache = InventoryCache(self._config)
+
+        os.makedirs(os.path.dirname(self._config.get_db_file()), exist_ok=True)
+
+        with open(self._config.get_db_file(), 'w') as f:
+            json.dump([{'host': 'cache.domain.net', 'environment': 'dev', 'role': 'app', 'location': 'MEX'}], f)
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self._config.get_db_file()), ignore_errors=True)
+
+    def test_hit(self):
+        """Testing that a stored entry is returned for the same query"""
+        key = self._cache.key('list', 'dev', None, None, None)
+        self._cache.put(key, b'{"all": {}}\n')
+
+        stream = io.BytesIO()
+
+        self.assertTrue(self._cache.send(self._cache.key('list', 'dev', None, None, None), stream))
+        self.assertEqual(b'{"all": {}}\n', stream.getvalue())
+        self.assertIsNone(self._cache.get(self._cache.key('list', 'itg', None, None, None)))
+
+    def test_tee(self):
+        """Testing that the chunks are written to the stream and stored, but not if the stream fails"""
+        key = self._cache.key('list', 'pro', None, None, None)
+        stream = io.BytesIO()
+
+        self._cache.tee(key, [b'{"all": ', b'{}}', b'\n'], stream)
+
+        self.assertEqual(b'{"all": {}}\n', stream.getvalue())
+        self.assertEqual(b'{"all": {}}\n', self._cache.get(key))
+
+        def failing_chunks():
+            yield b'{'
+            raise OSError("Broken pipe")
+
+        key = self._cache.key('list', 'itg', None, None, None)
+
+        with self.assertRaises(OSError):
+            self._cache.tee(key, failing_chunks(), io.BytesIO())
+
+        self.assertIsNone(self._cache.get(key))
+        self.assertEqual([], [name for name in os.listdir(self._cache._folder) if name.endswith('.tmp')])
+
+    def test_db_change(self):
+        """Testing that an entry is stale once the DB file changes"""
+        key = self._cache.key('list', None, None, None, None)
+        self._cache.put(key, b'{}\n')
+
+        with open(self._config.get_db_file(), 'w') as f:
+            json.dump([], f)
+
+        stream = io.BytesIO()
+
+        self.assertFalse(self._cache.send(self._cache.key('list', None, None, None, None), stream))
+        self.assertEqual(b'', stream.getvalue())
+
+    def test_save_invalidates(self):
+        """Testing that a write through the DB removes the cache"""
+        key = self._cache.key('list', None, None, None, None)
+        self._cache.put(key, b'{}\n')
+
+        self.assertEqual(b'{}\n', self._cache.get(key))
+
+        db = ServersDB(self._config)
+        db.import_servers([(1, {'host': 'other.domain.net', 'environment': 'dev', 'role': 'app', 'location': 'MEX'})])
+
+        self.assertIsNone(self._cache.get(key))
+
+    def test_table(self):
+        """Testing the lookup of values stored in a table"""
+        key = self._cache.key('host')
+        items = [('host{}.domain.net'.format(i), '{{"id": {}}}'.format(i).encode()) for i in range(100)]
+        self._cache.put_table(key, items)
+
+        for name, value in items:
+            self.assertEqual(value, self._cache.lookup(key, name))
+
+        self.assertEqual(b'{}', self._cache.lookup(key, 'unknown.domain.net', b'{}'))
+        self.assertIsNone(self._cache.lookup(self._cache.key('list'), 'host1.domain.net'))
+
+        with open(self._config.get_db_file(), 'w') as f:
+            json.dump([], f)
+
+        self.assertIsNone(self._cache.lookup(self._cache.key('host'), 'host1.domain.net'))
+
+    def test_empty_table(self):
+        """Testing the lookup of values in an empty table"""
+        key = self._cache.key('host')
+        self._cache.put_table(key, [])
+
+        self.assertEqual(b'', self._cache.lookup(key, 'host1.domain.net'))
+
+    def test_storage_switch(self):
+        """Testing that the queries of each storage backend have their own entries"""
+        sqlite = configuration.TestConfig()
+        sqlite.client = self._config.client
+        sqlite.storage = 'sqlite'
+
+        get_storage(sqlite).save([{'host': 'sqlite.domain.net', 'environment': 'dev', 'role': 'app',
+                                   'location': 'MEX', 'variables': {'shell': 'zsh'}}], None)
+
+        root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        env = dict(os.environ, THE_CLIENT=self._config.client, THE_ENVIRONMENT='', THE_ROLE='', THE_LOCATION='')
+
+        def run(*arguments):
+            return subprocess.check_output([sys.executable, os.path.join(root, 'hosts.py'), '--env', 'test',
+                                            '--no-daemon'] + list(arguments), env=env)
+
+        for _ in range(2):
+            self.assertEqual(['cache.domain.net'], json.loads(run('--list'))['all']['hosts'])
+            self.assertEqual(['sqlite.domain.net'], json.loads(run('--list', '--storage', 'sqlite'))['all']['hosts'])
+            self.assertEqual({}, json.loads(run('--host', 'sqlite.domain.net')))
+            self.assertEqual({'shell': 'zsh'}, json.loads(run('--host', 'sqlite.domain.net', '--storage', 'sqlite')))
+
+    def test_validation_switch(self):
+        """Testing that an inventory rendered without validation is not returned to a validating query"""
+        with open(self._config.get_db_file(), 'w') as f:
+            json.dump([{'host': 'cache.domain.net', 'environment': 'dev', 'role': 'bogus', 'location': 'MEX'}], f)
+
+        root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        env = dict(os.environ, THE_CLIENT=self._config.client, THE_ENVIRONMENT='', THE_ROLE='', THE_LOCATION='')
+
+        def run(*arguments):
+            return subprocess.run([sys.executable, os.path.join(root, 'hosts.py'), '--env', 'test', '--no-daemon',
+                                   '--list'] + list(arguments), env=env, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL)
+
+        self.assertEqual(['cache.domain.net'], json.loads(run('--no-validation').stdout)['all']['hosts'])
+        self.assertEqual(b'', run().stdout)
+
+    def test_no_jsonschema(self):
+        """Testing that the cache does not need jsonschema"""
+        output = subprocess.check_output([sys.executable, '-c',
+                                          'import sys, dynamic_hosts.cache; print("jsonschema" in sys.modules)'],
+                                         cwd=os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+        self.assertEqual(b'False', output.strip())
+
+
+class TestResponseCache(unittest.TestCase):
+    _cache = None
+
+    def setUp(self):
+        self._cache = ResponseCache(max_entries=2, max_bytes=10)
+
+    def test_revision(self):
+        """Testing that an entry is only returned for its revision"""
+        key = ('list', None, 'client', 'dev', None, None, None, None)
+        self._cache.put(key, '1', {'status': 'ok'}, b'{}')
+
+        self.assertEqual(({'status': 'ok'}, b'{}'), self._cache.get(key, '1'))
+        self.assertIsNone(self._cache.get(key, '2'))
+        self.assertIsNone(self._cache.get(key, '1'))
+        self.assertEqual({'hits': 1, 'misses': 2, 'evictions': 0, 'not_modified': 0, 'entries': 0, 'bytes': 0},
+                         self._cache.get_stats())
+
+    def test_lru(self):
+        """Testing that the least recently used entries are evicted"""
+        self._cache.put('a', '1', {}, b'aaa')
+        self._cache.put('b', '1', {}, b'bbb')
+        self._cache.get('a', '1')
+        self._cache.put('c', '1', {}, b'ccc')
+
+        self.assertIsNone(self._cache.get('b', '1'))
+        self.assertIsNotNone(self._cache.get('a', '1'))
+
+        self._cache.put('d', '1', {}, b'dddddddd')
+
+        self.assertIsNone(self._cache.get('a', '1'))
+        self.assertIsNone(self._cache.get('c', '1'))
+        self.assertEqual(b'dddddddd', self._cache.get('d', '1')[1])
+
+        self._cache.put('e', '1', {}, b'e' * 11)
+
+        self.assertIsNone(self._cache.get('e', '1'))
+        self.assertEqual(3, self._cache.get_stats()['evictions'])
+
+    def test_etag(self):
+        """Testing the ETags of the keys and revisions"""
+        etag = self._cache.etag('a', '1')
+
+        self.assertEqual(etag, self._cache.etag('a', '1'))
+        self.assertNotEqual(etag, self._cache.etag('b', '1'))
+        self.assertNotEqual(etag, self._cache.etag('a', '2'))
+        self.assertNotEqual(etag, ResponseCache().etag('a', '1'))
+        self.assertTrue(self._cache.not_modified('a', '1', etag))
+        self.assertFalse(self._cache.not_modified('a', '2', etag))
+        self.assertFalse(self._cache.not_modified('a', '1', None))
+        self.assertEqual(1, self._cache.get_stats()['not_modified'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -211,6 +211,37 @@ class TestProductionConfig(unittest.TestCase):
 
         del os.environ['THE_LOCATION']
 
+    def test_profile_prop(self):
+        self.assertIsNone(self._config.profile, "Profiling is enabled by default")
+
+        for value, expected in (('1', '-'), ('stderr', '-'), ('/tmp/report.json', '/tmp/report.json')):
+            os.environ['THE_PROFILE'] = value
+            os.environ['THE_CPROFILE'] = value
+            self._config = configuration.ProdConfig()
+
+            self.assertEqual(expected, self._config.profile, "Profile target does not match")
+            self.assertEqual(value, self._config.cprofile, "cProfile file does not match")
+
+        del os.environ['THE_PROFILE']
+        del os.environ['THE_CPROFILE']
+
+    def test_host_groups_prop(self):
+        self.assertFalse(self._config.host_groups, "The host groups are enabled by default")
+
+        for value, expected in (('1', True), ('yes', True), ('self', False), ('0', False)):
+            os.environ['THE_HOST_GROUPS'] = value
+            self._config = configuration.ProdConfig()
+
+            self.assertEqual(expected, self._config.host_groups, "Host groups do not match")
+
+        del os.environ['THE_HOST_GROUPS']
+
+        os.environ['THE_GROUP'] = 'self'
+
+        self.assertFalse(configuration.ProdConfig().host_groups, "A group named self groups the hosts")
+
+        del os.environ['THE_GROUP']
+
 
 if __name__ == '__main__':
     unittest.main()
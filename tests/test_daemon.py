@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: test_daemon
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: 
+"""
+
+from dynamic_hosts import client
+from dynamic_hosts import configuration
+from dynamic_hosts.daemon import InventoryDaemon
+from dynamic_hosts.database import ServersDB
+from dynamic_hosts.dynamic_hosts import DynamicHosts
+
+import os
+import sys
+import json
+import time
+import shutil
+import unittest
+import threading
+import subprocess
+
+
+class TestInventoryDaemon(unittest.TestCase):
+    _config = None
+    _daemon = None
+    _thread = None
+    _servers = [
+        {'host': 'web.domain.net', 'environment': 'pro', 'role': 'web', 'location': 'MEX',
+         'variables': {'shell': 'bash'}},
+        {'host': 'db.domain.net', 'environment': 'pro', 'role': 'db', 'location': 'GDL'},
+    ]
+
+    def setUp(self):
+        self._config = configuration.TestConfig()
+        self._config.client = 'test_daemon'
+        self._config.environment = ''
+        self._config.role = ''
+        self._config.location = ''
+
+        self.write_db(self._servers)
+
+        self._daemon = InventoryDaemon(self._config)
+        self._thread = threading.Thread(target=self._daemon.serve_forever)
+        self._thread.start()
+
+    def tearDown(self):
+        self._daemon.shutdown()
+        self._thread.join()
+
+        ServersDB.clear_instances()
+        shutil.rmtree(os.path.dirname(self._config.get_db_file()), ignore_errors=True)
+
+    def write_db(self, servers):
+        os.makedirs(os.path.dirname(self._config.get_db_file()), exist_ok=True)
+
+        with open(self._config.get_db_file(), 'w') as f:
+            json.dump(servers, f)
+
+    def query(self, query, host=None, **filters):
+        config = configuration.TestConfig()
+        config.client = self._config.client
+        config.environment = filters.get('environment', '')
+        config.role = filters.get('role', '')
+        config.location = filters.get('location', '')
+        config.host_groups = filters.get('host_groups', False)
+
+        return client.query(self._config.get_socket_file(), client.build_request(config, query, host))
+
+    def test_list(self):
+        """Testing that the daemon returns the same inventory as DynamicHosts"""
+        header, body = self.query('list')
+
+        self.assertEqual([], header['collisions'])
+        self.assertEqual(json.dumps(DynamicHosts(self._config).get_list()).encode(), body)
+
+        _, body = self.query('list', role='db')
+
+        self.assertEqual(['db.domain.net'], json.loads(body)['all']['hosts'])
+        self.assertNotIn('env_pro', json.loads(body))
+
+        _, body = self.query('list', role='db', host_groups=True)
+
+        self.assertEqual(['env_pro_role_db'], json.loads(body)['env_pro']['children'])
+
+    def test_host(self):
+        """Testing the variables of a host"""
+        self.assertEqual({'shell': 'bash'}, json.loads(self.query('host', 'web.domain.net')[1]))
+        self.assertEqual({}, json.loads(self.query('host', 'unknown.domain.net')[1]))
+
+    def test_reload(self):
+        """Testing that the daemon reloads a DB changed by another process"""
+        self.query('list')
+
+        self.write_db(self._servers + [{'host': 'app.domain.net', 'environment': 'dev', 'role': 'app',
+                                        'location': 'MEX'}])
+
+        self.assertEqual(3, len(json.loads(self.query('list')[1])['all']['hosts']))
+
+    def test_watch(self):
+        """Testing that the daemon reloads a changed DB before it is queried"""
+        self.assertTrue(self._daemon.preload() >= 1)
+
+        db = ServersDB(self._config)
+
+        self.write_db(self._servers + [{'host': 'app.domain.net', 'environment': 'dev', 'role': 'app',
+                                        'location': 'MEX'}])
+
+        deadline = time.time() + 10
+
+        while len(db._servers) != 3 and time.time() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual('app.domain.net', db._servers[-1]['host'])
+        self.assertIs(db, ServersDB(self._config))
+
+    def test_unknown_client(self):
+        """Testing that a client without a DB is rejected without creating its folder"""
+        for name in ('test_daemon_missing', '../test_daemon_missing', 'test_daemon,test_daemon_missing'):
+            header, body = self._daemon.answer(json.dumps({'query': 'list', 'client': name}))
+
+            self.assertEqual('error', header['status'])
+            self.assertIn('Unknown client', header['message'])
+
+        self.assertFalse(os.path.exists(os.path.join(self._config.servers_folder, 'test_daemon_missing')))
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(self._config.servers_folder),
+                                                     'test_daemon_missing')))
+
+    def test_parallel(self):
+        """Testing that different queries read the DB at the same time"""
+        get_list = DynamicHosts.get_list
+        barrier = threading.Barrier(2, timeout=10)
+        results = []
+
+        def wait_list(dyn_hosts):
+            barrier.wait()
+            return get_list(dyn_hosts)
+
+        DynamicHosts.get_list = wait_list
+
+        try:
+            threads = [threading.Thread(target=lambda role=role: results.append(self.query('list', role=role)))
+                       for role in ('web', 'db')]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+        finally:
+            DynamicHosts.get_list = get_list
+
+        self.assertEqual(['ok', 'ok'], [header['status'] for header, _ in results])
+        self.assertFalse(barrier.broken)
+
+    def test_coalesce(self):
+        """Testing that identical requests that arrive together are computed once"""
+        answer = self._daemon.answer
+        results = []
+
+        def slow_answer(line):
+            time.sleep(0.5)
+            return answer(line)
+
+        self._daemon.answer = slow_answer
+
+        threads = [threading.Thread(target=lambda: results.append(self.query('list'))) for _ in range(50)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(50, len(results))
+        self.assertEqual(1, len(set(body for header, body in results)))
+        stats = json.loads(client.query(self._config.get_socket_file(), {'query': 'stats'})[1])
+
+        self.assertEqual({'requests': 51, 'computed': 1, 'coalesced': 49},
+                         {name: stats[name] for name in ('requests', 'computed', 'coalesced')})
+
+    def test_response_cache(self):
+        """Testing the cached responses and their ETags"""
+        header, body = self.query('list')
+        request = client.build_request(self._config, 'list')
+
+        self.assertEqual((header, body), self.query('list'))
+        self.assertNotEqual(header['etag'], self.query('list', role='db')[0]['etag'])
+        self.assertNotEqual(header['etag'], self.query('host', 'web.domain.net')[0]['etag'])
+
+        request['etag'] = header['etag']
+
+        self.assertEqual(({'status': 'not_modified', 'etag': header['etag'], 'length': 0}, b''),
+                         client.query(self._config.get_socket_file(), request))
+
+        self.write_db(self._servers[:1])
+
+        changed, body = client.query(self._config.get_socket_file(), request)
+
+        self.assertEqual('ok', changed['status'])
+        self.assertNotEqual(header['etag'], changed['etag'])
+        self.assertEqual(['web.domain.net'], json.loads(body)['all']['hosts'])
+
+        stats = self._daemon.get_stats()['cache']
+
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(4, stats['misses'])
+        self.assertEqual(1, stats['not_modified'])
+        self.assertEqual(3, stats['entries'])
+
+    def test_errors(self):
+        """Testing the queries that the daemon can not answer"""
+        self.assertIsNone(client.query(self._config.get_socket_file(), {'query': 'other'}))
+        self.assertIsNone(client.query(self._config.get_socket_file() + '.missing', {'query': 'list'}))
+
+        with self.assertRaises(Exception):
+            InventoryDaemon(self._config)
+
+    def test_cli(self):
+        """Testing that hosts.py sends the queries to the daemon and falls back to the DB"""
+        root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        env = dict(os.environ, THE_CLIENT=self._config.client, THE_ENVIRONMENT='', THE_ROLE='', THE_LOCATION='')
+        command = [sys.executable, os.path.join(root, 'hosts.py'), '--env', 'test', '--list', '--no-cache', '--profile']
+
+        daemon = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        local = subprocess.run(command + ['--no-daemon'], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               check=True)
+
+        self.assertEqual(local.stdout, daemon.stdout)
+        self.assertEqual(2, len(json.loads(daemon.stdout)['all']['hosts']))
+        self.assertNotIn('load_dynamic_hosts', json.loads(daemon.stderr)['phases'])
+        self.assertIn('load_dynamic_hosts', json.loads(local.stderr)['phases'])
+
+
+if __name__ == '__main__':
+    unittest.main()
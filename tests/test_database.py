@@ -10,13 +10,16 @@ Changes:
 """
 
 from dynamic_hosts import configuration
+from dynamic_hosts import database
 from dynamic_hosts.database import Server
 from dynamic_hosts.database import ServersDB
+from dynamic_hosts.filters import HostFilter
 from random import choice
 
 import os
 import time
 import json
+import tempfile
 import unittest
 
 
@@ -35,12 +38,15 @@ class TestDatabase(unittest.TestCase):
 
         """Let's create a test DB"""
         self._config = configuration.TestConfig()
-        self._db = ServersDB(self._config)
 
         if os.path.isfile(self._config.get_db_file()):
             os.remove(self._config.get_db_file())
             time.sleep(2.5)  # sleep time in seconds
 
+        self._db = ServersDB(self._config)
+
+        records = []
+
         for word in self._test_words:
             env = choice(['dev', 'itg', 'pro'])
             role = choice(['app', 'db', 'web', 'zoo'])
@@ -51,13 +57,13 @@ class TestDatabase(unittest.TestCase):
             server_data['role'] = role
             server_data['location'] = "{}.{}-{}.{}".format(word, word, word, word)
 
-            if len(self._db.get_servers('host', server_data['host'])) == 0:
-                new_server = Server(server_data)
-                self._db.add_new_server(new_server)
+            records.append((test_counter, server_data))
 
             if test_counter == self._max_tests:
                 break
 
+        self._db.import_servers(records)
+
     def tearDown(self):
         """Cleaning up DB Tests"""
         if self._config and os.path.isfile(self._config.get_db_file()):
@@ -110,6 +116,25 @@ class TestDatabase(unittest.TestCase):
             if test_counter == self._max_tests:
                 break
 
+    def test_schema_cache(self):
+        """Testing that schemas are compiled once and reloaded when the schema file changes"""
+        server_data = {'host': 'cache.domain.net', 'environment': 'dev', 'role': 'app', 'location': 'MEX'}
+        _, validator = database._get_schema("record.schema.json")
+
+        self.assertIs(validator, database._get_schema("record.schema.json")[1])
+        self.assertIs(validator, Server(server_data)._validator)
+        self.assertIs(database._get_schema("db.schema.json")[1], database._get_schema("db.schema.json")[1])
+
+        schema_file = os.path.join(database._schemas_folder, "record.schema.json")
+        stat = os.stat(schema_file)
+
+        try:
+            os.utime(schema_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+            self.assertIsNot(validator, Server(server_data)._validator)
+        finally:
+            os.utime(schema_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
     def test_server_exceptions(self):
         """Testing Server exceptions"""
         test_counter = 0
@@ -232,6 +257,277 @@ class TestDatabase(unittest.TestCase):
             if test_counter == 10:
                 break
 
+    def test_update_where(self):
+        """Testing the bulk update and deletion of the records that match a filter"""
+        self._config = configuration.TestConfig()
+        self._db = ServersDB(self._config)
+
+        total = len(self._db.get_all())
+        web = [entry['host'] for entry in self._db.get_all() if entry['role'] == 'web']
+        saves = []
+        save = self._db._storage.save
+        self._db._storage.save = lambda servers, operations: saves.append(len(operations)) or save(servers, operations)
+
+        self.assertEqual((len(web), len(web)), self._db.update_where(HostFilter(role='web'), {'location': 'GDL'}))
+        self.assertEqual((len(web), 0), self._db.update_where(HostFilter(role='web'), {'location': 'GDL'}))
+        self.assertEqual([len(web)], saves)
+        self.assertEqual(web, [entry['host'] for entry in self._db.get_all() if entry['location'] == 'GDL'])
+
+        with self.assertRaisesRegex(Exception, "'bogus' of the field role"):
+            self._db.update_where(HostFilter(role='web'), {'role': 'bogus'})
+
+        with self.assertRaisesRegex(Exception, "field variables can not be changed"):
+            self._db.update_where(HostFilter(role='web'), {'variables': 'x'})
+
+        with self.assertRaisesRegex(Exception, "field host can not be changed"):
+            self._db.update_where(HostFilter(role='web'), {'host': 'same.domain.net'})
+
+        with self.assertRaises(Exception):
+            self._db.update_where(HostFilter(), {'location': 'GDL'})
+
+        with self.assertRaises(Exception):
+            self._db.update_where(HostFilter(role='web'), {})
+
+        with self.assertRaises(Exception):
+            self._db.delete_where(HostFilter())
+
+        self.assertEqual([len(web)], saves)
+        self.assertEqual(len(web), len(self._db.get_servers('location', 'GDL', True)))
+
+        # The records are selected like in the inventory, with globs and regular expressions
+        self.assertEqual((len(web), len(web)), self._db.update_where(HostFilter(location='G*'), {'location': 'GDL2'}))
+        self.assertEqual(len(web), self._db.delete_where(HostFilter(role='web,db', location='re:^GDL\\d$')))
+        self.assertEqual(0, self._db.delete_where(HostFilter(location='GDL*')))
+        self.assertEqual([len(web), len(web), len(web)], saves)
+        self.assertEqual(total - len(web), len(self._db.get_all()))
+        self.assertIsNone(self._db.get_host(web[0]))
+        self.assertEqual([], self._db.fsck())
+
+        with open(self._config.get_db_file()) as f:
+            self.assertEqual(self._db.get_all(), json.load(f))
+
+    def test_import_servers(self):
+        """Testing bulk import of server records"""
+        self._config = configuration.TestConfig()
+        self._db = ServersDB(self._config)
+
+        existing = self._db.get_all()[0]
+        total = len(self._db.get_all())
+        lines = [
+            json.dumps({'host': 'import-a.domain.net', 'environment': 'dev', 'role': 'app', 'location': 'MEX',
+                        'variables': {'shell': 'bash'}}),
+            '',
+            json.dumps({'host': 'import-b.domain.net', 'environment': 'pro', 'role': 'db', 'location': 'GDL'}),
+            json.dumps({'host': 'import-a.domain.net', 'environment': 'dev', 'role': 'app', 'location': 'MEX'}),
+            json.dumps(dict(existing)),
+            json.dumps({'host': 'import-c.domain.net', 'environment': 'bad', 'role': 'db', 'location': 'GDL'}),
+            '{"host": "import-d.domain.net", ',
+            '{}',
+        ]
+
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('\n'.join(lines) + '\n')
+
+        try:
+            imported, errors = self._db.import_file(f.name)
+        finally:
+            os.remove(f.name)
+
+        self.assertEqual(2, imported)
+        self.assertEqual([4, 5, 6, 7, 8], [line for line, error in errors])
+        self.assertTrue('Duplicated data' in errors[0][1])
+        self.assertTrue('Duplicated data' in errors[1][1])
+        self.assertEqual('Invalid data', errors[2][1])
+        self.assertEqual('Malformed record', errors[3][1])
+        self.assertEqual('Malformed record', errors[4][1])
+        self.assertEqual(total + 2, len(self._db.get_all()))
+        self.assertEqual({'shell': 'bash'}, self._db.get_servers('host', 'import-a.domain.net')[0].get_data()['variables'])
+
+        with open(self._config.get_db_file()) as f:
+            self.assertEqual(self._db.get_all(), json.load(f))
+
+    def test_import_csv_servers(self):
+        """Testing bulk import of server records from a CSV file"""
+        self._config = configuration.TestConfig()
+        self._db = ServersDB(self._config)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('host,environment,role,location,shell\n')
+            f.write('csv-a.domain.net,itg,web,MEX,bash\n')
+            f.write('csv-b.domain.net,itg,zoo,MEX,\n')
+            f.write('csv-c.domain.net,itg,nope,MEX,\n')
+
+        try:
+            imported, errors = self._db.import_file(f.name)
+        finally:
+            os.remove(f.name)
+
+        self.assertEqual(2, imported)
+        self.assertEqual([(4, 'Invalid data')], errors)
+        self.assertEqual({'host': 'csv-a.domain.net', 'environment': 'itg', 'role': 'web', 'location': 'MEX',
+                          'variables': {'shell': 'bash'}},
+                         self._db.get_servers('host', 'csv-a.domain.net')[0].get_data())
+        self.assertFalse('variables' in self._db.get_servers('host', 'csv-b.domain.net')[0].get_data())
+
+    def test_fsck(self):
+        """Testing the validation of the whole DB"""
+        self._config = configuration.TestConfig()
+        self._db = ServersDB(self._config)
+
+        self.assertEqual([], self._db.fsck())
+
+        records = [dict(entry) for entry in self._db.get_all()]
+        records.append(dict(records[0]))
+        records.append({'host': 'bad-role.domain.net', 'environment': 'dev', 'role': 'nope', 'location': 'MEX'})
+
+        with open(self._config.get_db_file(), 'w') as f:
+            json.dump(records, f)
+
+        with self.assertRaises(Exception) as context:
+            ServersDB(self._config)
+
+        self.assertTrue('There is a corruption in the database' in str(context.exception))
+
+        self._config.validate_on_load = False
+        self._db = ServersDB(self._config)
+        errors = self._db.fsck()
+
+        self.assertEqual(3, len(errors))
+        self.assertTrue(any("Duplicated host {}".format(records[0]['host']) in error for error in errors))
+        self.assertTrue(any(error.startswith("/{}/role".format(len(records) - 1)) for error in errors))
+
+        """Only the new record is validated when it is saved"""
+        self._db.add_new_server(Server({'host': 'new-host.domain.net', 'environment': 'dev', 'role': 'app',
+                                        'location': 'MEX'}))
+
+        with self.assertRaises(Exception) as context:
+            self._db.add_new_server(Server({'host': 'new-host.domain.net', 'environment': 'dev', 'role': 'app',
+                                            'location': 'MEX'}))
+
+        self.assertTrue('Duplicated data' in str(context.exception))
+
+    def test_host_index(self):
+        """Testing that the host index returns the same records as a linear scan"""
+        self._config = configuration.TestConfig()
+        self._db = ServersDB(self._config)
+
+        def scan(host):
+            return [entry for entry in self._db.get_all() if entry['host'] == host][:1]
+
+        deleted = 0
+
+        for word in self._test_words[:self._max_tests]:
+            host = "{}{}.{}{}".format(word, word, word, word)
+            expected = scan(host)
+            record = self._db.get_servers('host', host)
+
+            self.assertEqual(expected, [entry.get_data() for entry in record])
+
+            if record and deleted < 10:
+                self._db.delete_server(record[0])
+                deleted += 1
+
+                self.assertEqual([], scan(host))
+                self.assertEqual(0, len(self._db.get_servers('host', host)))
+
+        for entry in self._db.get_all():
+            self.assertEqual(scan(entry['host']), [s.get_data() for s in self._db.get_servers('host', entry['host'])])
+
+    def test_db_validation(self):
+        """Testing that the whole DB is validated like jsonschema validates the DB schema"""
+        _, validator = database._get_schema("db.schema.json")
+        records = [dict(entry) for entry in ServersDB(configuration.TestConfig()).get_all()[:50]]
+        records.append(dict(records[3]))
+        records.append(dict(records[4], role='nope'))
+        records.append('broken')
+
+        expected = sorted(list(error.path) for error in validator.iter_errors(records))
+        errors = database._db_validation_errors(records)
+
+        self.assertEqual(expected, sorted(list(error.path) for error in errors))
+        self.assertEqual([], database._db_validation_errors(records[:50]))
+
+    def test_registry(self):
+        """Testing that there is a single instance per DB, reloaded only if the DB file changed"""
+        self._config = configuration.TestConfig()
+        self._db = ServersDB(self._config)
+        servers = self._db.get_all()
+
+        self.assertIs(self._db, ServersDB(configuration.TestConfig()))
+        self.assertIs(servers, ServersDB(configuration.TestConfig()).get_all())
+        self.assertIsNot(self._db, ServersDB(configuration.DevConfig()))
+
+        journal = configuration.TestConfig()
+        journal.storage = 'journal'
+
+        self.assertIsNot(self._db, ServersDB(journal))
+
+        records = [dict(entry) for entry in servers[:3]]
+
+        with open(self._config.get_db_file(), 'w') as f:
+            json.dump(records, f)
+
+        self.assertIs(self._db, ServersDB(configuration.TestConfig()))
+        self.assertEqual(records, self._db.get_all())
+
+        ServersDB.clear_instances()
+
+        self.assertIsNot(self._db, ServersDB(configuration.TestConfig()))
+
+    def test_reload(self):
+        """Testing that a changed DB is reloaded applying only its differences"""
+        self._config = configuration.TestConfig()
+        self._db = ServersDB(self._config)
+        servers = list(self._db.get_all())
+        records = [dict(entry) for entry in servers]
+        revision = self._db.get_revision()
+
+        records[1]['role'] = 'db' if records[1]['role'] != 'db' else 'web'
+        del records[2]
+        records.append({'host': 'reload.domain.net', 'environment': 'dev', 'role': 'app', 'location': 'MEX'})
+
+        with open(self._config.get_db_file(), 'w') as f:
+            json.dump(records, f)
+
+        self.assertEqual((1, 1, 1), self._db.reload())
+        self.assertEqual(records, self._db.get_all())
+        self.assertNotEqual(revision, self._db.get_revision())
+
+        revision = self._db.get_revision()
+
+        self.assertEqual((0, 0, 0), self._db.reload())
+        self.assertEqual(revision, self._db.get_revision())
+        self.assertIs(servers[0], self._db.get_all()[0])
+        self.assertIs(servers[3], self._db.get_all()[2])
+        self.assertEqual(records[1], self._db.get_host(records[1]['host']))
+        self.assertEqual(records[-1], self._db.get_host('reload.domain.net'))
+        self.assertIsNone(self._db.get_host(servers[2]['host']))
+        self.assertEqual([], self._db.fsck())
+
+        for broken in ([dict(records[0], environment='other')] + records[1:], [records[1]] + records[1:]):
+            with open(self._config.get_db_file(), 'w') as f:
+                json.dump(broken, f)
+
+            with self.assertRaises(Exception):
+                self._db.reload()
+
+            self.assertIsNone(self._db._servers)
+
+    def test_instance_state(self):
+        """Testing that the data of the servers and of the DBs is not shared between instances"""
+        first = Server({'host': 'first.domain.net', 'environment': 'dev', 'role': 'app', 'location': 'MEX'})
+        second = Server({'host': 'second.domain.net', 'environment': 'dev', 'role': 'app', 'location': 'MEX'})
+
+        first.add_field('variables', {'shell': 'bash'})
+
+        self.assertFalse('variables' in second.get_data())
+
+        dev = ServersDB(configuration.DevConfig())
+
+        self.assertIsNot(dev.get_all(), ServersDB(configuration.TestConfig()).get_all())
+        self.assertIsNone(ServersDB._servers)
+        self.assertIsNone(Server._server)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -10,14 +10,16 @@ Changes:
 """
 
 from dynamic_hosts import configuration
-from dynamic_hosts.database import Server
 from dynamic_hosts.database import ServersDB
 from dynamic_hosts.dynamic_hosts import DynamicHosts
+from dynamic_hosts.logger import logger
 from random import choice
 
+import io
 import os
 import json
 import time
+import shutil
 import unittest
 
 
@@ -33,7 +35,6 @@ class TestDynamicHosts(unittest.TestCase):
             self._test_words = json.load(f)
 
         self._config = configuration.DevConfig()
-        self._db = ServersDB(self._config)
 
         test_counter = 0
 
@@ -42,6 +43,10 @@ class TestDynamicHosts(unittest.TestCase):
             os.remove(self._config.get_db_file())
             time.sleep(2.5)  # sleep time in seconds
 
+        self._db = ServersDB(self._config)
+
+        records = []
+
         for word in self._test_words:
             env = choice(['dev', 'itg', 'pro'])
             role = choice(['app', 'db', 'web', 'zoo'])
@@ -52,13 +57,13 @@ class TestDynamicHosts(unittest.TestCase):
             server_data['role'] = role
             server_data['location'] = "{}.{}-{}.{}".format(word, word, word, word)
 
-            if len(self._db.get_servers('host', server_data['host'])) == 0:
-                new_server = Server(server_data)
-                self._db.add_new_server(new_server)
+            records.append((test_counter, server_data))
 
             if test_counter == self._max_tests:
                 break
 
+        self._db.import_servers(records)
+
     def tearDown(self):
         """Tear down Dynamic Host Test"""
         if os.path.isfile(self._config.get_db_file()):
@@ -216,6 +221,161 @@ class TestDynamicHosts(unittest.TestCase):
             self.assertEqual("pro", find_host[0].get_data()["environment"])
             self.assertEqual("web", find_host[0].get_data()["role"])
 
+    def test_dynamic_hosts_host(self):
+        """Testing the variables returned for a single host"""
+        self._db.import_servers([(1, {'host': 'vars.domain.net', 'environment': 'dev', 'role': 'app',
+                                      'location': 'MEX', 'variables': {'shell': 'bash'}})])
+        self._config = configuration.DevConfig()
+        dh = DynamicHosts(self._config)
+
+        self.assertEqual({'shell': 'bash'}, dh.get_host('vars.domain.net'))
+        self.assertEqual({}, dh.get_host('unknown.domain.net'))
+
+        for host in dh.get_list()['all']['hosts'][:10]:
+            if host != 'vars.domain.net':
+                self.assertEqual({}, dh.get_host(host))
+
+        self.assertTrue(('vars.domain.net', {'shell': 'bash'}) in list(dh.get_all_host_vars()))
+
+    def test_dynamic_hosts_update_where(self):
+        """Testing the bulk update and deletion of the records selected by filters"""
+        self._db.import_servers([(1, {'host': 'bulk1.domain.net', 'environment': 'pro', 'role': 'web',
+                                      'location': 'MEX'}),
+                                 (2, {'host': 'bulk2.domain.net', 'environment': 'pro', 'role': 'db',
+                                      'location': 'MEX'})])
+        self._config = configuration.DevConfig()
+        dh = DynamicHosts(self._config)
+
+        self.assertEqual(1, dh.update_where('location=MEX', None))
+        self.assertEqual(1, dh.update_where('location', 'location=GDL'))
+        self.assertEqual(1, dh.update_where('host=bulk1.domain.net', 'location=GDL'))
+        self.assertEqual(1, dh.update_where('location=MEX', 'variables=x'))
+        self.assertEqual(1, dh.update_where('location=MEX', 'role=bogus'))
+        self.assertEqual(1, dh.delete_where(''))
+        self.assertEqual('MEX', self._db.get_host('bulk1.domain.net')['location'])
+        self.assertEqual(0, dh.update_where('role=web,app, location=M*', 'location=GDL'))
+        self.assertEqual('GDL', self._db.get_host('bulk1.domain.net')['location'])
+        self.assertEqual('MEX', self._db.get_host('bulk2.domain.net')['location'])
+        self.assertEqual(0, dh.delete_where('location=MEX'))
+        self.assertIsNone(self._db.get_host('bulk2.domain.net'))
+        self.assertIsNotNone(self._db.get_host('bulk1.domain.net'))
+
+    def test_dynamic_hosts_groups(self):
+        """Testing the inventory grouped by environment, role and location"""
+        self._db.import_servers([(1, {'host': 'grp1.domain.net', 'environment': 'pro', 'role': 'web',
+                                      'location': 'MEX-1.a'})])
+        self._config = configuration.DevConfig()
+        self._config.environment = ''
+        self._config.role = ''
+        self._config.location = ''
+        self._config.host_groups = True
+        hosts_list = DynamicHosts(self._config).get_list()
+
+        self.assertEqual(['grp1.domain.net'], hosts_list['env_pro_role_web_loc_MEX_1_a']['hosts'])
+        self.assertIn('env_pro_role_web_loc_MEX_1_a', hosts_list['loc_MEX_1_a']['children'])
+        self.assertIn('env_pro_role_web_loc_MEX_1_a', hosts_list['env_pro_role_web']['children'])
+        self.assertIn('env_pro_role_web', hosts_list['env_pro']['children'])
+        self.assertIn('env_pro_role_web', hosts_list['role_web']['children'])
+
+        grouped = []
+
+        for record in self._db.get_all():
+            leaf = 'env_{}_role_{}_loc_{}'.format(record['environment'], record['role'],
+                                                  record['location'].replace('.', '_').replace('-', '_'))
+
+            self.assertIn(record['host'], hosts_list[leaf]['hosts'])
+            self.assertIn(leaf, hosts_list['env_{}_role_{}'.format(record['environment'], record['role'])]['children'])
+
+        for name, group in hosts_list.items():
+            grouped.extend(group.get('hosts', []) if name not in ('all', '_meta') else [])
+
+        self.assertEqual(sorted(hosts_list['all']['hosts']), sorted(grouped))
+
+    def test_dynamic_hosts_group_collision(self):
+        """Testing that the locations with the same group name are reported"""
+        self._db.import_servers([(1, {'host': 'dash.domain.net', 'environment': 'pro', 'role': 'web',
+                                      'location': 'MEX-1'}),
+                                 (2, {'host': 'underscore.domain.net', 'environment': 'pro', 'role': 'db',
+                                      'location': 'MEX_1'})])
+        self._config = configuration.DevConfig()
+        self._config.environment = 'pro'
+        self._config.role = ''
+        self._config.location = 'MEX-1,MEX_1'
+        self._config.host_groups = True
+        stream = io.StringIO()
+
+        logger.Logger.configure(stream=stream)
+
+        try:
+            hosts_list = DynamicHosts(self._config).get_list()
+            logger.Logger.flush()
+        finally:
+            logger.Logger.reset()
+
+        self.assertEqual(['env_pro_role_web_loc_MEX_1', 'env_pro_role_db_loc_MEX_1'],
+                         hosts_list['loc_MEX_1']['children'])
+        self.assertIn('The locations MEX-1 and MEX_1 have the same group loc_MEX_1', stream.getvalue())
+
+    def test_dynamic_hosts_iter_list(self):
+        """Testing that the streamed inventory is identical to the JSON document of the inventory"""
+        self._db.import_servers([(1, {'host': 'vars.domain.net', 'environment': 'dev', 'role': 'app',
+                                      'location': 'MEX', 'variables': {'shell': 'bash', 'name': 'Colón'}})])
+
+        for environment, host_groups in (('dev', False), ('', True), ('none', True)):
+            self._config = configuration.DevConfig()
+            self._config.environment = environment
+            self._config.role = ''
+            self._config.location = ''
+            self._config.host_groups = host_groups
+            dh = DynamicHosts(self._config)
+            expected = json.dumps(dh.get_list())
+
+            self.assertEqual(expected, ''.join(dh.iter_list()))
+            self.assertEqual(expected, ''.join(dh.iter_list(chunk_size=1)))
+            self.assertTrue(all(len(chunk) >= 100 for chunk in list(dh.iter_list(chunk_size=100))[:-1]))
+
+    def test_dynamic_hosts_clients(self):
+        """Testing the inventory merged from several clients"""
+        clients = {
+            'test_multi_a': [('a1.domain.net', 'pro', 'MEX'), ('shared.domain.net', 'pro', 'MEX')],
+            'test_multi_b': [('b1.domain.net', 'pro', 'GDL'), ('shared.domain.net', 'pro', 'GDL'),
+                             ('b2.domain.net', 'dev', 'GDL')],
+        }
+
+        try:
+            for client, hosts in clients.items():
+                config = configuration.DevConfig()
+                config.client = client
+                ServersDB(config).import_servers([(i, {'host': host, 'environment': env, 'role': 'web',
+                                                       'location': location, 'variables': {'client': client}})
+                                                  for i, (host, env, location) in enumerate(hosts)])
+
+            self._config = configuration.DevConfig()
+            self._config.client = 'test_multi_a,test_multi_b'
+            self._config.environment = 'pro'
+            self._config.role = ''
+            self._config.location = ''
+            dh = DynamicHosts(self._config)
+            hosts_list = dh.get_list()
+
+            self.assertEqual(['a1.domain.net', 'shared.domain.net', 'b1.domain.net'], hosts_list['all']['hosts'])
+            self.assertEqual(['a1.domain.net', 'shared.domain.net'], hosts_list['client_test_multi_a']['hosts'])
+            self.assertEqual(['b1.domain.net', 'shared.domain.net'], hosts_list['client_test_multi_b']['hosts'])
+            self.assertEqual({'client': 'test_multi_a'}, hosts_list['_meta']['hostvars']['shared.domain.net'])
+            self.assertEqual([('shared.domain.net', 'test_multi_a', 'test_multi_b')], dh.get_collisions())
+            self.assertEqual({'client': 'test_multi_b'}, dh.get_host('b2.domain.net'))
+            self.assertEqual(4, len(list(dh.get_all_host_vars())))
+            self.assertEqual(1, dh.check_db())
+            self.assertEqual(json.dumps(dh.get_list()), ''.join(dh.iter_list()))
+
+            self._config.client = '*'
+            self.assertTrue({'test_multi_a', 'test_multi_b'} <= set(self._config.get_clients()))
+        finally:
+            for client in clients:
+                config = configuration.DevConfig()
+                config.client = client
+                shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+
 
 if __name__ == '__main__':
     unittest.main()
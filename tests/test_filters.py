@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: test_filters
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: 
+"""
+
+from dynamic_hosts.filters import HostFilter
+from dynamic_hosts.filters import parse_fields
+
+import unittest
+
+
+def _record(environment, role, location):
+    return {'host': 'host.domain.net', 'environment': environment, 'role': role, 'location': location}
+
+
+class TestFilters(unittest.TestCase):
+    _records = [
+        _record('dev', 'app', 'MEX'),
+        _record('dev', 'web', 'GDL'),
+        _record('itg', 'db', 'MTY'),
+        _record('pro', 'web', 'MEX2'),
+        _record('pro', 'app', 'QRO'),
+    ]
+
+    def __matching(self, host_filter):
+        return [idx for idx, record in enumerate(self._records) if host_filter.matches(record)]
+
+    def test_empty(self):
+        """Testing that an empty filter matches every record"""
+        host_filter = HostFilter('', None, ' , ')
+
+        self.assertTrue(host_filter.empty)
+        self.assertEqual([0, 1, 2, 3, 4], self.__matching(host_filter))
+        self.assertEqual(self._records, host_filter.filter(self._records))
+
+    def test_single_values(self):
+        """Testing filters with a single value"""
+        self.assertEqual([3, 4], self.__matching(HostFilter('pro')))
+        self.assertEqual([1, 3], self.__matching(HostFilter(role='web')))
+        self.assertEqual([0], self.__matching(HostFilter(location='MEX')))
+        self.assertEqual([4], self.__matching(HostFilter('pro', 'app', 'QRO')))
+        self.assertEqual([], self.__matching(HostFilter('itg', 'app')))
+
+    def test_multiple_values(self):
+        """Testing filters with comma separated values"""
+        self.assertEqual([0, 1, 3, 4], self.__matching(HostFilter(role='web, app')))
+        self.assertEqual([0, 1], self.__matching(HostFilter('dev,itg', 'web,app')))
+        self.assertEqual([0, 2], self.__matching(HostFilter(location='MEX,MTY')))
+        self.assertEqual(frozenset(['web', 'app']), HostFilter(role='web,app,').roles)
+
+    def test_location_patterns(self):
+        """Testing glob and regular expression location filters"""
+        self.assertEqual([0, 2, 3], self.__matching(HostFilter(location='M*')))
+        self.assertEqual([0, 4], self.__matching(HostFilter(location='MEX,Q??')))
+        self.assertEqual([3], self.__matching(HostFilter('pro', location='MEX[0-9]')))
+        self.assertEqual([0, 3], self.__matching(HostFilter(location='re:EX')))
+        self.assertEqual([0, 1], self.__matching(HostFilter(location='re:^(MEX|GDL)$')))
+        self.assertEqual([1], self.__matching(HostFilter(role='web', location='re:^[A-L]')))
+        self.assertIsNone(HostFilter(location='M*').locations)
+
+        with self.assertRaisesRegex(Exception, 'Invalid location pattern'):
+            HostFilter(location='re:(')
+
+    def test_fields(self):
+        """Testing the filters given as a list of field=value pairs"""
+        self.assertEqual({}, parse_fields(''))
+        self.assertEqual({'role': 'web,app', 'location': 're:^(MEX|GDL)$'},
+                         parse_fields('role=web, app,location=re:^(MEX|GDL)$'))
+        self.assertEqual([1, 3], self.__matching(HostFilter.from_fields('role=web,location=M*,GDL')))
+
+        with self.assertRaises(Exception):
+            parse_fields('web,role=app')
+
+        with self.assertRaisesRegex(Exception, 'by host'):
+            HostFilter.from_fields('host=host.domain.net')
+
+
+if __name__ == '__main__':
+    unittest.main()
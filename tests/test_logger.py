@@ -12,6 +12,7 @@ Changes:
 from dynamic_hosts.logger import logger
 from tests.console import read_console
 
+import io
 import os
 import json
 import unittest
@@ -43,10 +44,26 @@ class TestLogger(unittest.TestCase):
 
     def setUp(self):
         self._logger = logger.Logger()
+        self._stream = io.StringIO()
+
+        logger.Logger.configure(colors=True, stream=self._stream)
 
         with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), "words.json")) as f:
             self._test_words = json.load(f)
 
+    def tearDown(self):
+        logger.Logger.reset()
+
+    def read_log(self, command, *args):
+        """Calls a log function and returns what it wrote"""
+        self._stream.seek(0)
+        self._stream.truncate()
+
+        command(*args)
+        logger.Logger.flush()
+
+        return self._stream.getvalue()
+
     def test_colors(self):
         self.assertEqual(self._colors['Reset'], self._logger.get_colors.Reset, "Wrong color")
         self.assertEqual(self._colors['Bold'], self._logger.get_colors.Bold, "Wrong color")
@@ -70,29 +87,112 @@ class TestLogger(unittest.TestCase):
         for word in self._test_words:
             expected_output = '\x1b[0m[\x1b[31m ERROR \x1b[0m]\x1b[91m %s\n' % word
 
-            with read_console(self._logger.log_error, word) as output:
-                self.assertEqual(expected_output, output)
+            self.assertEqual(expected_output, self.read_log(self._logger.log_error, word))
 
     def test_info_messages(self):
         for word in self._test_words:
             expected_output = '\x1b[0m[\x1b[34m INFO  \x1b[0m]\x1b[0m %s\n' % word
 
-            with read_console(self._logger.log_info, word) as output:
-                self.assertEqual(expected_output, output)
+            self.assertEqual(expected_output, self.read_log(self._logger.log_info, word))
 
     def test_warn_messages(self):
         for word in self._test_words:
             expected_output = '\x1b[0m[\x1b[93mWARNING\x1b[0m]\x1b[93m %s\n' % word
 
-            with read_console(self._logger.log_warning, word) as output:
-                self.assertEqual(expected_output, output)
+            self.assertEqual(expected_output, self.read_log(self._logger.log_warning, word))
 
     def test_verbose_messages(self):
         for word in self._test_words:
             expected_output = '\x1b[0m[\x1b[32mVERBOSE\x1b[0m]\x1b[92m %s\n' % word
 
-            with read_console(self._logger.log_verbose, word) as output:
-                self.assertEqual(expected_output, output)
+            self.assertEqual(expected_output, self.read_log(self._logger.log_verbose, word))
+
+    def test_stdout(self):
+        """Testing that nothing is written to the standard output"""
+        logger.Logger.reset()
+
+        with read_console(self._logger.log_error, 'error') as output:
+            self.assertEqual('', output)
+
+        logger.Logger.configure(stream=self._stream)
+
+        self.assertEqual('[VERBOSE] plain 1\n', self.read_log(self._logger.log_verbose, 'plain {}', 1))
+
+    def test_level(self):
+        """Testing that the events below the level are not formatted"""
+        class Argument:
+            formatted = False
+
+            def __format__(self, spec):
+                Argument.formatted = True
+                return 'argument'
+
+        logger.Logger.configure(level='warning', colors=False, stream=self._stream)
+
+        self.assertEqual('', self.read_log(self._logger.log_verbose, 'skipped {}', Argument()))
+        self.assertEqual('', self.read_log(self._logger.log_info, 'skipped {}', Argument()))
+        self.assertFalse(Argument.formatted)
+        self.assertFalse(self._logger.is_enabled_for(logger.INFO))
+        self.assertTrue(self._logger.is_enabled_for(logger.ERROR))
+        self.assertEqual('[WARNING] written argument\n',
+                         self.read_log(self._logger.log_warning, 'written {}', Argument()))
+
+        with self.assertRaises(Exception):
+            logger.Logger.configure(level='debug')
+
+    def test_buffer(self):
+        """Testing that the events are buffered until they are flushed"""
+        logger.Logger.configure(colors=False, stream=self._stream)
+
+        for number in range(100):
+            self._logger.log_verbose('line {}', number)
+
+        self.assertEqual('', self._stream.getvalue())
+
+        logger.Logger.flush()
+
+        self.assertEqual(100, len(self._stream.getvalue().splitlines()))
+
+        self._stream.seek(0)
+        self._stream.truncate()
+
+        for number in range(10000):
+            self._logger.log_verbose('line {}', number)
+
+        self.assertTrue(self._stream.getvalue())
+
+    def test_flush(self):
+        """Testing that the errors and warnings, and every line of a line buffered logger, are written at once"""
+        logger.Logger.configure(colors=False, stream=self._stream)
+
+        self._logger.log_info('info')
+        self._logger.log_warning('warning')
+
+        self.assertEqual('[ INFO  ] info\n[WARNING] warning\n', self._stream.getvalue())
+
+        logger.Logger.configure(line_buffered=True)
+        self._logger.log_verbose('verbose')
+
+        self.assertTrue(self._stream.getvalue().endswith('[VERBOSE] verbose\n'))
+
+    def test_configure(self):
+        """Testing that the omitted options keep their value"""
+        logger.Logger.configure(colors=False, stream=self._stream)
+        logger.Logger.configure(level='info')
+
+        self.assertEqual('[ INFO  ] kept\n', self.read_log(self._logger.log_info, 'kept'))
+
+    def test_json_lines(self):
+        """Testing the JSON lines format"""
+        logger.Logger.configure(json_lines=True, stream=self._stream)
+
+        event = json.loads(self.read_log(self._logger.log_error, 'Line {}: {}', 3, ValueError('broken')))
+
+        self.assertEqual('error', event['level'])
+        self.assertEqual('Line 3: broken', event['message'])
+        self.assertIsInstance(event['time'], float)
+
+        self.assertEqual('warning', json.loads(self.read_log(self._logger.log_warning, 'a {literal}'))['level'])
 
 
 if __name__ == '__main__':
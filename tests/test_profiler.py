@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: test_profiler
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: 
+"""
+
+from dynamic_hosts import profiler
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+import threading
+
+
+@profiler.timed
+def _inner(value):
+    return value * 2
+
+
+@profiler.timed
+def _outer(value):
+    with profiler.span('outer.block'):
+        return _inner(value) + 1
+
+
+class TestProfiler(unittest.TestCase):
+    _folder = None
+
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        profiler.disable()
+        shutil.rmtree(self._folder, ignore_errors=True)
+
+    def test_disabled(self):
+        """Testing that nothing is recorded while the profiler is disabled"""
+        self.assertFalse(profiler.enabled())
+        self.assertEqual(5, _outer(2))
+        self.assertIs(profiler.span('a'), profiler.span('b'))
+        self.assertEqual({}, profiler.report()['phases'])
+        self.assertEqual('_outer', _outer.__name__)
+
+    def test_spans(self):
+        """Testing the phases, depths and threads of the report"""
+        profiler.enable()
+
+        self.assertEqual(5, _outer(2))
+        self.assertEqual(5, _outer(2))
+
+        thread = threading.Thread(target=_inner, args=(1,), name='worker')
+        thread.start()
+        thread.join()
+
+        with self.assertRaises(ZeroDivisionError):
+            with profiler.span('failed'):
+                1 / 0
+
+        report = json.loads(json.dumps(profiler.report()))
+
+        self.assertEqual({'_outer', 'outer.block', '_inner', 'failed'}, set(report['phases']))
+        self.assertEqual(2, report['phases']['_outer']['count'])
+        self.assertEqual(3, report['phases']['_inner']['count'])
+        self.assertGreaterEqual(report['total_ms'], report['phases']['_outer']['ms'])
+
+        self.assertEqual([('_outer', 0), ('outer.block', 1), ('_inner', 2)],
+                         [(entry['name'], entry['depth']) for entry in report['spans'][:3]])
+        self.assertEqual(('_inner', 0, 'worker'),
+                         tuple(report['spans'][6][field] for field in ('name', 'depth', 'thread')))
+        self.assertEqual(('failed', 0), (report['spans'][7]['name'], report['spans'][7]['depth']))
+
+        start = [entry['start_ms'] for entry in report['spans']]
+        self.assertEqual(sorted(start), start)
+
+        profiler.disable()
+
+        self.assertEqual({}, profiler.report()['phases'])
+
+    def test_write_report(self):
+        """Testing that the report is written to a file"""
+        file_name = os.path.join(self._folder, 'report.json')
+
+        profiler.enable()
+        _outer(1)
+        profiler.write_report(file_name)
+
+        with open(file_name) as f:
+            self.assertEqual(1, json.load(f)['phases']['_inner']['count'])
+
+    def test_cli(self):
+        """Testing the report and the cProfile statistics of an invocation of hosts.py"""
+        root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        report = os.path.join(self._folder, 'report.json')
+        stats = os.path.join(self._folder, 'list.prof')
+        env = dict(os.environ, THE_CLIENT='test_profiler', THE_ENVIRONMENT='', THE_ROLE='', THE_LOCATION='')
+
+        try:
+            output = subprocess.run([sys.executable, os.path.join(root, 'hosts.py'), '--env', 'test', '--list',
+                                     '--no-cache', '--profile'], env=env, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, check=True)
+
+            self.assertEqual({'_meta': {'hostvars': {}}, 'all': {'hosts': [], 'vars': {}}}, json.loads(output.stdout))
+            self.assertIn('ServersDB.__init__', json.loads(output.stderr)['phases'])
+
+            env['THE_PROFILE'] = report
+
+            subprocess.run([sys.executable, os.path.join(root, 'hosts.py'), '--env', 'test', '--list',
+                            '--no-cache', '--cprofile', stats], env=env, stdout=subprocess.DEVNULL, check=True)
+
+            with open(report) as f:
+                phases = json.load(f)['phases']
+
+            self.assertIn('print_inventory', phases)
+            self.assertIn('DynamicHosts.iter_list', phases)
+            self.assertTrue(os.path.getsize(stats) > 0)
+        finally:
+            from dynamic_hosts import configuration
+
+            config = configuration.TestConfig()
+            config.client = 'test_profiler'
+
+            shutil.rmtree(os.path.dirname(config.get_db_file()), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: test_record
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: 
+"""
+
+from dynamic_hosts.record import Record
+from dynamic_hosts.record import json_default
+
+import json
+import pickle
+import unittest
+
+
+class TestRecord(unittest.TestCase):
+    _data = {'host': 'rec.domain.net', 'environment': 'pro', 'role': 'web', 'location': 'MEX',
+             'variables': {'shell': 'bash'}, 'comment': 'new'}
+
+    def test_mapping(self):
+        """Testing that a record reads like its data dictionary"""
+        record = Record.from_dict(dict(self._data))
+
+        self.assertEqual(self._data, record)
+        self.assertEqual(record, self._data)
+        self.assertEqual(self._data, dict(record))
+        self.assertEqual(len(self._data), len(record))
+        self.assertEqual('web', record['role'])
+        self.assertEqual({'shell': 'bash'}, record.get('variables'))
+        self.assertTrue('comment' in record)
+        self.assertFalse('other' in record)
+        self.assertIsNone(record.get('other'))
+
+        with self.assertRaises(KeyError):
+            record['other']
+
+        plain = Record.from_dict({'host': 'plain.domain.net', 'environment': 'dev', 'role': 'db', 'location': 'GDL'})
+
+        self.assertFalse('variables' in plain)
+        self.assertEqual(['host', 'environment', 'role', 'location'], list(plain))
+        self.assertFalse(hasattr(plain, '__dict__'))
+
+    def test_empty_variables(self):
+        """Testing that a variables key without value is kept"""
+        data = {'host': 'none.domain.net', 'environment': 'dev', 'role': 'db', 'location': 'GDL',
+                'variables': None, 'comment': 'new'}
+        record = Record.from_dict(dict(data))
+
+        self.assertTrue('variables' in record)
+        self.assertIsNone(record['variables'])
+        self.assertEqual(list(data), list(record))
+        self.assertEqual(data, json.loads(json.dumps(record, default=json_default)))
+
+    def test_interned(self):
+        """Testing that the environment, role and location strings are shared"""
+        first = Record.from_dict(json.loads(json.dumps(self._data)))
+        second = Record.from_dict(json.loads(json.dumps(self._data)))
+
+        self.assertIs(first['environment'], second['environment'])
+        self.assertIs(first['location'], second['location'])
+
+    def test_invalid(self):
+        """Testing that data without the required fields is not converted"""
+        data = {'host': 'broken.domain.net'}
+
+        self.assertIs(data, Record.from_dict(data))
+        self.assertEqual('x', Record.from_dict('x'))
+
+    def test_serialization(self):
+        """Testing that a record is encoded as its data dictionary"""
+        record = Record.from_dict(dict(self._data))
+
+        self.assertEqual(self._data, json.loads(json.dumps([record], default=json_default))[0])
+        self.assertEqual(record, pickle.loads(pickle.dumps(record)))
+
+        with self.assertRaises(TypeError):
+            json.dumps(object(), default=json_default)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: test_storage
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: 
+"""
+
+from dynamic_hosts import configuration
+from dynamic_hosts.database import Server
+from dynamic_hosts.database import ServersDB
+from dynamic_hosts.filters import HostFilter
+from dynamic_hosts.storage import JsonStorage
+from dynamic_hosts.storage import JournalStorage
+from dynamic_hosts.storage import SqliteStorage
+from dynamic_hosts.storage import _iter_array
+
+import io
+import os
+import json
+import shutil
+import unittest
+import multiprocessing
+
+
+def _record(i, location='MEX'):
+    return {'host': 'host{}.domain.net'.format(i), 'environment': 'dev', 'role': 'app', 'location': location}
+
+
+def _config(storage):
+    config = configuration.TestConfig()
+    config.client = 'test_storage'
+    config.storage = storage
+
+    return config
+
+
+def _writer(storage, first, count):
+    """Adds count hosts to the DB, one save per host"""
+    db = ServersDB(_config(storage))
+
+    for i in range(first, first + count):
+        db.add_new_server(Server(_record(i)))
+
+    db._storage.wait()
+
+
+def _reader(storage, done):
+    """Loads and validates the DB until the writers are done, exits with an error if a load fails"""
+    config = _config(storage)
+    previous = 0
+
+    while not done.is_set():
+        servers = ServersDB(config).get_all()
+        hosts = set(entry['host'] for entry in servers)
+
+        if len(hosts) != len(servers) or len(servers) < previous:
+            raise Exception("Inconsistent read: {} records, {} before".format(len(servers), previous))
+
+        previous = len(servers)
+
+
+class TestStorage(unittest.TestCase):
+    _config = None
+    _db_file = ''
+
+    def setUp(self):
+        self._config = configuration.TestConfig()
+        self._config.client = 'test_storage'
+        self._db_file = self._config.get_db_file()
+
+        os.makedirs(os.path.dirname(self._db_file), exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self._db_file), ignore_errors=True)
+
+    def test_sqlite(self):
+        """Testing that the SQLite backend stores records and answers queries"""
+        storage = SqliteStorage(self._db_file, self._config.get_sqlite_file())
+        storage.save([_record(0), _record(1), _record(2)], None)
+
+        extra = dict(_record(3, 'GDL'), role='db', variables={'port': 22}, comment='new')
+        storage.save([], [('add', extra), ('update', _record(1, 'GDL')), ('delete', _record(2)['host'])])
+
+        other = SqliteStorage(self._db_file, self._config.get_sqlite_file())
+
+        self.assertEqual([_record(0), _record(1, 'GDL'), extra], other.load())
+        self.assertEqual([_record(1, 'GDL'), extra], other.select(HostFilter(location='GDL')))
+        self.assertEqual([extra], other.select(HostFilter('dev', 'db', 'GDL')))
+        self.assertEqual([], other.select(HostFilter(role='web')))
+        self.assertEqual([extra], other.select(HostFilter(role='db,web', location='MEX,GDL*')))
+        self.assertEqual([_record(0), _record(1, 'GDL')], other.select(HostFilter(role='app', location='M*,GDL')))
+        self.assertEqual([_record(1, 'GDL'), extra], other.select(HostFilter(location='re:^G')))
+        self.assertEqual(extra, other.get(extra['host']))
+        self.assertIsNone(other.get(_record(2)['host']))
+
+    def test_replay(self):
+        """Testing that replaying operations twice gives the same result"""
+        operations = [
+            ('add', _record(3)),
+            ('update', _record(1, 'GDL')),
+            ('delete', _record(2)['host']),
+            ('delete', 'unknown.domain.net'),
+        ]
+        expected = [_record(0), _record(1, 'GDL'), _record(3)]
+
+        result = JsonStorage.replay([_record(0), _record(1), _record(2)], operations)
+
+        self.assertEqual(expected, result)
+        self.assertEqual(expected, JsonStorage.replay(list(result), operations))
+
+    def test_journal(self):
+        """Testing that the journal is replayed over the snapshot"""
+        storage = JournalStorage(self._db_file)
+        storage.max_journal_ratio = 100
+        storage.save([_record(0), _record(1)], None)
+
+        servers = [_record(0, 'GDL'), _record(1), _record(2)]
+        storage.save(servers, [('add', _record(2)), ('update', _record(0, 'GDL'))])
+        del servers[1]
+        storage.save(servers, [('delete', _record(1)['host'])])
+
+        with open(self._db_file) as f:
+            self.assertEqual([_record(0), _record(1)], json.load(f))
+
+        self.assertEqual(servers, JournalStorage(self._db_file).load())
+        self.assertEqual(servers, JsonStorage(self._db_file).load())
+
+    def test_interrupted_append(self):
+        """Testing that a partial line at the end of the journal is ignored"""
+        storage = JournalStorage(self._db_file)
+        storage.max_journal_ratio = 100
+        storage.save([_record(0)], None)
+        storage.save([_record(0), _record(1)], [('add', _record(1))])
+
+        with open(self._db_file + '.journal', 'a') as f:
+            f.write('{"op": "add", "record": {"host": ')
+
+        self.assertEqual([_record(0), _record(1)], storage.load())
+
+    def test_compaction(self):
+        """Testing that the journal is folded into the snapshot once it is too big"""
+        storage = JournalStorage(self._db_file)
+        storage.save([], None)
+        servers = []
+
+        for i in range(50):
+            servers.append(_record(i))
+            storage.save(servers, [('add', _record(i))])
+
+        storage.wait()
+
+        with open(self._db_file) as f:
+            snapshot = json.load(f)
+
+        full_journal = sum(len(json.dumps({'op': 'add', 'record': entry})) + 1 for entry in servers)
+        journal_file = self._db_file + '.journal'
+        journal_size = os.path.getsize(journal_file) if os.path.isfile(journal_file) else 0
+
+        self.assertTrue(len(snapshot) > 0)
+        self.assertTrue(journal_size < full_journal)
+        self.assertEqual(servers, storage.load())
+
+    def test_json_folds_journal(self):
+        """Testing that the JSON backend writes the journal into the DB file"""
+        journal = JournalStorage(self._db_file)
+        journal.max_journal_ratio = 100
+        journal.save([_record(0)], None)
+        journal.save([_record(0), _record(1)], [('add', _record(1))])
+
+        JsonStorage(self._db_file).save([_record(0), _record(1)], [('add', _record(1))])
+
+        self.assertFalse(os.path.isfile(self._db_file + '.journal'))
+
+        with open(self._db_file) as f:
+            self.assertEqual([_record(0), _record(1)], json.load(f))
+
+    def test_iter_array(self):
+        """Testing that a JSON array is read item by item whatever the size of the chunks"""
+        data = json.dumps([_record(0), 12345, 'a,]', [1, {'b': ']'}], None, _record(1)], indent=2)
+
+        for chunk_size in (1, 2, 7, 65536):
+            self.assertEqual(json.loads(data), list(_iter_array(io.StringIO(data), chunk_size)))
+
+        self.assertEqual([], list(_iter_array(io.StringIO(' [ ] '))))
+
+        for data in ('', '[', '[1,', '[1 2]', '{}', '[1,]'):
+            with self.assertRaises(ValueError):
+                list(_iter_array(io.StringIO(data), 2))
+
+    def test_iter_records(self):
+        """Testing that the streamed records are the same as the loaded records"""
+        storage = JournalStorage(self._db_file)
+        storage.max_journal_ratio = 100
+        storage.save([_record(i) for i in range(6)], None)
+        storage.save([], [('add', _record(6)), ('update', _record(1, 'GDL')), ('delete', _record(2)['host']),
+                          ('delete', _record(3)['host']), ('add', _record(3, 'GDL')), ('update', _record(7)),
+                          ('add', _record(8)), ('delete', _record(8)['host']), ('update', _record(4, 'GDL'))])
+
+        self.assertEqual(storage.load(), list(storage.iter_records()))
+        self.assertEqual([], list(JsonStorage(self._db_file + '.missing').iter_records()))
+
+    def test_stream_on_load(self):
+        """Testing the DB read record by record"""
+        ServersDB(self._config).import_servers([(i, _record(i, 'GDL' if i % 2 else 'MEX')) for i in range(10)])
+
+        """A new instance, the loaded one would be reused"""
+        ServersDB.clear_instances()
+
+        self._config.stream_on_load = True
+        db = ServersDB(self._config)
+
+        self.assertEqual(5, len(db.select(HostFilter(location='GDL'))))
+        self.assertEqual(_record(3, 'GDL'), db.get_host(_record(3)['host']))
+        self.assertIsNone(db._servers)
+
+        db.add_new_server(Server(_record(10)))
+
+        self.assertEqual(11, len(db._servers))
+        self.assertEqual(11, len(ServersDB(self._config).select()))
+
+        with open(self._db_file, 'w') as f:
+            json.dump([_record(0), dict(_record(1), environment='none')], f)
+
+        with self.assertRaises(Exception):
+            ServersDB(self._config).select()
+
+        self._config.validate_on_load = False
+        self.assertEqual([_record(1)['host']],
+                         [entry['host'] for entry in ServersDB(self._config).select(HostFilter('none'))])
+
+        with open(self._db_file, 'w') as f:
+            json.dump([_record(0), _record(1), _record(0, 'GDL')], f)
+
+        self.assertEqual(1, len(ServersDB(self._config).select(HostFilter(location='GDL'))))
+
+        """A duplicated host is found while the DB is read, like in the validation of the whole DB"""
+        ServersDB.clear_instances()
+        self._config.validate_on_load = True
+
+        with self.assertRaises(Exception):
+            ServersDB(self._config).select(HostFilter(location='GDL'))
+
+    def test_servers_db(self):
+        """Testing the DB with the journal backend"""
+        self._config.storage = 'journal'
+        db = ServersDB(self._config)
+        db.import_servers([(i, _record(i)) for i in range(10)])
+        db.update_server(Server(_record(3, 'GDL')))
+        db.delete_server(Server(_record(5)))
+        db.add_new_server(Server(_record(10)))
+        db._storage.wait()
+
+        self.assertTrue(os.path.isfile(self._db_file + '.journal'))
+
+        self._config.storage = 'json'
+        other = ServersDB(self._config)
+
+        self.assertEqual(db.get_all(), other.get_all())
+        self.assertEqual('GDL', other.get_servers('host', _record(3)['host'])[0].get_data()['location'])
+        self.assertEqual(0, len(other.get_servers('host', _record(5)['host'])))
+
+    def test_sqlite_servers_db(self):
+        """Testing the DB with the SQLite backend and the migration from the JSON backend"""
+        ServersDB(self._config).import_servers([(i, _record(i, 'GDL' if i % 2 else 'MEX')) for i in range(10)])
+
+        self._config.storage = 'sqlite'
+        self.assertEqual([], ServersDB(self._config).select())
+        storage = ServersDB(self._config)._storage
+
+        self._config.storage = 'json'
+        self.assertEqual(10, ServersDB(self._config).migrate('sqlite'))
+
+        self._config.storage = 'sqlite'
+        db = ServersDB(self._config)
+
+        """The backend of the changed file is opened again and the previous connection is closed"""
+        self.assertIsNot(storage, db._storage)
+        self.assertIsNone(storage._connection)
+
+        self.assertEqual(_record(3, 'GDL'), db.get_host(_record(3)['host']))
+        self.assertEqual(5, len(db.select(HostFilter(location='MEX'))))
+        self.assertIsNone(db._servers)
+
+        db.update_server(Server(_record(3, 'MEX')))
+        db.delete_server(Server(_record(5)))
+        db.add_new_server(Server(_record(10)))
+
+        with self.assertRaises(Exception):
+            db.add_new_server(Server(_record(10)))
+
+        self.assertIsNone(db._servers)
+
+        other = ServersDB(self._config)
+
+        self.assertEqual(7, len(other.select(HostFilter(location='MEX'))))
+        self.assertEqual(10, len(other.get_all()))
+        self.assertEqual([], other.fsck())
+
+    def __stress(self, storage):
+        """Runs several writer and reader processes against the same DB"""
+        writers = 4
+        count = 25
+        done = multiprocessing.Event()
+
+        db = ServersDB(_config(storage))
+        db.import_servers([(0, _record(0))])
+        db._storage.wait()
+
+        readers = [multiprocessing.Process(target=_reader, args=(storage, done)) for _ in range(2)]
+        processes = [multiprocessing.Process(target=_writer, args=(storage, 1 + i * count, count))
+                     for i in range(writers)]
+
+        for process in readers + processes:
+            process.start()
+
+        for process in processes:
+            process.join()
+
+        done.set()
+
+        for process in readers:
+            process.join()
+
+        self.assertEqual([0] * (writers + 2), [process.exitcode for process in readers + processes])
+
+        servers = ServersDB(_config(storage)).get_all()
+
+        self.assertEqual(set(_record(i)['host'] for i in range(writers * count + 1)),
+                         set(entry['host'] for entry in servers))
+        self.assertEqual(writers * count + 1, len(servers))
+
+    def test_concurrent_json(self):
+        """Testing concurrent writers and readers with the JSON backend"""
+        self.__stress('json')
+
+    def test_concurrent_journal(self):
+        """Testing concurrent writers and readers with the journal backend"""
+        self.__stress('journal')
+
+    def test_concurrent_sqlite(self):
+        """Testing concurrent writers and readers with the SQLite backend"""
+        self.__stress('sqlite')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Filename: test_watcher
+Created on: 18/10/2026
+Project name: dynamic_hosts
+Description: 
+"""
+
+from dynamic_hosts.watcher import FileWatcher
+
+import os
+import queue
+import shutil
+import tempfile
+import unittest
+
+
+class TestFileWatcher(unittest.TestCase):
+    _folder = None
+    _changes = None
+
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+        self._changes = queue.Queue()
+
+    def tearDown(self):
+        shutil.rmtree(self._folder, ignore_errors=True)
+
+    def write(self, name, data):
+        """Replaces a file with a rename, like the storage backends do"""
+        with open(os.path.join(self._folder, name + '.tmp'), 'w') as f:
+            f.write(data)
+
+        os.replace(os.path.join(self._folder, name + '.tmp'), os.path.join(self._folder, name))
+
+    def check(self, inotify, missing=True):
+        watcher = FileWatcher(self._changes.put, interval=0.1, delay=0.01, inotify=inotify)
+        watcher.add('first', [os.path.join(self._folder, 'first.json'), os.path.join(self._folder, 'first.journal')])
+        watcher.add('second', [os.path.join(self._folder, 'second.json')])
+        if missing:
+            """A folder that does not exist is polled"""
+            watcher.add('missing', [os.path.join(self._folder, 'missing', 'data.json')])
+        watcher.start()
+
+        try:
+            self.write('first.json', '[]')
+            self.assertEqual('first', self._changes.get(timeout=5))
+
+            with open(os.path.join(self._folder, 'first.journal'), 'a') as f:
+                f.write('{}\n')
+
+            self.assertEqual('first', self._changes.get(timeout=5))
+
+            self.write('other.json', '[]')
+            self.write('second.json', '[1]')
+            self.assertEqual('second', self._changes.get(timeout=5))
+
+            os.remove(os.path.join(self._folder, 'second.json'))
+            self.assertEqual('second', self._changes.get(timeout=5))
+
+            if missing:
+                os.makedirs(os.path.join(self._folder, 'missing'))
+                self.write(os.path.join('missing', 'data.json'), '[]')
+                self.assertEqual('missing', self._changes.get(timeout=5))
+
+            self.assertTrue(self._changes.empty())
+        finally:
+            watcher.stop()
+
+        return watcher
+
+    def test_polling(self):
+        """Testing the changes found by polling the files"""
+        self.assertFalse(self.check(False).uses_inotify)
+
+    def test_inotify(self):
+        """Testing the changes found with inotify"""
+        watcher = FileWatcher(self._changes.put, inotify=True)
+
+        if not watcher.uses_inotify:
+            self.skipTest("inotify is not available")
+
+        watcher.stop()
+
+        self.check(True, missing=False)
+        self.check(True)
+
+
+if __name__ == '__main__':
+    unittest.main()